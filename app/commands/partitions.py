@@ -0,0 +1,57 @@
+"""
+Maintenance commands for the partitioned ``applications`` table.
+
+    python -m app.commands.partitions ensure [--months-ahead N]
+    python -m app.commands.partitions archive [--retention-days N] [--batch-size N] [--pause SECONDS]
+"""
+import argparse
+import asyncio
+import logging
+
+import app.models.candidate  # noqa: F401  (mapper configuration needs Candidate)
+from app.core import database, partitions
+from app.core.config import settings
+
+
+async def ensure(months_ahead: int) -> None:
+    async with database.AsyncSessionLocal() as session:
+        created = await partitions.ensure_partitions(session, months_ahead)
+        await session.commit()
+    print(f"Created {created} partition(s)")
+
+
+async def archive(retention_days: int, batch_size: int, pause: float) -> None:
+    moved = await partitions.archive_closed_applications(
+        database.AsyncSessionLocal,
+        retention_days=retention_days,
+        batch_size=batch_size,
+        pause=pause,
+    )
+    print(f"Archived {moved} closed application(s)")
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "ensure":
+            await ensure(args.months_ahead)
+        else:
+            await archive(args.retention_days, args.batch_size, args.pause)
+    finally:
+        await database.dispose_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ensure_parser = commands.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure_parser.add_argument("--months-ahead", type=int, default=settings.APPLICATION_PARTITIONS_AHEAD)
+
+    archive_parser = commands.add_parser("archive", help="move old closed applications to applications_archive")
+    archive_parser.add_argument("--retention-days", type=int, default=settings.APPLICATION_RETENTION_DAYS)
+    archive_parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    archive_parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,51 @@
+"""
+Delete candidates (with their applications) or applications matching filters,
+in short batched transactions.
+
+    python -m app.commands.purge candidates --filter full_name__prefix=Loadtest [--batch-size N] [--pause SECONDS]
+    python -m app.commands.purge applications --filter job_title=Intern --filter status=REJECTED
+"""
+import argparse
+import asyncio
+import logging
+
+import app.models.candidate  # noqa: F401  (mapper configuration needs Candidate)
+from app.core import database, purge
+from app.core.config import settings
+
+
+def parse_filter(value: str):
+    key, sep, filter_value = value.partition("=")
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"expected column[__op]=value, got {value!r}")
+    return key, filter_value
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        async for progress in purge.purge(
+            database.AsyncSessionLocal,
+            args.table,
+            dict(args.filter),
+            batch_size=args.batch_size,
+            pause=args.pause,
+        ):
+            deleted = ", ".join(f"{count} {table}" for table, count in progress.deleted.items()) or "nothing"
+            print(f"batch {progress.batches}: deleted {deleted} so far (up to id {progress.last_id})")
+    finally:
+        await database.dispose_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("table", choices=sorted(purge.DELETERS))
+    parser.add_argument(
+        "--filter", type=parse_filter, action="append", required=True,
+        help="column[__op]=value, as in the list endpoints; repeat to combine",
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.PURGE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.PURGE_PAUSE_SECONDS, help="seconds to sleep between batches")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,412 @@
+import asyncio
+import logging
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import Float, Integer, bindparam, case, cast, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import result_cache
+from app.core.config import settings
+from app.core.db_client import DBClient, StaleVersionError
+from app.models.application import (
+    Application,
+    ApplicationStageRollup,
+    ApplicationStatus,
+    ApplicationStatusHistory,
+)
+
+logger = logging.getLogger(__name__)
+
+# stages of the hiring funnel, in order
+FUNNEL_STAGES = (ApplicationStatus.APPLIED, ApplicationStatus.INTERVIEWING, ApplicationStatus.HIRED)
+
+# rollup_watermarks row of the stage rollups
+STAGE_ROLLUP = "application_stages"
+
+_status_statements: Dict[bool, Any] = {}
+
+
+def status_update_statement(check_version: bool):
+    """
+    One statement that changes an application's status and appends the
+    change to ``application_status_history``.
+
+    The current row is locked in a CTE so the recorded ``from_status`` is
+    the status actually replaced. Setting the same status again bumps the
+    version but records nothing. Parameters: ``application_id``,
+    ``new_status`` and, with ``check_version``, ``expected_version``.
+    """
+    stmt = _status_statements.get(check_version)
+    if stmt is not None:
+        return stmt
+
+    applications = Application.__table__
+    history = ApplicationStatusHistory.__table__
+
+    previous = (
+        select(applications.c.id, applications.c.applied_at, applications.c.status)
+        .where(applications.c.id == bindparam("application_id", type_=applications.c.id.type))
+        .with_for_update()
+        .cte("previous")
+    )
+    changed = update(applications).where(
+        applications.c.id == previous.c.id,
+        applications.c.applied_at == previous.c.applied_at,
+    )
+    if check_version:
+        changed = changed.where(applications.c.version == bindparam("expected_version", type_=Integer))
+    updated = (
+        changed.values(
+            status=bindparam("new_status", type_=applications.c.status.type),
+            version=applications.c.version + 1,
+        )
+        .returning(*applications.c, previous.c.status.label("previous_status"))
+        .cte("updated")
+    )
+    recorded = (
+        insert(history)
+        .from_select(
+            ["application_id", "job_title", "from_status", "to_status", "applied_at"],
+            select(
+                updated.c.id,
+                updated.c.job_title,
+                updated.c.previous_status,
+                updated.c.status,
+                updated.c.applied_at,
+            ).where(updated.c.previous_status.is_distinct_from(updated.c.status)),
+        )
+        .cte("recorded")
+    )
+    stmt = select(*(updated.c[column.name] for column in applications.c)).add_cte(recorded)
+    _status_statements[check_version] = stmt
+    return stmt
+
+
+async def record_created(session: AsyncSession, applications: List[Dict[str, Any]]) -> None:
+    """
+    Append the creation of new applications to their status history, in
+    the transaction that inserted them.
+
+    Every application enters ``APPLIED`` (from no status); one created at
+    another status then moves on to it. The funnel counts ``APPLIED`` from
+    these rows through the rollups, like every later stage.
+    """
+    if not applications:
+        return
+    history = ApplicationStatusHistory.__table__
+
+    def row(application, from_status, to_status):
+        return {
+            "application_id": uuid.UUID(str(application["id"])),
+            "job_title": application["job_title"],
+            "from_status": from_status,
+            "to_status": to_status,
+            "applied_at": application["applied_at"],
+        }
+
+    await session.execute(insert(history), [row(a, None, ApplicationStatus.APPLIED) for a in applications])
+    # a separate statement, so these come after the creation rows in id order
+    moved_on = [
+        row(a, ApplicationStatus.APPLIED, ApplicationStatus(a["status"]))
+        for a in applications
+        if ApplicationStatus(a["status"]) is not ApplicationStatus.APPLIED
+    ]
+    if moved_on:
+        await session.execute(insert(history), moved_on)
+
+
+async def update_application_status(
+    db: DBClient,
+    application_id: Union[str, uuid.UUID],
+    new_status: str,
+    expected_version: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Change an application's status, recording the change in its history.
+
+    :return: The updated application, or ``None`` if it does not exist.
+    :raises StaleVersionError: if ``expected_version`` no longer matches.
+    """
+    params = {
+        "application_id": uuid.UUID(str(application_id)),
+        "new_status": ApplicationStatus(new_status),
+    }
+    if expected_version is not None:
+        params["expected_version"] = expected_version
+
+    result = await db.session.execute(status_update_statement(expected_version is not None), params)
+    row = result.mappings().first()
+    if row is not None:
+        await result_cache.table_written(db.session, Application.__tablename__)
+        return dict(row)
+
+    if expected_version is not None:
+        # only on the failure path: tell "gone" apart from "changed"
+        current = await db.query_table_data(
+            "applications", filters={"id": str(application_id)}, single_row=True, fields=["version"]
+        )
+        if current is not None:
+            raise StaleVersionError(current["version"])
+    return None
+
+
+# Adds history rows changed in [since, until) to the stage rollups. Each
+# row closes a stay in from_status that began at the previous change of the
+# same application (or at applied_at, also for the creation row); window
+# functions over the history of the affected applications find those
+# starts and first arrivals.
+REFRESH_STAGE_ROLLUPS = text("""
+WITH affected AS (
+    SELECT DISTINCT application_id
+    FROM application_status_history
+    WHERE changed_at >= :since AND changed_at < :until
+),
+ordered AS (
+    SELECT h.job_title, h.from_status, h.to_status, h.changed_at,
+           coalesce(lag(CASE WHEN h.from_status IS NULL THEN h.applied_at ELSE h.changed_at END) OVER stays,
+                    h.applied_at) AS entered_at,
+           row_number() OVER (PARTITION BY h.application_id, h.to_status ORDER BY h.changed_at, h.id) AS arrival
+    FROM application_status_history h
+    JOIN affected a ON a.application_id = h.application_id
+    WHERE h.changed_at < :until
+    WINDOW stays AS (PARTITION BY h.application_id ORDER BY h.changed_at, h.id)
+),
+increments AS (
+    SELECT job_title, from_status AS stage, 0 AS entered, 1 AS exits,
+           extract(epoch FROM changed_at - entered_at) AS seconds
+    FROM ordered
+    WHERE changed_at >= :since AND from_status IS NOT NULL
+    UNION ALL
+    SELECT job_title, to_status, 1, 0, 0
+    FROM ordered
+    WHERE changed_at >= :since AND arrival = 1
+)
+INSERT INTO application_stage_rollups AS r (job_title, stage, entered, exits, seconds_in_stage)
+SELECT job_title, stage, sum(entered), sum(exits), sum(seconds)
+FROM increments
+GROUP BY job_title, stage
+ON CONFLICT (job_title, stage) DO UPDATE SET
+    entered = r.entered + EXCLUDED.entered,
+    exits = r.exits + EXCLUDED.exits,
+    seconds_in_stage = r.seconds_in_stage + EXCLUDED.seconds_in_stage
+""")
+
+
+async def refresh_stage_rollups(session: AsyncSession, lag: Optional[float] = None) -> bool:
+    """
+    Fold history rows written since the last refresh into the stage rollups,
+    after taking the history of deleted applications back out of them.
+
+    Only rows older than ``lag`` seconds are consumed, so transactions still
+    in flight when the refresh runs can't be skipped. The watermark row is
+    locked with ``SKIP LOCKED``: if another worker is refreshing, this is a
+    no-op. Returns whether a refresh ran.
+    """
+    lag = settings.ANALYTICS_ROLLUP_LAG_SECONDS if lag is None else lag
+    result = await session.execute(
+        text("""
+            SELECT processed_until, timezone('utc', now()) - make_interval(secs => :lag) AS until
+            FROM rollup_watermarks
+            WHERE name = :name
+            FOR UPDATE SKIP LOCKED
+        """),
+        {"name": STAGE_ROLLUP, "lag": lag},
+    )
+    row = result.first()
+    if row is None or row.until <= row.processed_until:
+        return False
+
+    # first, so the history of deleted applications is never folded in
+    await session.execute(FORGET_STAGE_HISTORY, {"since": row.processed_until})
+    await session.execute(REFRESH_STAGE_ROLLUPS, {"since": row.processed_until, "until": row.until})
+    await session.execute(
+        text("UPDATE rollup_watermarks SET processed_until = :until WHERE name = :name"),
+        {"name": STAGE_ROLLUP, "until": row.until},
+    )
+    return True
+
+
+# Deletes the history of tombstoned applications, with the tombstones, and
+# subtracts what earlier refreshes (rows before :since) added from it, by
+# the same computation over the deleted rows. It runs inside the refresh,
+# so it never races one; a tombstone committed after it started waits for
+# the next refresh, which subtracts whatever this one folds in meanwhile.
+FORGET_STAGE_HISTORY = text("""
+WITH forgotten AS (
+    DELETE FROM application_history_tombstones
+    RETURNING application_id
+),
+removed AS (
+    DELETE FROM application_status_history h
+    USING forgotten f
+    WHERE h.application_id = f.application_id
+    RETURNING h.id, h.application_id, h.job_title, h.from_status, h.to_status, h.applied_at, h.changed_at
+),
+ordered AS (
+    SELECT h.job_title, h.from_status, h.to_status, h.changed_at,
+           coalesce(lag(CASE WHEN h.from_status IS NULL THEN h.applied_at ELSE h.changed_at END) OVER stays,
+                    h.applied_at) AS entered_at,
+           row_number() OVER (PARTITION BY h.application_id, h.to_status ORDER BY h.changed_at, h.id) AS arrival
+    FROM removed h
+    WINDOW stays AS (PARTITION BY h.application_id ORDER BY h.changed_at, h.id)
+),
+decrements AS (
+    SELECT job_title, from_status AS stage, 0 AS entered, 1 AS exits,
+           extract(epoch FROM changed_at - entered_at) AS seconds
+    FROM ordered
+    WHERE changed_at < :since AND from_status IS NOT NULL
+    UNION ALL
+    SELECT job_title, to_status, 1, 0, 0
+    FROM ordered
+    WHERE changed_at < :since AND arrival = 1
+),
+totals AS (
+    SELECT job_title, stage, sum(entered) AS entered, sum(exits) AS exits, sum(seconds) AS seconds
+    FROM decrements
+    GROUP BY job_title, stage
+)
+UPDATE application_stage_rollups AS r SET
+    entered = r.entered - t.entered,
+    exits = r.exits - t.exits,
+    seconds_in_stage = r.seconds_in_stage - t.seconds
+FROM totals t
+WHERE r.job_title = t.job_title AND r.stage = t.stage
+""")
+
+RECORD_TOMBSTONES = text("""
+INSERT INTO application_history_tombstones (application_id)
+SELECT unnest(:application_ids)
+ON CONFLICT (application_id) DO NOTHING
+""").bindparams(bindparam("application_ids", type_=ARRAY(UUID(as_uuid=True))))
+
+
+async def forget_applications(session: AsyncSession, application_ids: List[Union[str, uuid.UUID]]) -> None:
+    """
+    Tombstone deleted applications, in the caller's transaction. The next
+    rollup refresh deletes their status history and takes it back out of
+    the rollups.
+
+    Only new rows are written, so deletes neither wait for each other or a
+    refresh nor lock rows that other transactions update.
+    """
+    if not application_ids:
+        return
+    await session.execute(
+        RECORD_TOMBSTONES, {"application_ids": [uuid.UUID(str(i)) for i in application_ids]}
+    )
+
+
+class RollupRefresh:
+    """
+    Background task folding new status history into the stage rollups
+    every ``ANALYTICS_REFRESH_INTERVAL_SECONDS``, so the analytics
+    endpoints only read. Every worker runs one; ``SKIP LOCKED`` on the
+    watermark makes all but one of them a no-op at a time.
+    """
+
+    def __init__(self, interval: Optional[float] = None, session_factory=None):
+        self.interval = interval or settings.ANALYTICS_REFRESH_INTERVAL_SECONDS
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def run(self) -> bool:
+        async with self._sessions() as session:
+            refreshed = await refresh_stage_rollups(session)
+            await session.commit()
+        if refreshed:
+            logger.debug("Refreshed application stage rollups")
+        return refreshed
+
+    async def start(self) -> None:
+        """
+        Refresh now and every ``interval`` seconds in the background.
+        """
+        self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Could not refresh application stage rollups")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+rollups = RollupRefresh()
+
+
+def time_in_stage_statement(job_title: Optional[str] = None):
+    """
+    Average time spent in each stage per job title, from the rollups.
+    """
+    rollups = ApplicationStageRollup.__table__
+    stmt = (
+        select(
+            rollups.c.job_title,
+            rollups.c.stage,
+            rollups.c.exits.label("completed"),
+            (rollups.c.seconds_in_stage / cast(rollups.c.exits, Float)).label("average_seconds"),
+        )
+        .where(rollups.c.exits > 0)
+        .order_by(rollups.c.job_title, rollups.c.stage)
+    )
+    if job_title is not None:
+        stmt = stmt.where(rollups.c.job_title == job_title)
+    return stmt
+
+
+def funnel_statement(job_title: Optional[str] = None):
+    """
+    Funnel conversion per job title, read from the rollups.
+
+    Every application enters ``APPLIED`` when it is created, so all stages
+    are counted the same way. Conversion rates against the previous stage
+    and against ``APPLIED`` use window functions over the stage order.
+    """
+    rollups = ApplicationStageRollup.__table__
+    stages = select(rollups.c.job_title, rollups.c.stage, rollups.c.entered).where(
+        rollups.c.stage.in_(FUNNEL_STAGES)
+    )
+    if job_title is not None:
+        stages = stages.where(rollups.c.job_title == job_title)
+    stages = stages.subquery("stages")
+
+    rank = case({stage: position for position, stage in enumerate(FUNNEL_STAGES)}, value=stages.c.stage)
+    window = {"partition_by": stages.c.job_title, "order_by": rank}
+    def ratio(denominator):
+        return cast(stages.c.entered, Float) / func.nullif(cast(denominator, Float), 0, type_=Float)
+
+    return select(
+        stages.c.job_title,
+        stages.c.stage,
+        stages.c.entered,
+        ratio(func.lag(stages.c.entered).over(**window)).label("conversion_from_previous"),
+        ratio(func.first_value(stages.c.entered).over(**window)).label("conversion_from_applied"),
+    ).order_by(stages.c.job_title, rank)
+
+
+async def time_in_stage(session: AsyncSession, job_title: Optional[str] = None) -> List[Dict[str, Any]]:
+    result = await session.execute(time_in_stage_statement(job_title))
+    return [dict(row) for row in result.mappings()]
+
+
+async def funnel(session: AsyncSession, job_title: Optional[str] = None) -> List[Dict[str, Any]]:
+    result = await session.execute(funnel_statement(job_title))
+    return [dict(row) for row in result.mappings()]
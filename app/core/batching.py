@@ -0,0 +1,182 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+from sqlalchemy import insert
+
+from app.core import analytics, database, deadlines, result_cache
+from app.core.config import settings
+from app.core.query import coerce_value, get_column
+from app.models.application import Application
+
+logger = logging.getLogger(__name__)
+
+
+class InsertBatcher:
+    """
+    Micro-batching writer for single-row inserts into one table.
+
+    Rows submitted within ``max_delay`` seconds of each other (up to
+    ``max_batch_size`` rows) are written with one multi-row
+    ``INSERT ... RETURNING`` on a single connection and committed together,
+    instead of one flush, refresh and pooled connection per caller. Each
+    caller gets back its own row.
+
+    If the batch fails (e.g. one row violates a foreign key), the rows are
+    retried one by one in savepoints so only the offending callers see the
+    error. Rows are committed in the batcher's own transaction, not the
+    caller's; ``after_write(session, created_rows)`` runs in it after every
+    insert, for writes that must commit with the rows.
+    """
+
+    def __init__(
+        self,
+        model_class: Type,
+        max_batch_size: Optional[int] = None,
+        max_delay: Optional[float] = None,
+        session_factory: Optional[Callable] = None,
+        after_write: Optional[Callable[[Any, List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        self.model_class = model_class
+        self.table = model_class.__table__
+        self.max_batch_size = max_batch_size or settings.INSERT_BATCH_MAX_SIZE
+        self.max_delay = settings.INSERT_BATCH_MAX_DELAY if max_delay is None else max_delay
+        self.session_factory = session_factory or database.AsyncSessionLocal
+        self.after_write = after_write
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set = set()
+        self._batches = 0
+        self._rows = 0
+        self._fallbacks = 0
+
+    def prepare(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Coerce ``data`` to column types and fill in Python-side column defaults.
+
+        Columns with only a server default are left out, so rows are grouped
+        by their column set when written.
+
+        :raises InvalidQueryError: for unknown columns or malformed values.
+        """
+        row = {}
+        for key, value in data.items():
+            row[key] = coerce_value(get_column(self.model_class, key), value)
+        for column in self.table.columns:
+            if column.key in row or column.default is None:
+                continue
+            default = column.default
+            row[column.key] = default.arg(None) if default.is_callable else default.arg
+        return row
+
+    async def submit(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue ``data`` for the next batch and wait for the created row.
+        """
+        row = self.prepare(data)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._start_flush)
+        return await future
+
+    def _start_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def drain(self) -> None:
+        """
+        Write any queued rows and wait for in-progress batches, e.g. on shutdown.
+        """
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        # the batch serves several requests; it isn't bound by the deadline
+        # of the one that happened to start it
+        deadlines.clear()
+        rows = [row for row, _ in batch]
+        self._batches += 1
+        self._rows += len(rows)
+        try:
+            async with self.session_factory() as session:
+                try:
+                    results = await self.write(session, rows)
+                    await session.commit()
+                except Exception:
+                    await session.rollback()
+                    if len(rows) == 1:
+                        raise
+                    self._fallbacks += 1
+                    results = await self._write_one_by_one(session, rows)
+                    await session.commit()
+        except Exception as exc:
+            logger.exception("Batched insert into %s failed", self.table.name)
+            results = [exc] * len(rows)
+
+        for (_, future), result in zip(batch, results):
+            # the caller may have given up (e.g. client disconnect)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def write(self, session, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Insert ``rows`` with one ``INSERT ... RETURNING`` per distinct column
+        set and return the created rows in input order.
+        """
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for index, row in enumerate(rows):
+            groups.setdefault(tuple(sorted(row)), []).append(index)
+
+        created: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        stmt = insert(self.table).returning(*self.table.columns, sort_by_parameter_order=True)
+        for indexes in groups.values():
+            result = await session.execute(stmt, [rows[i] for i in indexes])
+            for index, returned in zip(indexes, result.mappings()):
+                created[index] = dict(returned)
+        if self.after_write is not None:
+            await self.after_write(session, created)
+        await result_cache.table_written(session, self.table.name)
+        return created
+
+    async def _write_one_by_one(self, session, rows: List[Dict[str, Any]]) -> List[Any]:
+        results: List[Any] = []
+        for row in rows:
+            try:
+                async with session.begin_nested():
+                    results.extend(await self.write(session, [row]))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters for monitoring.
+        """
+        return {
+            "table": self.table.name,
+            "batches": self._batches,
+            "rows": self._rows,
+            "average_batch_size": round(self._rows / self._batches, 2) if self._batches else 0,
+            "fallbacks": self._fallbacks,
+            "pending": len(self._pending),
+        }
+
+
+# writer for POST /candidates/{id}/applications, used when APPLICATION_INSERT_BATCHING is on
+application_writer = InsertBatcher(Application, after_write=analytics.record_created)
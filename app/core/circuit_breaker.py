@@ -0,0 +1,361 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.deadlines import is_statement_timeout
+from app.core.rate_limit import EXEMPT_PREFIXES, client_id_from_scope
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+
+# GET routes whose last good responses are served while the circuit is open
+STALE_PATH_PREFIXES = ("/candidates", "/applications")
+# response headers not kept with a stale entry; they are set when it is served
+STALE_SKIPPED_HEADERS = (b"content-length", b"x-cache", b"age")
+
+
+async def probe_database() -> None:
+    """
+    One round trip on a fresh pooled connection.
+    """
+    from app.core import database
+
+    async with database.get_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over database statements.
+
+    Outcomes of the last ``window_size`` statements are kept; once at least
+    ``min_calls`` are recorded, the circuit opens when the share of failed
+    statements (connection errors, pool timeouts) reaches ``error_rate`` or
+    the share of statements slower than ``slow_call_seconds`` reaches
+    ``slow_call_rate``.
+
+    While open, requests fail fast and a background task probes the
+    database every ``probe_interval`` seconds; ``recovery_probes``
+    consecutive probes answered within ``slow_call_seconds`` close it again.
+    """
+
+    def __init__(
+        self,
+        window_size: Optional[int] = None,
+        min_calls: Optional[int] = None,
+        error_rate: Optional[float] = None,
+        slow_call_seconds: Optional[float] = None,
+        slow_call_rate: Optional[float] = None,
+        probe_interval: Optional[float] = None,
+        recovery_probes: Optional[int] = None,
+        probe: Callable[[], Awaitable[None]] = probe_database,
+        enabled: Optional[bool] = None,
+    ):
+        self.window_size = window_size or settings.CIRCUIT_WINDOW_SIZE
+        self.min_calls = min_calls or settings.CIRCUIT_MIN_CALLS
+        self.error_rate = error_rate or settings.CIRCUIT_ERROR_RATE
+        self.slow_call_seconds = slow_call_seconds or settings.CIRCUIT_SLOW_CALL_MS / 1000
+        self.slow_call_rate = slow_call_rate or settings.CIRCUIT_SLOW_CALL_RATE
+        self.probe_interval = probe_interval or settings.CIRCUIT_PROBE_INTERVAL
+        self.recovery_probes = recovery_probes or settings.CIRCUIT_RECOVERY_PROBES
+        self.probe = probe
+        self.enabled = settings.CIRCUIT_BREAKER_ENABLED if enabled is None else enabled
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (failed, slow) per recorded statement
+        self._window: "deque[Tuple[bool, bool]]" = deque(maxlen=self.window_size)
+        self._failures = 0
+        self._slow = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.enabled and self.state == OPEN
+
+    def record(self, failed: bool = False, duration: float = 0.0) -> None:
+        """
+        Record the outcome of one statement while the circuit is closed.
+        """
+        if not self.enabled or self.state != CLOSED:
+            return
+        slow = duration >= self.slow_call_seconds
+        if len(self._window) == self._window.maxlen:
+            old_failed, old_slow = self._window[0]
+            self._failures -= old_failed
+            self._slow -= old_slow
+        self._window.append((failed, slow))
+        self._failures += failed
+        self._slow += slow
+
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        if self._failures / calls >= self.error_rate:
+            self.trip(f"{self._failures}/{calls} statements failed")
+        elif self._slow / calls >= self.slow_call_rate:
+            self.trip(f"{self._slow}/{calls} statements took over {self.slow_call_seconds:g}s")
+
+    def trip(self, reason: str) -> None:
+        """
+        Open the circuit and start probing for recovery.
+        """
+        if self.state == OPEN:
+            return
+        logger.warning("Database circuit opened: %s", reason)
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._trips += 1
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_until_recovered())
+        except RuntimeError:
+            # no loop (e.g. a sync maintenance command); nothing to protect
+            self.reset()
+
+    def reset(self) -> None:
+        self.state = CLOSED
+        self._window.clear()
+        self._failures = 0
+        self._slow = 0
+
+    async def _probe_until_recovered(self) -> None:
+        successes = 0
+        while successes < self.recovery_probes:
+            await asyncio.sleep(self.probe_interval)
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(self.probe(), self.slow_call_seconds)
+                successes += 1
+            except Exception as e:
+                logger.debug("Database probe failed after %.3fs: %r", time.monotonic() - start, e)
+                successes = 0
+        logger.warning("Database circuit closed after %.1fs", time.monotonic() - self.opened_at)
+        self.reset()
+
+    def rejected(self) -> None:
+        self._rejected += 1
+
+    def retry_after(self) -> int:
+        return max(1, round(self.probe_interval * self.recovery_probes))
+
+    async def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "state": self.state,
+            "open_for_seconds": round(time.monotonic() - self.opened_at, 1) if self.state == OPEN else 0,
+            "window_calls": len(self._window),
+            "window_failures": self._failures,
+            "window_slow_calls": self._slow,
+            "trips": self._trips,
+            "rejected": self._rejected,
+        }
+
+
+@dataclass
+class StaleEntry:
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    stored_at: float
+
+
+class StaleCache:
+    """
+    Last good response per GET URL, bounded by total body size (LRU),
+    served only while the circuit is open.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_age: Optional[float] = None):
+        self.max_bytes = settings.CIRCUIT_STALE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = settings.CIRCUIT_STALE_MAX_AGE_SECONDS if max_age is None else max_age
+        self._entries: "OrderedDict[str, StaleEntry]" = OrderedDict()
+        self._bytes = 0
+        self._served = 0
+
+    @staticmethod
+    def cache_key(scope) -> str:
+        return f"{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}"
+
+    def get(self, key: str) -> Optional[StaleEntry]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.stored_at > self.max_age:
+            return None
+        self._entries.move_to_end(key)
+        self._served += 1
+        return entry
+
+    def set(self, key: str, entry: StaleEntry) -> None:
+        self._remove(key)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += len(entry.body)
+        while self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self._bytes, "served": self._served}
+
+
+breaker = CircuitBreaker()
+stale_cache = StaleCache()
+
+
+# ----- Statement outcomes -----
+
+def _is_unavailable(error: Optional[BaseException]) -> bool:
+    """
+    Errors that say the database is unreachable or overloaded, as opposed
+    to errors in the statement itself. Statements cancelled at their
+    request's deadline are the request's problem, not the database's.
+    """
+    if error is None or is_statement_timeout(error):
+        return False
+    return isinstance(error, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError, OSError, asyncio.TimeoutError))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context._breaker_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_success(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_breaker_started", None)
+    if started is not None:
+        breaker.record(duration=time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "handle_error")
+def _record_error(context):
+    if (
+        context.is_disconnect
+        or _is_unavailable(context.sqlalchemy_exception)
+        or _is_unavailable(context.original_exception)
+    ):
+        breaker.record(failed=True)
+
+
+# ----- ASGI -----
+
+class CircuitBreakerMiddleware:
+    """
+    ASGI middleware failing fast with 503 while the database circuit is open.
+
+    Successful candidate and application GETs are remembered in the stale
+    cache; while the circuit is open those are answered from it with
+    ``X-Cache: stale`` and an ``Age`` header, for callers with a validly
+    signed token (the user lookup needs the database). Pool timeouts are
+    recorded as failures and answered with 503.
+    """
+
+    def __init__(self, app, circuit: Optional[CircuitBreaker] = None, cache: Optional[StaleCache] = None):
+        self.app = app
+        self.circuit = circuit
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        # resolved lazily so the module-level instances can be swapped in tests
+        circuit = self.circuit or breaker
+        cache = self.cache or stale_cache
+        if not circuit.enabled:
+            return await self.app(scope, receive, send)
+
+        cacheable = scope["method"] == "GET" and scope["path"].startswith(STALE_PATH_PREFIXES)
+        if circuit.is_open:
+            circuit.rejected()
+            entry = cache.get(cache.cache_key(scope)) if cacheable else None
+            if entry is not None and client_id_from_scope(scope).startswith("user:"):
+                return await _send_stale(send, entry)
+            return await _unavailable(send, circuit.retry_after())
+
+        if not cacheable:
+            return await self._call(scope, receive, send, circuit)
+
+        response: Dict[str, Any] = {}
+
+        async def send_and_remember(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = message.get("headers", [])
+                response["body"] = []
+            elif message["type"] == "http.response.body" and response.get("status") == 200:
+                response["body"].append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    cache.set(cache.cache_key(scope), StaleEntry(
+                        status=200,
+                        headers=[(k, v) for k, v in response["headers"] if k.lower() not in STALE_SKIPPED_HEADERS],
+                        body=b"".join(response["body"]),
+                        stored_at=time.monotonic(),
+                    ))
+            await send(message)
+
+        await self._call(scope, receive, send_and_remember, circuit)
+
+    async def _call(self, scope, receive, send, circuit: CircuitBreaker):
+        try:
+            await self.app(scope, receive, send)
+        except exc.TimeoutError:
+            # the pool had no connection to give within DB_POOL_TIMEOUT
+            circuit.record(failed=True)
+            await _unavailable(send, circuit.retry_after())
+
+
+async def _send_stale(send, entry: StaleEntry):
+    age = int(time.monotonic() - entry.stored_at)
+    await send({
+        "type": "http.response.start",
+        "status": entry.status,
+        "headers": entry.headers + [
+            (b"content-length", str(len(entry.body)).encode()),
+            (b"x-cache", b"stale"),
+            (b"age", str(age).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": entry.body})
+
+
+async def _unavailable(send, retry_after: int):
+    body = json.dumps({"detail": "Database unavailable, retry shortly"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
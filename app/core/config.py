@@ -1,7 +1,8 @@
+import logging
 import os
 from typing import List, Optional
 from dotenv import load_dotenv
-from pydantic import PostgresDsn
+from pydantic import PostgresDsn, model_validator
 from pydantic_settings import BaseSettings
 
 # Load environment variables from .env file
@@ -18,13 +19,37 @@ class Settings(BaseSettings):
     API_PREFIX: str = "/api"
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ("true", "1", "t")
 
+    # Logging settings
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "DEBUG" if DEBUG else "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+    # fraction of SQL statements logged (replaces echo; 1 with DEBUG)
+    SQL_LOG_SAMPLE_RATE: float = float(os.getenv("SQL_LOG_SAMPLE_RATE", "1" if DEBUG else "0"))
+    # statements slower than this are always logged (0 = off)
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", "500"))
+
     # JWT settings
     JWT_SECRET: str = os.getenv("JWT_SECRET")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "120"))
+
+    # Token revocation settings
+    # how often each worker reads revocations made by the others
+    REVOCATION_REFRESH_SECONDS: float = float(os.getenv("REVOCATION_REFRESH_SECONDS", "5"))
+    # re-read window before the newest revoked_at seen, covering commits that landed late
+    REVOCATION_REFRESH_OVERLAP_SECONDS: float = float(os.getenv("REVOCATION_REFRESH_OVERLAP_SECONDS", "60"))
+    # how often expired revocations are deleted from the table
+    REVOCATION_PRUNE_INTERVAL_SECONDS: float = float(os.getenv("REVOCATION_PRUNE_INTERVAL_SECONDS", "3600"))
     
     # Server settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
+    SERVER_MODE: str = os.getenv("SERVER_MODE", "development")  # "development" or "production"
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+    # recycle a worker after this many requests (0 = never)
+    WORKER_MAX_REQUESTS: int = int(os.getenv("WORKER_MAX_REQUESTS", "0"))
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = int(os.getenv("GRACEFUL_SHUTDOWN_TIMEOUT", "30"))
+    SERVER_LOOP: str = os.getenv("SERVER_LOOP", "auto")  # "auto", "asyncio" or "uvloop"
+    SERVER_HTTP: str = os.getenv("SERVER_HTTP", "auto")  # "auto", "h11" or "httptools"
 
     # PostgreSQL settings
     DB_SERVER: str = os.getenv("DB_SERVER", "localhost")
@@ -32,7 +57,24 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "postgres")
     DB_NAME: str = os.getenv("DB_NAME", "backend_service")
     DB_PORT: str = os.getenv("DB_PORT", "5432")
-    
+
+    # Connection pool settings
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    # connections opened (and statements prepared) at startup
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "2"))
+    # total connections all workers may hold; overrides DB_POOL_SIZE/DB_MAX_OVERFLOW (0 = off)
+    DB_CONNECTION_BUDGET: int = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+
+    # Statement cache settings
+    # DBClient statement templates, keyed by query shape
+    STATEMENT_CACHE_SIZE: int = int(os.getenv("STATEMENT_CACHE_SIZE", "500"))
+    # SQLAlchemy compiled SQL cache per engine
+    DB_COMPILED_CACHE_SIZE: int = int(os.getenv("DB_COMPILED_CACHE_SIZE", "1000"))
+    # asyncpg prepared statements kept per connection
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "500"))
+
     @property
     def SQLALCHEMY_DATABASE_URI(self) -> str:
         """
@@ -58,16 +100,154 @@ class Settings(BaseSettings):
         ).split(",")
         if origin.strip()
     ]
-    
+
+    # Idempotency settings
+    IDEMPOTENCY_BACKEND: str = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # "memory" or "postgres"
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_MAX_ENTRIES: int = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+    # how long a running request holds its key; a dead worker's key is free again after this
+    IDEMPOTENCY_CLAIM_TTL_SECONDS: float = float(os.getenv("IDEMPOTENCY_CLAIM_TTL_SECONDS", "60"))
+
+    # Rate limiting / admission control settings
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() in ("true", "1", "t")
+    RATE_LIMIT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "20"))
+    RATE_LIMIT_BURST: float = float(os.getenv("RATE_LIMIT_BURST", "100"))
+    # JSON object of "METHOD /path-prefix" -> token cost, e.g. {"POST /candidates": 5}
+    RATE_LIMIT_ROUTE_WEIGHTS: str = os.getenv("RATE_LIMIT_ROUTE_WEIGHTS", "{}")
+    # 0 means "pool_size + max_overflow"
+    MAX_IN_FLIGHT_REQUESTS: int = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "0"))
+    ADMISSION_TIMEOUT: float = float(os.getenv("ADMISSION_TIMEOUT", "0.5"))
+
+    # Listing count settings
+    # above this many (estimated) rows totals are reported as estimates
+    COUNT_ESTIMATE_THRESHOLD: int = int(os.getenv("COUNT_ESTIMATE_THRESHOLD", "10000"))
+    COUNT_CACHE_TTL_SECONDS: float = float(os.getenv("COUNT_CACHE_TTL_SECONDS", "30"))
+    COUNT_CACHE_MAX_ENTRIES: int = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1000"))
+
+    # Duplicate detection settings
+    DEDUPE_MATCH_THRESHOLD: float = float(os.getenv("DEDUPE_MATCH_THRESHOLD", "0.6"))
+    DEDUPE_MAX_BLOCK_SIZE: int = int(os.getenv("DEDUPE_MAX_BLOCK_SIZE", "100"))
+    DEDUPE_BATCH_SIZE: int = int(os.getenv("DEDUPE_BATCH_SIZE", "5000"))
+    # how often each worker rescans all candidates for duplicates
+    DEDUPE_SCAN_INTERVAL_SECONDS: float = float(os.getenv("DEDUPE_SCAN_INTERVAL_SECONDS", "900"))
+
+    # Skill matching settings
+    # candidates read per query while building the skill index
+    MATCH_INDEX_BATCH_SIZE: int = int(os.getenv("MATCH_INDEX_BATCH_SIZE", "10000"))
+    # how often the index re-reads candidates changed by other workers
+    MATCH_INDEX_REFRESH_SECONDS: float = float(os.getenv("MATCH_INDEX_REFRESH_SECONDS", "30"))
+    # re-read window before the newest updated_at seen, covering commits that landed late
+    MATCH_INDEX_REFRESH_OVERLAP_SECONDS: float = float(os.getenv("MATCH_INDEX_REFRESH_OVERLAP_SECONDS", "60"))
+    MATCH_MAX_RESULTS: int = int(os.getenv("MATCH_MAX_RESULTS", "100"))
+
+    # Application partitioning / archival settings
+    # monthly partitions created ahead of time (at startup and by the partitions command)
+    APPLICATION_PARTITIONS_AHEAD: int = int(os.getenv("APPLICATION_PARTITIONS_AHEAD", "3"))
+    # closed applications older than this are moved to applications_archive
+    APPLICATION_RETENTION_DAYS: int = int(os.getenv("APPLICATION_RETENTION_DAYS", "365"))
+    ARCHIVE_BATCH_SIZE: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+    # Bulk delete settings
+    # rows deleted per transaction by DELETE /candidates and /applications with filters
+    PURGE_BATCH_SIZE: int = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+    # seconds to sleep between batches, leaving room for live writes
+    PURGE_PAUSE_SECONDS: float = float(os.getenv("PURGE_PAUSE_SECONDS", "0.05"))
+    # a batch waiting longer than this for a row lock is rolled back and retried (0 = wait)
+    PURGE_LOCK_TIMEOUT_MS: int = int(os.getenv("PURGE_LOCK_TIMEOUT_MS", "1000"))
+    PURGE_LOCK_RETRIES: int = int(os.getenv("PURGE_LOCK_RETRIES", "5"))
+
+    # Insert batching settings
+    # write POST /candidates/{id}/applications through the micro-batching writer
+    APPLICATION_INSERT_BATCHING: bool = os.getenv("APPLICATION_INSERT_BATCHING", "False").lower() in ("true", "1", "t")
+    INSERT_BATCH_MAX_SIZE: int = int(os.getenv("INSERT_BATCH_MAX_SIZE", "100"))
+    # seconds the first row of a batch waits for others to join
+    INSERT_BATCH_MAX_DELAY: float = float(os.getenv("INSERT_BATCH_MAX_DELAY", "0.005"))
+
+    # List result cache settings
+    RESULT_CACHE_ENABLED: bool = os.getenv("RESULT_CACHE_ENABLED", "False").lower() in ("true", "1", "t")
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    RESULT_CACHE_TTL_SECONDS: float = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "60"))
+    # invalidate other workers' caches over Postgres LISTEN/NOTIFY
+    RESULT_CACHE_NOTIFY: bool = os.getenv("RESULT_CACHE_NOTIFY", "False").lower() in ("true", "1", "t")
+    RESULT_CACHE_NOTIFY_CHANNEL: str = os.getenv("RESULT_CACHE_NOTIFY_CHANNEL", "result_cache_invalidation")
+
+    # Read coalescing settings
+    SINGLE_FLIGHT_ENABLED: bool = os.getenv("SINGLE_FLIGHT_ENABLED", "True").lower() in ("true", "1", "t")
+    # a read only joins an identical one started at most this long ago
+    SINGLE_FLIGHT_WINDOW_MS: float = float(os.getenv("SINGLE_FLIGHT_WINDOW_MS", "100"))
+
+    # Request deadline settings
+    # seconds a request may take, also applied as its statement_timeout (0 = no deadline)
+    REQUEST_TIMEOUT_SECONDS: float = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+    # JSON object of "METHOD /path-prefix" -> seconds, e.g. {"GET /candidates": 5}
+    ROUTE_TIMEOUTS: str = os.getenv("ROUTE_TIMEOUTS", "{}")
+
+    # Database circuit breaker settings
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "True").lower() in ("true", "1", "t")
+    # recent statements the error and slow call rates are computed over
+    CIRCUIT_WINDOW_SIZE: int = int(os.getenv("CIRCUIT_WINDOW_SIZE", "50"))
+    CIRCUIT_MIN_CALLS: int = int(os.getenv("CIRCUIT_MIN_CALLS", "10"))
+    CIRCUIT_ERROR_RATE: float = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+    CIRCUIT_SLOW_CALL_MS: float = float(os.getenv("CIRCUIT_SLOW_CALL_MS", "2000"))
+    CIRCUIT_SLOW_CALL_RATE: float = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+    CIRCUIT_PROBE_INTERVAL: float = float(os.getenv("CIRCUIT_PROBE_INTERVAL", "1"))
+    # consecutive successful probes before the circuit closes
+    CIRCUIT_RECOVERY_PROBES: int = int(os.getenv("CIRCUIT_RECOVERY_PROBES", "3"))
+    CIRCUIT_STALE_CACHE_MAX_BYTES: int = int(os.getenv("CIRCUIT_STALE_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+    # stale responses older than this are not served
+    CIRCUIT_STALE_MAX_AGE_SECONDS: float = float(os.getenv("CIRCUIT_STALE_MAX_AGE_SECONDS", "900"))
+
+    # Batch endpoint settings
+    BATCH_MAX_OPERATIONS: int = int(os.getenv("BATCH_MAX_OPERATIONS", "25"))
+
+    # Application listing settings
+    APPLICATIONS_PAGE_SIZE: int = int(os.getenv("APPLICATIONS_PAGE_SIZE", "50"))
+    APPLICATIONS_MAX_PAGE_SIZE: int = int(os.getenv("APPLICATIONS_MAX_PAGE_SIZE", "500"))
+
+    # Application analytics settings
+    # status changes younger than this are left for the next rollup refresh
+    ANALYTICS_ROLLUP_LAG_SECONDS: float = float(os.getenv("ANALYTICS_ROLLUP_LAG_SECONDS", "60"))
+    # each worker's background refresh tries this often; one at a time runs
+    ANALYTICS_REFRESH_INTERVAL_SECONDS: float = float(os.getenv("ANALYTICS_REFRESH_INTERVAL_SECONDS", "30"))
+
     class Config:
         case_sensitive = True
 
+    @model_validator(mode="after")
+    def split_connection_budget(self) -> "Settings":
+        """
+        Derive the per-worker pool size from ``DB_CONNECTION_BUDGET``.
+
+        Every worker process has its own pool, so the budget is divided
+        evenly between workers and overflow is disabled to keep the total
+        under the budget. With result cache notifications each worker also
+        holds a LISTEN connection outside its pool, which is taken off the
+        budget first.
+        """
+        if self.DB_CONNECTION_BUDGET > 0:
+            workers = max(1, self.WEB_WORKERS if self.SERVER_MODE == "production" else 1)
+            budget = self.DB_CONNECTION_BUDGET
+            if self.RESULT_CACHE_ENABLED and self.RESULT_CACHE_NOTIFY:
+                budget -= workers
+            self.DB_POOL_SIZE = max(1, budget // workers)
+            self.DB_MAX_OVERFLOW = 0
+        return self
+
+    def redacted_dump(self) -> dict:
+        """
+        Settings as a dict with secrets masked, safe to log.
+        """
+        return {
+            key: "***" if value and any(s in key for s in ("SECRET", "PASSWORD")) else value
+            for key, value in self.model_dump().items()
+        }
+
 
 # Create settings instance
 settings = Settings()
 
 # log settings for debugging
 if settings.DEBUG:
-    print("Settings loaded:")
-    for key, value in settings.model_dump().items():
-        print(f"{key}: {value}")
+    logging.getLogger(__name__).debug("Settings loaded: %s", settings.redacted_dump())
+
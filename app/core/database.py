@@ -1,31 +1,141 @@
-from typing import AsyncGenerator
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Iterator, Optional
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
 )
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URI = settings.SQLALCHEMY_ASYNC_DATABASE_URI
 
-engine = create_async_engine(DATABASE_URI, echo=settings.DEBUG)
+_engine: Optional[AsyncEngine] = None
+
+# set while one session serves several requests, e.g. the operations of a batch
+_shared_session: ContextVar[Optional[AsyncSession]] = ContextVar("shared_session", default=None)
+
+
+def get_engine() -> AsyncEngine:
+    """
+    Return the application engine, creating it on first use.
+
+    Creating the engine lazily keeps imports cheap and lets the app factory
+    decide when connections are opened.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            DATABASE_URI,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            query_cache_size=settings.DB_COMPILED_CACHE_SIZE,
+            connect_args={"prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+        )
+        AsyncSessionLocal.configure(bind=_engine)
+    return _engine
+
+
+async def dispose_engine() -> None:
+    """
+    Close all pooled connections and drop the engine.
+    """
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+async def warm_up_pool(connections: int) -> None:
+    """
+    Open ``connections`` pooled connections up front and prepare the
+    statements DBClient issues most, so the first requests after a deploy
+    don't pay for connection setup, type introspection or statement
+    preparation.
+    """
+    from app.core.db_client import DBClient
+
+    engine = get_engine()
+    connections = min(connections, settings.DB_POOL_SIZE)
+    if connections <= 0:
+        return
+
+    statements = DBClient.warmup_statements()
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
+    async def _warm_one():
+        # each task holds its connection until all are checked out, so the
+        # pool ends up with ``connections`` distinct warm connections
+        try:
+            async with engine.connect() as conn:
+                for stmt in statements:
+                    await conn.execute(stmt)
+                await conn.rollback()
+                await barrier.wait()
+        except asyncio.BrokenBarrierError:
+            raise
+        except BaseException:
+            # release the tasks waiting at the barrier, and their connections
+            await barrier.abort()
+            raise
+
+    barrier = asyncio.Barrier(connections)
+    results = await asyncio.gather(*[_warm_one() for _ in range(connections)], return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException) and not isinstance(r, asyncio.BrokenBarrierError)]
+    if errors:
+        raise errors[0]
+    logger.info("Warmed %d pooled connections with %d statements", connections, len(statements))
+
+
+class _LazySessionMaker(async_sessionmaker):
+    def __call__(self, **local_kw) -> AsyncSession:
+        get_engine()
+        return super().__call__(**local_kw)
+
+
+AsyncSessionLocal = _LazySessionMaker(
     expire_on_commit=False,
     autoflush=False,
 )
 
 Base = declarative_base()
 
+@contextmanager
+def sharing_session(session: AsyncSession) -> Iterator[AsyncSession]:
+    """
+    Make ``get_session`` hand out ``session`` within this context.
+
+    The shared session is not committed or rolled back by ``get_session``;
+    its owner decides.
+    """
+    token = _shared_session.set(session)
+    try:
+        yield session
+    finally:
+        _shared_session.reset(token)
+
+
+def in_shared_session() -> bool:
+    return _shared_session.get() is not None
+
+
 # Async dependency to get DB session
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    shared = _shared_session.get()
+    if shared is not None:
+        yield shared
+        return
     async with AsyncSessionLocal() as session:
         try:
             yield session
             await session.commit()
         except:
             await session.rollback()
-            raise
\ No newline at end of file
+            raise
@@ -1,14 +1,157 @@
+import enum
 import importlib
+import json
 import pkgutil
 import inspect
-import traceback
-from typing import AsyncGenerator, Any, Dict, List, Optional, Type
+import logging
+import uuid
+from typing import AsyncGenerator, Any, Dict, List, Optional, Tuple, Type
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import create_engine, and_, or_, not_, text
+from sqlalchemy import create_engine, and_, or_, not_, text, update, delete, func, literal_column, bindparam, event, Integer
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
 
+from app.core import database, result_cache, single_flight
+from app.core.cache import TTLCache
+from app.core.config import settings
 from app.core.database import Base
+from app.core.query import (
+    InvalidQueryError,
+    build_filter_clauses,
+    build_order_by,
+    filter_template,
+    prepare_filters,
+    resolve_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _copy_rows(result):
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        return dict(result)
+    return [dict(row) for row in result]
+
+
+def _placeholder(column) -> Any:
+    """
+    A harmless value of the column's Python type, for warm-up queries.
+    """
+    python_type = column.type.python_type
+    if issubclass(python_type, enum.Enum):
+        return next(iter(python_type))
+    if python_type is uuid.UUID:
+        return uuid.UUID(int=0)
+    return python_type()
+
+
+def _filter_signature(filters: Optional[Dict[str, Any]]) -> Tuple:
+    """
+    Hashable, order-independent key for a filter dict.
+    """
+    return tuple(sorted((key, repr(value)) for key, value in (filters or {}).items()))
+
+
+_count_cache = TTLCache(
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl=settings.COUNT_CACHE_TTL_SECONDS,
+)
+
+
+# table name -> model class, filled on first lookup
+_model_classes: Dict[str, Type] = {}
+
+# statement templates keyed by shape (never by parameter values)
+_statement_cache = TTLCache(max_entries=settings.STATEMENT_CACHE_SIZE)
+
+
+class StatementCacheStats:
+    """
+    Hit counters for DBClient's statement templates and SQLAlchemy's
+    compiled SQL cache.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.template_hits = 0
+        self.template_misses = 0
+        self.compiled_hits = 0
+        self.compiled_misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        def rate(hits, misses):
+            return round(hits / (hits + misses), 3) if hits + misses else 0.0
+
+        return {
+            "templates": {
+                "hits": self.template_hits,
+                "misses": self.template_misses,
+                "hit_rate": rate(self.template_hits, self.template_misses),
+                "size": len(_statement_cache),
+            },
+            "compiled": {
+                "hits": self.compiled_hits,
+                "misses": self.compiled_misses,
+                "hit_rate": rate(self.compiled_hits, self.compiled_misses),
+            },
+        }
+
+
+statement_stats = StatementCacheStats()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_compiled_cache_hits(conn, cursor, statement, parameters, context, executemany):
+    cache_hit = getattr(context, "cache_hit", None)
+    if cache_hit is CACHE_HIT:
+        statement_stats.compiled_hits += 1
+    elif cache_hit is CACHE_MISS:
+        statement_stats.compiled_misses += 1
+
+
+def _cached_statement(cache_key: Tuple, build):
+    stmt = _statement_cache.get(cache_key)
+    if stmt is None:
+        statement_stats.template_misses += 1
+        stmt = build()
+        _statement_cache.set(cache_key, stmt)
+    else:
+        statement_stats.template_hits += 1
+    return stmt
+
+
+class Explain(Executable, ClauseElement):
+    """
+    ``EXPLAIN (FORMAT JSON)`` wrapper that keeps the inner statement's bound parameters.
+    """
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+class StaleVersionError(Exception):
+    """
+    Raised when an optimistic update finds the row at a different version.
+    """
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Row was modified concurrently (current version {current_version})")
+        self.current_version = current_version
+
 
 class DBClient:
     def __init__(self, session: AsyncSession):
@@ -46,60 +189,253 @@ class DBClient:
         """
         Get the SQLAlchemy model class by table name.
         """
-        try:
-            models_pkg = importlib.import_module("app.models")
-            for finder, name, ispkg in pkgutil.iter_modules(models_pkg.__path__):
-                module = importlib.import_module(f"app.models.{name}")
-                for attr in dir(module):
-                    cls = getattr(module, attr)
-                    if (
-                        inspect.isclass(cls)
-                        and hasattr(cls, "__tablename__")
-                        and cls.__tablename__ == table_name
-                    ):
-                        return cls
-        except Exception:
-            traceback.print_exc()
-        return None
+        if not _model_classes:
+            try:
+                models_pkg = importlib.import_module("app.models")
+                for finder, name, ispkg in pkgutil.iter_modules(models_pkg.__path__):
+                    module = importlib.import_module(f"app.models.{name}")
+                    for attr in dir(module):
+                        cls = getattr(module, attr)
+                        if inspect.isclass(cls) and hasattr(cls, "__tablename__"):
+                            _model_classes.setdefault(cls.__tablename__, cls)
+            except Exception:
+                logger.exception("Could not load model classes")
+        return _model_classes.get(table_name)
     
+    @staticmethod
+    def prepare_select(
+        model_class: Type,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        The SELECT statement used by ``query_table_data`` and its parameters.
+
+        Statements are cached by shape: table, filter keys (see
+        ``query.filter_shape``), ordering, fields and whether the query is
+        paginated; filter values are only ever bound parameters. Reusing the
+        statement object skips rebuilding it and recomputing SQLAlchemy's
+        cache key, and the SQL text stays identical so asyncpg reuses its
+        prepared statement.
+
+        :raises InvalidQueryError: for unknown fields or malformed filters.
+        """
+        shapes, params = prepare_filters(model_class, filters)
+        if limit is not None:
+            params["page_limit"] = limit
+        if offset is not None:
+            params["page_offset"] = offset
+
+        def build():
+            # table columns rather than the entity: rows come back as plain
+            # tuples, with no ORM objects or identity map entries
+            columns = resolve_fields(model_class, fields) or model_class.__table__.columns
+            stmt = select(*columns)
+            if shapes:
+                stmt = stmt.where(*(filter_template(model_class, shape) for shape in shapes))
+
+            ordering = build_order_by(model_class, order_by)
+            if ordering:
+                stmt = stmt.order_by(*ordering)
+
+            # apply pagination if specified
+            if limit is not None:
+                stmt = stmt.limit(bindparam("page_limit", type_=Integer))
+            if offset is not None:
+                stmt = stmt.offset(bindparam("page_offset", type_=Integer))
+            return stmt
+
+        cache_key = (
+            "select", model_class.__tablename__, shapes, tuple(order_by or ()),
+            tuple(fields or ()), limit is not None, offset is not None,
+        )
+        return _cached_statement(cache_key, build), params
+
+    @staticmethod
+    def build_select(
+        model_class: Type,
+        filters: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        order_by: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ):
+        """
+        Build the SELECT statement used by ``query_table_data``, with its
+        parameter values bound.
+
+        With ``fields`` only those columns are selected, otherwise all of
+        the table's columns.
+
+        :raises InvalidQueryError: for unknown fields or malformed filters.
+        """
+        stmt, params = DBClient.prepare_select(
+            model_class, filters=filters, limit=limit, offset=offset, order_by=order_by, fields=fields
+        )
+        return stmt.params(params) if params else stmt
+
+    # (table, filter keys, paginated) query shapes issued by the routes and auth
+    WARMUP_QUERIES = [
+        ("users", ("id",), False),
+        ("users", ("email",), False),
+        ("candidates", ("id",), False),
+        ("candidates", (), True),
+        ("applications", ("candidate_id",), False),
+        ("applications", ("candidate_id", "status"), False),
+    ]
+
+    @classmethod
+    def warmup_statements(cls) -> List[Any]:
+        """
+        Statements matching the shapes in ``WARMUP_QUERIES``, executed at
+        startup so their SQL is compiled and prepared before real traffic.
+        Filter values are placeholders; only the statement shape matters.
+        """
+        client = cls(None)
+        statements = []
+        for table_name, keys, paginated in cls.WARMUP_QUERIES:
+            model_class = client.get_model_class(table_name)
+            if not model_class:
+                continue
+            columns = model_class.__table__.columns
+            filters = {key: _placeholder(columns[key]) for key in keys}
+            statements.append(cls.build_select(
+                model_class,
+                filters=filters,
+                limit=0 if paginated else None,
+                offset=0 if paginated else None,
+            ))
+        return statements
+
     async def query_table_data(
         self,
         table_name: str,
         filters: Optional[Dict[str, Any]] = None,
         single_row: bool = False,
         limit: Optional[int] = None,
-        offset: Optional[int] = None
+        offset: Optional[int] = None,
+        order_by: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
     ):
         """
         Retrieve data from a specified table with optional filters.
+
+        Rows are built directly from the result tuples; no ORM objects are
+        loaded into the session. Identical reads running concurrently share
+        one execution (see ``app.core.single_flight``) unless this session
+        has written in its transaction.
+
+        :param filters: ``{"column[__op]": value}``; see ``app.core.query`` for operators.
+        :param order_by: Column names, prefixed with ``-`` for descending order.
+        :param fields: Only return these columns.
+        :raises InvalidQueryError: for unknown fields or malformed filters.
         """
         model_class = self.get_model_class(table_name)
         if not model_class:
             return None
 
-        stmt = select(model_class)
-        if filters:
-            for key, value in filters.items():
-                if hasattr(model_class, key):
-                    stmt = stmt.where(getattr(model_class, key) == value)
+        stmt, params = self.prepare_select(
+            model_class,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            order_by=order_by,
+            fields=fields,
+        )
 
-        # apply pagination if specified
-        if limit is not None:
-            stmt = stmt.limit(limit)
+        async def execute():
+            result = await self.session.execute(stmt, params)
+            keys = tuple(result.keys())
 
-        if offset is not None:
-            stmt = stmt.offset(offset)
+            if single_row:
+                row = result.first()
+                return dict(zip(keys, row)) if row else None
+
+            return [dict(zip(keys, row)) for row in result.all()]
+
+        if not self._reads_committed_data():
+            return await execute()
+        # statements are cached per shape, so the object identifies the SQL
+        key = (stmt, single_flight.freeze(params), single_row)
+        return await single_flight.reads.run(key, execute, copy=_copy_rows)
+
+    def _reads_committed_data(self) -> bool:
+        """
+        Whether reads through this session see only committed rows, so
+        their results can be shared with other requests.
+        """
+        if database.in_shared_session():
+            return False
+        info = getattr(self.session, "info", None)
+        return not (info and info.get(result_cache.WRITTEN_TABLES_KEY))
+
+    async def count_table_data(
+        self,
+        table_name: str,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Optional[Tuple[int, bool]]:
+        """
+        Count rows matching ``filters``.
+
+        Small results are counted exactly. When the table statistics
+        (unfiltered) or the planner (filtered) put the result above
+        ``COUNT_ESTIMATE_THRESHOLD`` rows, that estimate is returned instead
+        of running ``COUNT(*)``. Results are cached briefly per filter
+        signature so paging through a listing doesn't recount.
+
+        :return: ``(count, is_estimate)``, or ``None`` for unknown tables.
+        """
+        model_class = self.get_model_class(table_name)
+        if not model_class:
+            return None
 
-        # execute the query
+        cache_key = (table_name, _filter_signature(filters))
+        cached = _count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        estimate = await self._estimate_rows(model_class, filters)
+        if estimate is not None and estimate >= settings.COUNT_ESTIMATE_THRESHOLD:
+            counted = (estimate, True)
+        else:
+            counted = (await self._exact_count(model_class, filters), False)
+
+        _count_cache.set(cache_key, counted)
+        return counted
+
+    async def _exact_count(self, model_class: Type, filters: Optional[Dict[str, Any]]) -> int:
+        stmt = select(func.count()).select_from(model_class)
+        clauses = build_filter_clauses(model_class, filters)
+        if clauses:
+            stmt = stmt.where(*clauses)
         result = await self.session.execute(stmt)
-        rows = result.scalars()
+        return result.scalar_one()
+
+    async def _estimate_rows(self, model_class: Type, filters: Optional[Dict[str, Any]]) -> Optional[int]:
+        """
+        Cheap row estimate: ``pg_class.reltuples`` without filters, the
+        planner's row estimate with them. ``None`` if no statistics exist.
+        """
+        if not filters:
+            result = await self.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                {"table_name": model_class.__tablename__},
+            )
+            reltuples = result.scalar()
+            # -1 (never analyzed) or missing table
+            return reltuples if reltuples is not None and reltuples >= 0 else None
 
-        if single_row:
-            row = rows.first()
-            return self.row_to_dict(row) if row else None
+        stmt = select(literal_column("1")).select_from(model_class)
+        stmt = stmt.where(*build_filter_clauses(model_class, filters))
+        result = await self.session.execute(Explain(stmt))
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
-        return [self.row_to_dict(r) for r in rows.all()]
-    
     async def create_table_entry(
         self,
         table_name: str,
@@ -118,39 +454,176 @@ class DBClient:
         try:
             await self.session.flush()
             await self.session.refresh(new_entry)
+            await result_cache.table_written(self.session, table_name)
             return self.row_to_dict(new_entry)
-        except Exception as e:
-            traceback.print_exc()
-            raise e
+        except Exception:
+            logger.exception("Could not create %s entry", table_name)
+            raise
         
     async def update_table_entry(
         self,
         table_name: str,
         identifier: Dict[str, Any],
-        update_data: Dict[str, Any]
+        update_data: Dict[str, Any],
+        expected_version: Optional[int] = None
     ):
         """
         Update an existing entry in the specified table.
+
+        Runs as a single ``UPDATE ... RETURNING``. Tables with a ``version``
+        column get it bumped in the same statement, and when
+        ``expected_version`` is given the update only applies if the row is
+        still at that version; otherwise ``StaleVersionError`` is raised.
         """
         model_class = self.get_model_class(table_name)
         if not model_class:
             return None
-        
-        q = select(model_class)
-        for key, value in identifier.items():
-            q = q.where(getattr(model_class, key) == value)
-        
-        result = await self.session.execute(q)
-        row = result.scalars().first()
 
-        if not row:
+        columns = model_class.__table__.columns
+        versioned = "version" in columns
+        check_version = versioned and expected_version is not None
+
+        values = {
+            key: value for key, value in update_data.items()
+            if key in columns and key != "version"
+        }
+        if not values and not versioned:
+            return await self.query_table_data(table_name, filters=identifier, single_row=True)
+
+        shapes, params = prepare_filters(model_class, identifier)
+        params.update({f"set_{key}": value for key, value in values.items()})
+        if check_version:
+            params["expected_version"] = expected_version
+
+        def build():
+            assignments = {key: bindparam(f"set_{key}", type_=columns[key].type) for key in values}
+            if versioned:
+                assignments["version"] = model_class.version + 1
+            stmt = update(model_class).where(*(filter_template(model_class, shape) for shape in shapes))
+            if check_version:
+                stmt = stmt.where(model_class.version == bindparam("expected_version", type_=Integer))
+            return (
+                stmt.values(**assignments)
+                .returning(*columns)
+                .execution_options(synchronize_session=False)
+            )
+
+        cache_key = ("update", table_name, shapes, tuple(sorted(values)), check_version)
+        stmt = _cached_statement(cache_key, build)
+
+        try:
+            result = await self.session.execute(stmt, params)
+        except Exception:
+            logger.exception("Could not update %s entry", table_name)
+            raise
+
+        row = result.mappings().first()
+        if row is not None:
+            await result_cache.table_written(self.session, table_name)
+            return dict(row)
+
+        if check_version:
+            # only on the failure path: tell "gone" apart from "changed"
+            current = await self.session.execute(
+                select(model_class.version).where(*build_filter_clauses(model_class, identifier))
+            )
+            current_version = current.scalar()
+            if current_version is not None:
+                raise StaleVersionError(current_version)
+        return None
+
+    async def update_table_entries(
+        self,
+        table_name: str,
+        filters: Dict[str, Any],
+        update_data: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Update every row matching ``filters``. Versioned rows get their
+        version bumped. Returns the number of rows updated.
+        """
+        model_class = self.get_model_class(table_name)
+        if not model_class:
             return None
-        for key, value in update_data.items():
-            setattr(row, key, value)
+        if not filters:
+            raise InvalidQueryError("Refusing to update a whole table without filters")
+
+        columns = model_class.__table__.columns
+        values = {key: value for key, value in update_data.items() if key in columns and key != "version"}
+        if "version" in columns:
+            values["version"] = model_class.version + 1
+
+        stmt = (
+            update(model_class)
+            .where(*build_filter_clauses(model_class, filters))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
         try:
-            await self.session.flush()
-            await self.session.refresh(row)
-            return self.row_to_dict(row)
-        except Exception as e:
-            traceback.print_exc()
-            raise e
+            result = await self.session.execute(stmt)
+        except Exception:
+            logger.exception("Could not update %s entries", table_name)
+            raise
+        if result.rowcount:
+            await result_cache.table_written(self.session, table_name)
+        return result.rowcount
+
+    async def lock_table_entries(
+        self,
+        table_name: str,
+        filters: Dict[str, Any],
+        fields: Optional[List[str]] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lock every row matching ``filters`` with ``SELECT ... FOR UPDATE``
+        until the transaction ends, in ``id`` order so concurrent lockers
+        can't deadlock, and return them.
+
+        Unlike the ``FOR NO KEY UPDATE`` lock an ``UPDATE`` takes, this
+        conflicts with the ``FOR KEY SHARE`` lock of a foreign key check:
+        no row can start referencing a locked row before it is deleted.
+        """
+        model_class = self.get_model_class(table_name)
+        if not model_class:
+            return None
+        if not filters:
+            raise InvalidQueryError("Refusing to lock a whole table without filters")
+
+        columns = resolve_fields(model_class, fields) or model_class.__table__.columns
+        stmt = (
+            select(*columns)
+            .where(*build_filter_clauses(model_class, filters))
+            .order_by(*build_order_by(model_class, ["id"]))
+            .with_for_update()
+        )
+        result = await self.session.execute(stmt)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result.all()]
+
+    async def delete_table_entries(
+        self,
+        table_name: str,
+        filters: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Delete every row matching ``filters``. Returns the number of rows deleted.
+        """
+        model_class = self.get_model_class(table_name)
+        if not model_class:
+            return None
+        if not filters:
+            raise InvalidQueryError("Refusing to delete a whole table without filters")
+
+        stmt = (
+            delete(model_class)
+            .where(*build_filter_clauses(model_class, filters))
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            result = await self.session.execute(stmt)
+        except Exception:
+            logger.exception("Could not delete %s entries", table_name)
+            raise
+        if result.rowcount:
+            await result_cache.table_written(self.session, table_name)
+        return result.rowcount
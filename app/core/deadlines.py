@@ -0,0 +1,182 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres "query_canceled", raised when statement_timeout expires
+QUERY_CANCELED = "57014"
+
+# absolute time.monotonic() by which the current request must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left until the current request's deadline, if it has one.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def clear() -> None:
+    """
+    Drop the deadline inherited by a background task spawned from a request,
+    in that task's own context.
+    """
+    _deadline.set(None)
+
+
+def is_statement_timeout(error: BaseException) -> bool:
+    orig = getattr(error, "orig", error)
+    return getattr(orig, "sqlstate", None) == QUERY_CANCELED
+
+
+class DeadlinePolicy:
+    """
+    Per-route request deadlines.
+
+    ``route_deadlines`` maps ``"METHOD /path-prefix"`` (``*`` for any method)
+    to seconds; the longest matching prefix wins, other requests get
+    ``default``. ``0`` means no deadline.
+    """
+
+    def __init__(self, default: float, route_deadlines: Optional[Dict[str, float]] = None):
+        self.default = default
+        # longest prefix wins, so sort once here instead of on every request
+        self.route_deadlines: List[Tuple[str, str, float]] = sorted(
+            (
+                (rule.split(" ", 1)[0].upper(), rule.split(" ", 1)[1], float(seconds))
+                for rule, seconds in (route_deadlines or {}).items()
+            ),
+            key=lambda r: len(r[1]),
+            reverse=True,
+        )
+        self.timeouts = 0
+        self.timeouts_by_route: Counter = Counter()
+
+    def deadline_for(self, method: str, path: str) -> float:
+        for rule_method, prefix, seconds in self.route_deadlines:
+            if rule_method in (method, "*") and path.startswith(prefix):
+                return seconds
+        return self.default
+
+    def timed_out(self, route: str) -> None:
+        self.timeouts += 1
+        self.timeouts_by_route[route] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default_seconds": self.default,
+            "routes": {f"{method} {prefix}": seconds for method, prefix, seconds in self.route_deadlines},
+            "timeouts": self.timeouts,
+            "timeouts_by_route": dict(self.timeouts_by_route.most_common(20)),
+        }
+
+    def reset(self) -> None:
+        self.timeouts = 0
+        self.timeouts_by_route.clear()
+
+
+policy = DeadlinePolicy(
+    default=settings.REQUEST_TIMEOUT_SECONDS,
+    route_deadlines=json.loads(settings.ROUTE_TIMEOUTS),
+)
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection) -> None:
+    """
+    Bound every statement of the request's transaction by the time left,
+    so Postgres cancels a query the client has stopped waiting for.
+    """
+    left = remaining()
+    if left is None:
+        return
+    milliseconds = max(1, int(left * 1000))
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {milliseconds}")
+
+
+def route_label(scope) -> str:
+    """
+    ``METHOD /route/{template}`` once routing has matched, else the raw path.
+    """
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware enforcing the request deadline of each route.
+
+    The deadline is visible to the database layer, which turns it into
+    ``SET LOCAL statement_timeout``. A request still running at its
+    deadline is cancelled, and one whose query Postgres cancelled for the
+    same reason fails; both are answered with 504 and counted per route.
+    """
+
+    def __init__(self, app, deadlines: Optional[DeadlinePolicy] = None):
+        self.app = app
+        self.deadlines = deadlines
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # resolved lazily so the module-level instance can be swapped in tests
+        deadlines = self.deadlines or policy
+        seconds = deadlines.deadline_for(scope["method"], scope["path"])
+        if not seconds or seconds <= 0:
+            return await self.app(scope, receive, send)
+
+        started = False
+
+        async def send_tracking_start(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        token = _deadline.set(time.monotonic() + seconds)
+        timeout = asyncio.timeout(seconds)
+        try:
+            async with timeout:
+                await self.app(scope, receive, send_tracking_start)
+        except TimeoutError:
+            if not timeout.expired():
+                raise
+            await self._timed_out(scope, send, started, deadlines, seconds)
+        except exc.DBAPIError as e:
+            if not is_statement_timeout(e):
+                raise
+            await self._timed_out(scope, send, started, deadlines, seconds)
+        finally:
+            _deadline.reset(token)
+
+    @staticmethod
+    async def _timed_out(scope, send, started: bool, deadlines: DeadlinePolicy, seconds: float) -> None:
+        route = route_label(scope)
+        deadlines.timed_out(route)
+        logger.warning("%s exceeded its %gs deadline", route, seconds)
+        if started:
+            # too late for a 504; the server closes the connection
+            return
+        body = json.dumps({"detail": f"Request exceeded its {seconds:g}s deadline"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,549 @@
+import asyncio
+import hashlib
+import logging
+import re
+import unicodedata
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, insert, text
+from sqlalchemy.orm import Session
+
+from app.core import skill_index
+from app.core.config import settings
+from app.core.db_client import DBClient
+from app.core.query import InvalidQueryError
+from app.models.candidate import CandidateDuplicatePair
+
+logger = logging.getLogger(__name__)
+
+# email providers that ignore dots in the local part
+DOTLESS_EMAIL_DOMAINS = {"gmail.com": "gmail.com", "googlemail.com": "gmail.com"}
+
+# only the trailing digits are compared, so "+44 7700 900123" matches "07700 900123"
+PHONE_KEY_DIGITS = 9
+MIN_PHONE_DIGITS = 7
+
+# weights of the individual signals in a pair score
+EMAIL_WEIGHT = 0.6
+PHONE_WEIGHT = 0.4
+NAME_WEIGHT = 0.3
+
+# columns read by the duplicate scan
+SCAN_FIELDS = ["id", "full_name", "email", "phone"]
+
+# advisory lock key electing the worker that scans
+SCAN_LOCK = "candidate_duplicate_scan"
+
+# rollup_watermarks row holding when the stored pairs were scanned
+SCAN_WATERMARK = "candidate_duplicates"
+
+# session.info key collecting merged or deleted candidates until the transaction commits
+PENDING_KEY = "dedupe_pending"
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """
+    Lowercase, drop ``+tag`` suffixes and provider-insignificant dots.
+    """
+    if not email or "@" not in email:
+        return None
+    local, _, domain = email.strip().lower().rpartition("@")
+    local = local.split("+", 1)[0]
+    if domain in DOTLESS_EMAIL_DOMAINS:
+        local = local.replace(".", "")
+        domain = DOTLESS_EMAIL_DOMAINS[domain]
+    return f"{local}@{domain}" if local else None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """
+    Reduce a phone number to its trailing significant digits.
+    """
+    if not phone:
+        return None
+    digits = re.sub(r"\D", "", phone)
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits[-PHONE_KEY_DIGITS:]
+
+
+def normalize_name(name: Optional[str]) -> Optional[str]:
+    """
+    Accent-free, lowercase name with its tokens sorted.
+    """
+    if not name:
+        return None
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    tokens = re.findall(r"[a-z0-9]+", ascii_name.lower())
+    return " ".join(sorted(tokens)) or None
+
+
+def _hash_key(kind: str, value: str) -> int:
+    # 8-byte hashes keep the block index compact at millions of rows
+    digest = hashlib.blake2b(f"{kind}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[Any, Any] = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+
+class DuplicateDetector:
+    """
+    Blocking-based duplicate detection over candidate records.
+
+    Records are added in batches and indexed under hashed blocking keys
+    (normalized email, phone and name). Only records sharing a block are
+    ever compared, so the work grows with block sizes rather than with the
+    square of the number of candidates. Blocks larger than ``max_block_size``
+    (e.g. a very common name) are skipped as too unselective.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_block_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.threshold = settings.DEDUPE_MATCH_THRESHOLD if threshold is None else threshold
+        self.max_block_size = max_block_size or settings.DEDUPE_MAX_BLOCK_SIZE
+        self.batch_size = batch_size or settings.DEDUPE_BATCH_SIZE
+        self._records: Dict[Any, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        self._blocks: Dict[int, List[Any]] = {}
+
+    def add(self, records: Iterable[Dict[str, Any]]) -> None:
+        """
+        Index a batch of ``{"id", "full_name", "email", "phone"}`` records.
+        """
+        for record in records:
+            key = (
+                normalize_email(record.get("email")),
+                normalize_phone(record.get("phone")),
+                normalize_name(record.get("full_name")),
+            )
+            self._records[record["id"]] = key
+            for kind, value in zip(("e", "p", "n"), key):
+                if value:
+                    self._blocks.setdefault(_hash_key(kind, value), []).append(record["id"])
+
+    def score(self, a: Any, b: Any) -> float:
+        """
+        Similarity of two indexed records between 0 and 1.
+        """
+        email_a, phone_a, name_a = self._records[a]
+        email_b, phone_b, name_b = self._records[b]
+        score = 0.0
+        if email_a and email_a == email_b:
+            score += EMAIL_WEIGHT
+        if phone_a and phone_a == phone_b:
+            score += PHONE_WEIGHT
+        if name_a and name_b:
+            score += NAME_WEIGHT * SequenceMatcher(None, name_a, name_b).ratio()
+        return min(score, 1.0)
+
+    def candidate_pairs(self) -> Iterable[List[Tuple[Any, Any]]]:
+        """
+        Yield batches of distinct record pairs that share at least one block.
+        """
+        seen = set()
+        batch: List[Tuple[Any, Any]] = []
+        for ids in self._blocks.values():
+            if len(ids) < 2 or len(ids) > self.max_block_size:
+                continue
+            for i, a in enumerate(ids):
+                for b in ids[i + 1:]:
+                    pair = (a, b) if str(a) < str(b) else (b, a)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                    batch.append(pair)
+                    if len(batch) >= self.batch_size:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def score_pairs(self, pairs: Iterable[Tuple[Any, Any]]) -> List[Tuple[Any, Any, float]]:
+        """
+        The given pairs whose score reaches the threshold, with their score.
+        """
+        scored = []
+        for a, b in pairs:
+            score = self.score(a, b)
+            if score >= self.threshold:
+                scored.append((a, b, score))
+        return scored
+
+    def matching_pairs(self) -> List[Tuple[Any, Any, float]]:
+        """
+        Record pairs whose score reaches the threshold, with their score.
+        """
+        pairs = []
+        for batch in self.candidate_pairs():
+            pairs += self.score_pairs(batch)
+        return pairs
+
+    def clusters(self) -> List[Dict[str, Any]]:
+        """
+        Group records whose pair score reaches the threshold.
+
+        :return: Clusters as ``{"candidate_ids": [...], "score": best_pair_score}``,
+            largest first.
+        """
+        return cluster_pairs(self.matching_pairs())
+
+
+def cluster_pairs(pairs: Iterable[Tuple[Any, Any, float]]) -> List[Dict[str, Any]]:
+    """
+    Connected groups of scored pairs, largest first.
+    """
+    union_find = _UnionFind()
+    best: Dict[Any, float] = {}
+    for a, b, score in pairs:
+        union_find.union(a, b)
+        best[a] = max(best.get(a, 0.0), score)
+        best[b] = max(best.get(b, 0.0), score)
+
+    groups: Dict[Any, List[Any]] = {}
+    for record_id in best:
+        groups.setdefault(union_find.find(record_id), []).append(record_id)
+
+    clusters = [
+        {
+            "candidate_ids": sorted(ids, key=str),
+            "score": round(max(best[i] for i in ids), 3),
+        }
+        for ids in groups.values()
+    ]
+    clusters.sort(key=lambda c: (-len(c["candidate_ids"]), -c["score"]))
+    return clusters
+
+
+class DuplicateScan:
+    """
+    Duplicate clusters from a periodic background scan of all candidates.
+
+    One worker scans per ``interval``: the one holding the
+    ``pg_try_advisory_lock`` when the stored result has become older than
+    that. It reads candidates in keyset-paginated batches, each in its own
+    short transaction, scores the pairs in chunks, yielding to requests
+    between them, and stores the matching pairs in
+    ``candidate_duplicate_pairs``. Every worker then loads those pairs and
+    the candidates in them; ``GET /candidates/duplicates`` only serves that.
+
+    Pairs scoring at least ``DEDUPE_MATCH_THRESHOLD`` are kept, so clusters
+    for any stricter threshold are derived from them without rescanning.
+    Candidates this worker merges or deletes are dropped right away;
+    other changes show up after the next scan.
+    """
+
+    def __init__(self, interval: Optional[float] = None, session_factory=None):
+        self.interval = interval or settings.DEDUPE_SCAN_INTERVAL_SECONDS
+        self.threshold = settings.DEDUPE_MATCH_THRESHOLD
+        self._session_factory = session_factory
+        # None until a scan result has been loaded
+        self._pairs: Optional[List[Tuple[Any, Any, float]]] = None
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        self._clusters: Dict[float, List[Dict[str, Any]]] = {}
+        self.scanned_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._scans = 0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    @property
+    def ready(self) -> bool:
+        return self._pairs is not None
+
+    async def find_pairs(self) -> List[Tuple[Any, Any, float]]:
+        """
+        Read every candidate and score the pairs sharing a block.
+        """
+        detector = DuplicateDetector(threshold=self.threshold)
+        last_id = None
+        while True:
+            async with self._sessions() as session:
+                batch = await DBClient(session).query_table_data(
+                    "candidates",
+                    filters={"id__gt": last_id} if last_id else None,
+                    order_by=["id"],
+                    limit=settings.DEDUPE_BATCH_SIZE,
+                    fields=SCAN_FIELDS,
+                )
+            if not batch:
+                break
+            detector.add(batch)
+            last_id = batch[-1]["id"]
+
+        pairs = []
+        for chunk in detector.candidate_pairs():
+            pairs += detector.score_pairs(chunk)
+            # scoring is pure Python: let requests run between chunks
+            await asyncio.sleep(0)
+        return pairs
+
+    async def save(self, session, pairs: List[Tuple[Any, Any, float]]) -> None:
+        """
+        Replace the stored pairs, in the caller's transaction.
+        """
+        table = CandidateDuplicatePair.__table__
+        await session.execute(delete(table))
+        if pairs:
+            await session.execute(insert(table), [
+                {"candidate_id": uuid.UUID(str(a)), "duplicate_id": uuid.UUID(str(b)), "score": score}
+                for a, b, score in pairs
+            ])
+        await session.execute(
+            text("""
+                INSERT INTO rollup_watermarks (name, processed_until)
+                VALUES (:name, timezone('utc', now()))
+                ON CONFLICT (name) DO UPDATE SET processed_until = EXCLUDED.processed_until
+            """),
+            {"name": SCAN_WATERMARK},
+        )
+
+    async def load(self, db: DBClient) -> None:
+        """
+        Serve the stored pairs, unless they are the ones already served.
+        """
+        scanned = await db.query_table_data(
+            "rollup_watermarks", filters={"name": SCAN_WATERMARK}, single_row=True
+        )
+        if scanned is None or scanned["processed_until"] == self.scanned_at:
+            return
+        rows = await db.query_table_data("candidate_duplicate_pairs", fields=["candidate_id", "duplicate_id", "score"])
+        pairs = [(str(r["candidate_id"]), str(r["duplicate_id"]), r["score"]) for r in rows]
+
+        # only the candidates that are part of a pair are served
+        paired = sorted({record_id for pair in pairs for record_id in pair[:2]})
+        records: Dict[Any, Dict[str, Any]] = {}
+        for start in range(0, len(paired), settings.DEDUPE_BATCH_SIZE):
+            batch = await db.query_table_data(
+                "candidates",
+                filters={"id__in": paired[start:start + settings.DEDUPE_BATCH_SIZE]},
+                fields=SCAN_FIELDS,
+            )
+            records.update((str(r["id"]), r) for r in batch)
+        # candidates deleted since the scan are gone from the table
+        self._pairs = [p for p in pairs if p[0] in records and p[1] in records]
+        self._records = records
+        self._clusters = {}
+        self.scanned_at = scanned["processed_until"]
+
+    @asynccontextmanager
+    async def _scan_lock(self):
+        """
+        Whether this worker holds the scan lock, for the ``with`` block.
+
+        A session-level advisory lock on a connection kept out of the pool
+        for the scan, so no transaction stays open meanwhile.
+        """
+        from app.core.database import get_engine
+
+        async with get_engine().connect() as conn:
+            result = await conn.execute(text("SELECT pg_try_advisory_lock(hashtext(:key))"), {"key": SCAN_LOCK})
+            locked = result.scalar()
+            await conn.commit()
+            try:
+                yield locked
+            finally:
+                if locked:
+                    await conn.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), {"key": SCAN_LOCK})
+                    await conn.commit()
+
+    async def _due(self) -> bool:
+        async with self._sessions() as session:
+            result = await session.execute(
+                text("""
+                    SELECT coalesce(max(processed_until) < timezone('utc', now()) - make_interval(secs => :interval),
+                                    true)
+                    FROM rollup_watermarks
+                    WHERE name = :name
+                """),
+                {"name": SCAN_WATERMARK, "interval": self.interval},
+            )
+            return result.scalar()
+
+    async def run(self) -> None:
+        """
+        Scan if no worker has for ``interval`` and none is scanning, then
+        load the latest stored result.
+        """
+        async with self._scan_lock() as locked:
+            if locked and await self._due():
+                pairs = await self.find_pairs()
+                async with self._sessions() as session:
+                    await self.save(session, pairs)
+                    await session.commit()
+                self._scans += 1
+                logger.info("Duplicate scan found %d matching pairs", len(pairs))
+        async with self._sessions() as session:
+            await self.load(DBClient(session))
+
+    def clusters(self, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Clusters of the last scan whose pairs score at least ``threshold``.
+
+        :raises InvalidQueryError: for thresholds below the scan's.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        if threshold < self.threshold:
+            raise InvalidQueryError(f"threshold must be at least {self.threshold}")
+        clusters = self._clusters.get(threshold)
+        if clusters is None:
+            clusters = cluster_pairs(p for p in self._pairs or () if p[2] >= threshold)
+            for cluster in clusters:
+                cluster["candidates"] = [self._records[i] for i in cluster["candidate_ids"]]
+            self._clusters[threshold] = clusters
+        return clusters
+
+    def forget(self, candidate_ids: Iterable[Any]) -> None:
+        """
+        Drop merged or deleted candidates from the stored result.
+        """
+        gone = {str(i) for i in candidate_ids}
+        if self._pairs is None or not gone:
+            return
+        self._pairs = [p for p in self._pairs if str(p[0]) not in gone and str(p[1]) not in gone]
+        self._records = {k: v for k, v in self._records.items() if str(k) not in gone}
+        self._clusters = {}
+
+    async def start(self) -> None:
+        """
+        Scan now and every ``interval`` seconds in the background.
+        """
+        self._task = asyncio.get_running_loop().create_task(self._scan_periodically())
+
+    async def _scan_periodically(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                logger.exception("Duplicate scan failed")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "scans": self._scans,
+            "scanned_at": self.scanned_at,
+            "matching_pairs": len(self._pairs or ()),
+        }
+
+
+scan = DuplicateScan()
+
+
+def forget_candidates(session, candidate_ids: Iterable[Any]) -> None:
+    """
+    Drop merged or deleted candidates from the duplicate clusters once
+    ``session`` commits (right away without a session).
+    """
+    if session is None:
+        scan.forget(candidate_ids)
+        return
+    session.info.setdefault(PENDING_KEY, []).extend(candidate_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session) -> None:
+    gone = session.info.pop(PENDING_KEY, None)
+    if gone:
+        scan.forget(gone)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session) -> None:
+    session.info.pop(PENDING_KEY, None)
+
+
+async def merge_candidates(db: DBClient, survivor_id: str, duplicate_ids: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Merge ``duplicate_ids`` into ``survivor_id``.
+
+    Live and archived applications are re-pointed to the survivor, the
+    survivor's missing contact details are filled from the duplicates and
+    skills are unioned, then the duplicates are deleted. Everything runs in the caller's
+    transaction, so a failure leaves nothing half-merged.
+
+    All the candidates are locked ``FOR UPDATE`` before they are read: no
+    application can be inserted for a duplicate before it is deleted, and
+    the survivor is written at the version its merged fields were read at.
+
+    :return: The updated survivor plus ``applications_moved``, or ``None``
+        if the survivor or any duplicate does not exist.
+    :raises StaleVersionError: if the survivor was written at another
+        version than it was read at.
+    """
+    duplicate_ids = [d for d in dict.fromkeys(duplicate_ids) if d != survivor_id]
+    rows = await db.lock_table_entries("candidates", {"id__in": [survivor_id, *duplicate_ids]})
+    by_id = {str(r["id"]): r for r in rows}
+    if survivor_id not in by_id or any(d not in by_id for d in duplicate_ids):
+        return None
+
+    survivor = by_id[survivor_id]
+    update_data: Dict[str, Any] = {}
+    skills = list(survivor.get("skills") or [])
+    for dup_id in duplicate_ids:
+        duplicate = by_id[dup_id]
+        if not survivor.get("phone") and not update_data.get("phone") and duplicate.get("phone"):
+            update_data["phone"] = duplicate["phone"]
+        for skill in duplicate.get("skills") or []:
+            if skill not in skills:
+                skills.append(skill)
+    if skills != list(survivor.get("skills") or []):
+        update_data["skills"] = skills
+
+    moved = 0
+    if duplicate_ids:
+        moved = await db.update_table_entries(
+            "applications",
+            filters={"candidate_id__in": duplicate_ids},
+            update_data={"candidate_id": survivor_id},
+        )
+        moved += await db.update_table_entries(
+            "applications_archive",
+            filters={"candidate_id__in": duplicate_ids},
+            update_data={"candidate_id": survivor_id},
+        )
+        await db.delete_table_entries("candidates", filters={"id__in": duplicate_ids})
+        await skill_index.record_deleted(db.session, duplicate_ids)
+
+    merged = await db.update_table_entry(
+        "candidates",
+        identifier={"id": survivor_id},
+        update_data=update_data,
+        expected_version=survivor.get("version"),
+    )
+    forget_candidates(db.session, duplicate_ids)
+    return {**merged, "applications_moved": moved}
@@ -0,0 +1,422 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAY_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+# how often a request polls for the response of a key another worker holds
+CLAIM_POLL_INTERVAL = 0.05
+
+# POST routes that accept an Idempotency-Key
+IDEMPOTENT_PATHS = [
+    r"^/candidates/$",
+    r"^/candidates/[^/]+/applications$",
+]
+
+
+@dataclass
+class CachedResponse:
+    """
+    A fully buffered response that can be replayed for a repeated key.
+    """
+    fingerprint: str
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyStore(ABC):
+    """
+    Storage backend for idempotent responses and the keys of requests
+    still running.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        The response stored for ``key``, or ``None``.
+        """
+
+    @abstractmethod
+    async def set(self, key: str, response: CachedResponse, ttl: int) -> None:
+        """
+        Store ``response`` for ``key`` for ``ttl`` seconds, ending its claim.
+        """
+
+    @abstractmethod
+    async def claim(self, key: str, fingerprint: str, ttl: float) -> bool:
+        """
+        Reserve ``key`` for a request about to run, for at most ``ttl``
+        seconds. ``False`` if a response is stored or another request
+        holds the key.
+        """
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        """
+        Give up the claim on ``key`` of a request that stored no response.
+        """
+
+
+class InMemoryIdempotencyStore(IdempotencyStore):
+    """
+    Per-process LRU store. Replays only reach requests served by the same worker.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._cache = TTLCache(max_entries=max_entries)
+        self._claims = TTLCache(max_entries=max_entries)
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, response: CachedResponse, ttl: int) -> None:
+        self._cache.set(key, response, ttl=ttl)
+        self._claims.pop(key)
+
+    async def claim(self, key: str, fingerprint: str, ttl: float) -> bool:
+        if key in self._cache or key in self._claims:
+            return False
+        self._claims.set(key, fingerprint, ttl=ttl)
+        return True
+
+    async def release(self, key: str) -> None:
+        self._claims.pop(key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._claims.clear()
+
+
+class PostgresIdempotencyStore(IdempotencyStore):
+    """
+    Store backed by the ``idempotency_keys`` table, shared by all workers.
+
+    A claim is a row without a response yet (``status_code`` is NULL),
+    inserted with ``ON CONFLICT DO NOTHING`` semantics, so of several
+    workers receiving the same key only one runs the request. A claim
+    expires after its ``ttl``, so the key of a worker that died can be
+    claimed again.
+    """
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        from app.models.idempotency import IdempotencyKey
+
+        now = datetime.now(timezone.utc)
+        async with self._sessions() as session:
+            result = await session.execute(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.isnot(None),
+                    IdempotencyKey.expires_at > now,
+                )
+            )
+            row = result.scalars().first()
+        if row is None:
+            return None
+        return CachedResponse(
+            fingerprint=row.fingerprint,
+            status_code=row.status_code,
+            headers=[tuple(h) for h in row.headers],
+            body=row.body,
+        )
+
+    async def set(self, key: str, response: CachedResponse, ttl: int) -> None:
+        from app.models.idempotency import IdempotencyKey
+
+        values = {
+            "key": key,
+            "fingerprint": response.fingerprint,
+            "status_code": response.status_code,
+            "headers": [list(h) for h in response.headers],
+            "body": response.body,
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl),
+        }
+        stmt = insert(IdempotencyKey).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={k: v for k, v in values.items() if k != "key"},
+        )
+        async with self._sessions() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    async def claim(self, key: str, fingerprint: str, ttl: float) -> bool:
+        from app.models.idempotency import IdempotencyKey
+
+        values = {
+            "key": key,
+            "fingerprint": fingerprint,
+            "status_code": None,
+            "headers": None,
+            "body": None,
+            "created_at": func.now(),
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=ttl),
+        }
+        stmt = insert(IdempotencyKey).values(**values)
+        # only an expired row (response or claim) can be taken over
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[IdempotencyKey.key],
+            set_={k: v for k, v in values.items() if k != "key"},
+            where=IdempotencyKey.expires_at <= func.now(),
+        ).returning(IdempotencyKey.key)
+        async with self._sessions() as session:
+            result = await session.execute(stmt)
+            claimed = result.first() is not None
+            await session.commit()
+        return claimed
+
+    async def release(self, key: str) -> None:
+        from app.models.idempotency import IdempotencyKey
+
+        async with self._sessions() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                )
+            )
+            await session.commit()
+
+    async def purge_expired(self) -> int:
+        """
+        Delete expired keys. Returns the number of rows removed.
+        """
+        from app.models.idempotency import IdempotencyKey
+
+        async with self._sessions() as session:
+            result = await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.expires_at <= datetime.now(timezone.utc)
+                )
+            )
+            await session.commit()
+        return result.rowcount
+
+
+def build_store() -> IdempotencyStore:
+    """
+    Build the store selected by ``IDEMPOTENCY_BACKEND``.
+    """
+    if settings.IDEMPOTENCY_BACKEND == "postgres":
+        return PostgresIdempotencyStore()
+    return InMemoryIdempotencyStore(max_entries=settings.IDEMPOTENCY_MAX_ENTRIES)
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware implementing ``Idempotency-Key`` for selected POST routes.
+
+    The first response for a key is buffered and stored. Concurrent requests
+    with the same key wait for the in-flight original, and later retries are
+    answered from the store without reaching the route handler. Reusing a key
+    with a different request body is rejected with 422. 5xx responses are not
+    stored so the client can retry them.
+
+    Keys are scoped to the authenticated user (the token's ``sub``), so a
+    retry with a refreshed token still finds its key. Before running, the
+    original claims its key in the store: with the Postgres store, a
+    duplicate arriving at another worker polls for the stored response
+    instead of running the write again.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[IdempotencyStore] = None,
+        paths: Iterable[str] = IDEMPOTENT_PATHS,
+        ttl: Optional[int] = None,
+        wait_timeout: Optional[float] = None,
+    ):
+        self.app = app
+        self.store = store or build_store()
+        self.paths = [re.compile(p) for p in paths]
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL_SECONDS
+        self.wait_timeout = wait_timeout or settings.IDEMPOTENCY_WAIT_TIMEOUT
+        self.claim_ttl = settings.IDEMPOTENCY_CLAIM_TTL_SECONDS
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None or not any(p.match(scope["path"]) for p in self.paths):
+            return await self.app(scope, receive, send)
+
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await self._send_error(
+                send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+            )
+
+        body = await self._read_body(receive)
+        fingerprint = hashlib.sha256(
+            scope["path"].encode() + b"\0" + scope.get("query_string", b"") + b"\0" + body
+        ).hexdigest()
+        # keys are scoped to the caller so two users can't collide
+        store_key = f"{self._owner(headers)}:{key.decode('latin-1')}"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+
+        while True:
+            cached = await self.store.get(store_key)
+            if cached is not None:
+                return await self._replay(send, cached, fingerprint)
+
+            waiter = self._in_flight.get(store_key)
+            if waiter is None:
+                break
+            # if the original fails without storing a response, the loop
+            # runs again and this request becomes the new original
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                return await self._send_error(
+                    send, 409, "A request with this Idempotency-Key is still in progress"
+                )
+
+        future = loop.create_future()
+        self._in_flight[store_key] = future
+        try:
+            while not await self.store.claim(store_key, fingerprint, self.claim_ttl):
+                # another worker is running the original
+                cached = await self.store.get(store_key)
+                if cached is not None:
+                    return await self._replay(send, cached, fingerprint)
+                if loop.time() >= deadline:
+                    return await self._send_error(
+                        send, 409, "A request with this Idempotency-Key is still in progress"
+                    )
+                await asyncio.sleep(CLAIM_POLL_INTERVAL)
+
+            try:
+                response = await self._call_app(scope, body, fingerprint)
+            except BaseException:
+                await self._release(store_key)
+                raise
+            stored = False
+            if response.status_code < 500:
+                try:
+                    await self.store.set(store_key, response, self.ttl)
+                    stored = True
+                except Exception:
+                    logger.exception("Could not store idempotent response")
+            if not stored:
+                await self._release(store_key)
+        finally:
+            self._in_flight.pop(store_key, None)
+            future.set_result(None)
+
+        await self._send(send, response.status_code, response.headers, response.body)
+
+    @staticmethod
+    def _owner(headers: Dict[bytes, bytes]) -> str:
+        """
+        Who the key belongs to: the token's subject, or for a request
+        without a valid token (which the route will refuse) a hash of its
+        ``Authorization`` header.
+        """
+        from app.core.security import token_subject
+
+        authorization = headers.get(b"authorization", b"")
+        subject = token_subject(authorization.decode("latin-1"))
+        if subject is not None:
+            return f"sub:{subject}"
+        return hashlib.sha256(authorization).hexdigest()[:32]
+
+    async def _release(self, key: str) -> None:
+        try:
+            await self.store.release(key)
+        except Exception:
+            # the claim expires after IDEMPOTENCY_CLAIM_TTL_SECONDS
+            logger.exception("Could not release idempotency key")
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+
+    async def _call_app(self, scope, body: bytes, fingerprint: str) -> CachedResponse:
+        sent = False
+        status_code = 500
+        headers: List[Tuple[str, str]] = []
+        chunks: List[bytes] = []
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {"type": "http.disconnect"}
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal status_code, headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = [
+                    (k.decode("latin-1"), v.decode("latin-1"))
+                    for k, v in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return CachedResponse(fingerprint, status_code, headers, b"".join(chunks))
+
+    async def _replay(self, send, cached: CachedResponse, fingerprint: str):
+        if cached.fingerprint != fingerprint:
+            return await self._send_error(
+                send, 422, "Idempotency-Key was already used with a different request"
+            )
+        headers = cached.headers + [(REPLAY_HEADER.decode(), "true")]
+        await self._send(send, cached.status_code, headers, cached.body)
+
+    async def _send_error(self, send, status_code: int, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            ("content-type", "application/json"),
+            ("content-length", str(len(body))),
+        ]
+        await self._send(send, status_code, headers, body)
+
+    @staticmethod
+    async def _send(send, status_code: int, headers, body: bytes):
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
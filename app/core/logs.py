@@ -0,0 +1,268 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+request_logger = logging.getLogger("app.request")
+sql_logger = logging.getLogger("app.sql")
+
+REQUEST_ID_HEADER = "x-request-id"
+# incoming request ids are echoed into logs, so only accept sane ones
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# attributes every LogRecord has; anything else was passed with ``extra=``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class RequestContext:
+    """
+    Per-request state shared by the middleware and the engine events.
+
+    Stored in a context variable, so it follows the request into tasks
+    and into SQLAlchemy's greenlets, which run in the caller's context.
+    """
+
+    __slots__ = ("request_id", "db_seconds", "db_queries")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.db_seconds = 0.0
+        self.db_queries = 0
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    context = _request_context.get()
+    return context.request_id if context is not None else None
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamp records with the current request id.
+
+    Runs in the thread that logs, before the record is queued, so
+    the id is taken from the right context.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, request id,
+    any ``extra=`` fields and the formatted exception, if any.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The stock ``prepare`` formats the message (and traceback) on the event
+    loop; here only the arguments are merged and the traceback rendered,
+    since exception objects may not outlive the frame.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # other handlers still see the original record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> None:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    The event loop only enqueues records; formatting and the blocking write
+    to ``stream`` (stdout by default) happen on the listener thread. Replaces
+    the root logger's handlers, so uvicorn's loggers (which propagate to the
+    root when started with ``log_config=None``) go through it too. Calling
+    it again reconfigures.
+    """
+    global _listener
+    level = (level or settings.LOG_LEVEL).upper()
+    fmt = fmt or settings.LOG_FORMAT
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"))
+
+    handler = _PreformattedQueueHandler(queue.SimpleQueue())
+    handler.addFilter(ContextFilter())
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        if isinstance(existing, logging.handlers.QueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+
+
+def stop_logging() -> None:
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving every request an id and logging one line per request.
+
+    The id is taken from an incoming ``X-Request-ID`` header if present and
+    returned in the response's ``X-Request-ID``. The request line carries
+    the method, path, status, total duration and the time spent in and
+    number of database round trips.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.match(candidate):
+                    request_id = candidate
+                break
+        context = RequestContext(request_id or uuid.uuid4().hex)
+        token = _request_context.set(context)
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [
+                    (name, value) for name, value in message.get("headers", []) if name.lower() != b"x-request-id"
+                ]
+                headers.append((REQUEST_ID_HEADER.encode(), context.request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            self._log(scope, 500, start, context, exc_info=True)
+            raise
+        else:
+            self._log(scope, status, start, context)
+        finally:
+            _request_context.reset(token)
+
+    @staticmethod
+    def _log(scope, status: int, start: float, context: RequestContext, exc_info: bool = False) -> None:
+        request_logger.log(
+            logging.ERROR if status >= 500 else logging.INFO,
+            "%s %s %d",
+            scope["method"],
+            scope["path"],
+            status,
+            exc_info=exc_info,
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                "db_ms": round(context.db_seconds * 1000, 2),
+                "db_queries": context.db_queries,
+            },
+        )
+
+
+# ----- Database timing -----
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    context._log_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_timing(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_log_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+
+    request = _request_context.get()
+    if request is not None:
+        request.db_seconds += elapsed
+        request.db_queries += 1
+
+    slow = settings.SQL_SLOW_QUERY_MS > 0 and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS
+    if slow or (settings.SQL_LOG_SAMPLE_RATE > 0 and random.random() < settings.SQL_LOG_SAMPLE_RATE):
+        # parameters are left out: they may hold credentials or personal data
+        sql_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            "slow query" if slow else "query",
+            extra={
+                "statement": " ".join(statement.split()),
+                "duration_ms": round(elapsed * 1000, 2),
+                "executemany": executemany,
+            },
+        )
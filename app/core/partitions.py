@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import result_cache
+from app.core.config import settings
+from app.models.application import Application, ApplicationArchive, CLOSED_STATUSES
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = ["id", "candidate_id", "job_title", "status", "applied_at", "version"]
+
+# advisory lock key serializing partition creation across workers
+PARTITIONS_LOCK = "ensure_applications_partitions"
+
+
+async def ensure_partitions(session: AsyncSession, months_ahead: Optional[int] = None) -> int:
+    """
+    Create the monthly ``applications`` partitions that don't exist yet, up to
+    ``months_ahead`` months from now. Rows that landed in the default
+    partition are moved into the new partitions.
+
+    Uses the ``ensure_applications_partitions`` SQL function installed by the
+    partitioning migration. Every worker runs this at startup, so a
+    transaction-level advisory lock makes them take turns: the others wait,
+    then find the partitions already there. Returns the number of
+    partitions created.
+    """
+    months_ahead = settings.APPLICATION_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    await session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": PARTITIONS_LOCK})
+    result = await session.execute(
+        text("SELECT ensure_applications_partitions(:months_ahead)"),
+        {"months_ahead": months_ahead},
+    )
+    return result.scalar_one()
+
+
+def archive_batch_statement(cutoff: datetime, batch_size: int):
+    """
+    One ``DELETE ... RETURNING`` / ``INSERT`` statement moving up to
+    ``batch_size`` closed applications applied before ``cutoff`` to the archive.
+    """
+    victims = (
+        select(Application.id, Application.applied_at)
+        .where(
+            Application.status.in_(CLOSED_STATUSES),
+            Application.applied_at < cutoff,
+        )
+        .limit(batch_size)
+    )
+    moved = (
+        delete(Application)
+        .where(tuple_(Application.id, Application.applied_at).in_(victims))
+        .returning(*[getattr(Application, c) for c in ARCHIVED_COLUMNS])
+        .cte("moved")
+    )
+    return insert(ApplicationArchive).from_select(
+        ARCHIVED_COLUMNS,
+        select(*[moved.c[c] for c in ARCHIVED_COLUMNS]),
+    )
+
+
+async def archive_closed_applications(
+    session_factory,
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    pause: float = 0.0,
+) -> int:
+    """
+    Move REJECTED/HIRED applications older than ``retention_days`` to
+    ``applications_archive``.
+
+    Each batch is its own short transaction so live status updates are never
+    blocked for long. Returns the total number of applications archived.
+    """
+    retention_days = settings.APPLICATION_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    total = 0
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(archive_batch_statement(cutoff, batch_size))
+            if result.rowcount:
+                await result_cache.table_written(session, Application.__tablename__)
+                await result_cache.table_written(session, ApplicationArchive.__tablename__)
+            await session.commit()
+        moved = result.rowcount
+        total += moved
+        if moved:
+            logger.info("Archived %d applications (%d total)", moved, total)
+        if moved < batch_size:
+            return total
+        if pause:
+            await asyncio.sleep(pause)
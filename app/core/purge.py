@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import exc, text
+
+from app.core import analytics, dedupe, skill_index
+from app.core.config import settings
+from app.core.db_client import DBClient, StaleVersionError
+from app.core.query import InvalidQueryError
+
+logger = logging.getLogger(__name__)
+
+# Postgres "lock_not_available", raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = "55P03"
+
+
+def is_lock_timeout(error: BaseException) -> bool:
+    orig = getattr(error, "orig", error)
+    return getattr(orig, "sqlstate", None) == LOCK_NOT_AVAILABLE
+
+
+async def delete_candidates(db: DBClient, candidate_ids: List[str]) -> Dict[str, int]:
+    """
+    Delete candidates with their live and archived applications and those
+    applications' status history, in the caller's transaction.
+
+    The candidates are locked ``FOR UPDATE`` first, so no application can
+    be inserted for them between deleting their applications and deleting
+    them.
+
+    :return: Rows deleted per table.
+    """
+    await db.lock_table_entries("candidates", {"id__in": candidate_ids}, fields=["id"])
+    application_ids = []
+    for table_name in ("applications", "applications_archive"):
+        rows = await db.query_table_data(table_name, filters={"candidate_id__in": candidate_ids}, fields=["id"])
+        application_ids += [row["id"] for row in rows]
+    deleted = {
+        "applications": await db.delete_table_entries("applications", {"candidate_id__in": candidate_ids}),
+        "applications_archive": await db.delete_table_entries(
+            "applications_archive", {"candidate_id__in": candidate_ids}
+        ),
+        "candidates": await db.delete_table_entries("candidates", {"id__in": candidate_ids}),
+    }
+    await analytics.forget_applications(db.session, application_ids)
+    await skill_index.record_deleted(db.session, candidate_ids)
+    skill_index.candidates_deleted(db.session, candidate_ids)
+    dedupe.forget_candidates(db.session, candidate_ids)
+    return deleted
+
+
+async def delete_applications(
+    db: DBClient,
+    application_ids: List[str],
+    expected_version: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Delete live applications with their status history, in the caller's
+    transaction.
+
+    :param expected_version: Only delete the application at this version
+        (one id).
+    """
+    filters: Dict[str, Any] = {"id__in": application_ids}
+    if expected_version is not None:
+        filters["version"] = expected_version
+    deleted = await db.delete_table_entries("applications", filters)
+    if deleted:
+        await analytics.forget_applications(db.session, application_ids)
+    return {"applications": deleted}
+
+
+# tables that can be purged, with the function deleting a batch of their ids
+DELETERS = {
+    "candidates": delete_candidates,
+    "applications": delete_applications,
+}
+
+
+async def delete_by_id(
+    db: DBClient,
+    table_name: str,
+    row_id: str,
+    expected_version: Optional[int] = None,
+) -> Optional[Dict[str, int]]:
+    """
+    Delete one candidate or application (with what depends on it).
+
+    The version is checked by the statement that takes the row, so a write
+    committed in between makes the delete fail rather than being lost. An
+    application is deleted ``WHERE version = :expected``. A candidate can
+    only go after the applications referencing it, so it is first locked
+    ``FOR UPDATE`` and its version checked under that lock, which holds
+    until the transaction ends.
+
+    :return: Rows deleted per table, or ``None`` if the row does not exist.
+    :raises StaleVersionError: if ``expected_version`` is given and the row
+        is at another version.
+    """
+    if table_name == "candidates":
+        locked = await db.lock_table_entries("candidates", {"id": row_id}, fields=["version"])
+        if not locked:
+            return None
+        if expected_version is not None and locked[0]["version"] != expected_version:
+            raise StaleVersionError(locked[0]["version"])
+        return await delete_candidates(db, [row_id])
+
+    deleted = await delete_applications(db, [row_id], expected_version=expected_version)
+    if deleted["applications"]:
+        return deleted
+    if expected_version is not None:
+        # only on the failure path: tell "gone" apart from "changed"
+        current = await db.query_table_data(
+            table_name, filters={"id": row_id}, single_row=True, fields=["version"]
+        )
+        if current is not None:
+            raise StaleVersionError(current["version"])
+    return None
+
+
+@dataclass
+class PurgeProgress:
+    table_name: str
+    batches: int = 0
+    deleted: Counter = field(default_factory=Counter)
+    # keyset position: the purge continues after this id
+    last_id: Optional[str] = None
+    started_at: float = field(default_factory=time.monotonic)
+    done: bool = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "table": self.table_name,
+            "batches": self.batches,
+            "deleted": dict(self.deleted),
+            "last_id": self.last_id,
+            "elapsed_seconds": round(time.monotonic() - self.started_at, 3),
+            "done": self.done,
+        }
+
+
+async def purge(
+    session_factory,
+    table_name: str,
+    filters: Dict[str, Any],
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> AsyncIterator[PurgeProgress]:
+    """
+    Delete every row of ``table_name`` matching ``filters`` in batches.
+
+    Rows are visited in ``id`` order (keyset pagination, so deleted rows are
+    never rescanned) and each batch of ``batch_size`` ids is deleted in its
+    own short transaction under ``PURGE_LOCK_TIMEOUT_MS``: a batch waiting
+    on a lock held by live traffic gives up, and is retried after ``pause``,
+    instead of queueing other writers behind it. Progress is yielded after
+    every batch; batches already committed stay deleted if the purge stops,
+    so running it again continues where it left off.
+
+    :raises InvalidQueryError: for an unknown table, a bad filter or no filter.
+    """
+    if table_name not in DELETERS:
+        raise InvalidQueryError(f"Cannot purge table: {table_name}")
+    if not filters:
+        raise InvalidQueryError("Refusing to purge a whole table without filters")
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    pause = settings.PURGE_PAUSE_SECONDS if pause is None else pause
+
+    progress = PurgeProgress(table_name)
+    while True:
+        ids, deleted = await _delete_batch(session_factory, table_name, filters, progress.last_id, batch_size, pause)
+        if ids:
+            progress.batches += 1
+            progress.deleted.update(deleted)
+            progress.last_id = ids[-1]
+            logger.info(
+                "Purged %d %s (%d total)", deleted[table_name], table_name, progress.deleted[table_name]
+            )
+        progress.done = len(ids) < batch_size
+        yield progress
+        if progress.done:
+            return
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def _delete_batch(
+    session_factory,
+    table_name: str,
+    filters: Dict[str, Any],
+    last_id: Optional[str],
+    batch_size: int,
+    pause: float,
+) -> Tuple[List[str], Dict[str, int]]:
+    batch_filters = {**filters, "id__gt": last_id} if last_id else filters
+    for attempt in range(settings.PURGE_LOCK_RETRIES + 1):
+        try:
+            async with session_factory() as session:
+                if settings.PURGE_LOCK_TIMEOUT_MS > 0:
+                    await session.execute(text(f"SET LOCAL lock_timeout = {int(settings.PURGE_LOCK_TIMEOUT_MS)}"))
+                db = DBClient(session)
+                rows = await db.query_table_data(
+                    table_name, filters=batch_filters, order_by=["id"], limit=batch_size, fields=["id"]
+                )
+                ids = [str(r["id"]) for r in rows]
+                deleted = await DELETERS[table_name](db, ids) if ids else {}
+                await session.commit()
+            return ids, deleted
+        except exc.DBAPIError as e:
+            if not is_lock_timeout(e) or attempt == settings.PURGE_LOCK_RETRIES:
+                raise
+            logger.warning("Purge batch of %s waited too long for a lock, retrying", table_name)
+            await asyncio.sleep(max(pause, 0.1) * (attempt + 1))
+
+
+async def progress_lines(
+    session_factory,
+    table_name: str,
+    filters: Dict[str, Any],
+    batch_size: Optional[int] = None,
+    pause: Optional[float] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Run ``purge`` as newline-delimited JSON progress, one line per batch,
+    for a streamed response.
+
+    The first batch runs before this returns, so bad filters raise here
+    and not halfway through a response. A failure after that ends the
+    stream with a line carrying ``error``.
+    """
+    batches = purge(session_factory, table_name, filters, batch_size=batch_size, pause=pause)
+    first = await anext(batches)
+
+    async def lines():
+        progress = first
+        try:
+            yield json.dumps(progress.as_dict()).encode() + b"\n"
+            async for progress in batches:
+                yield json.dumps(progress.as_dict()).encode() + b"\n"
+        except Exception as e:
+            logger.exception("Purge of %s failed after %d batches", table_name, progress.batches)
+            yield json.dumps({**progress.as_dict(), "error": str(e)}).encode() + b"\n"
+
+    return lines()
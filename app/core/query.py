@@ -0,0 +1,391 @@
+import base64
+import binascii
+import enum
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from sqlalchemy import all_, any_, bindparam, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+# separator between a column name and its operator, e.g. ``applied_at__gte``
+OPERATOR_SEPARATOR = "__"
+
+# separator of the columns of a row comparison, e.g. ``applied_at,id__lt``
+ROW_SEPARATOR = ","
+
+# operators a row comparison supports
+ROW_OPERATORS = ("gt", "gte", "lt", "lte")
+
+OPERATORS = {
+    "eq", "ne", "in", "not_in", "gt", "gte", "lt", "lte",
+    "range", "prefix", "isnull", "contains",
+}
+
+TRUE_VALUES = ("true", "1", "t", "yes")
+FALSE_VALUES = ("false", "0", "f", "no")
+
+# escape character for ``prefix`` LIKE patterns
+LIKE_ESCAPE = "/"
+
+
+class InvalidQueryError(ValueError):
+    """
+    Raised for filters, orderings or fields that don't match the model.
+    """
+
+
+def split_filter_key(key: str):
+    """
+    Split ``"applied_at__gte"`` into ``("applied_at", "gte")``.
+    """
+    column, sep, op = key.rpartition(OPERATOR_SEPARATOR)
+    if sep and op in OPERATORS:
+        return column, op
+    return key, "eq"
+
+
+def get_column(model_class: Type, name: str):
+    """
+    Return the table column ``name`` of ``model_class``.
+
+    This is the Core column, not the mapped attribute, so statements built
+    from it alone are executed without ORM loading.
+
+    :raises InvalidQueryError: if the model has no such column.
+    """
+    columns = model_class.__table__.columns
+    if name not in columns:
+        raise InvalidQueryError(f"Unknown field '{name}' for {model_class.__tablename__}")
+    return columns[name]
+
+
+def get_row_columns(model_class: Type, name: str, op: str) -> list:
+    """
+    Columns of a row comparison such as ``applied_at,id``.
+
+    :raises InvalidQueryError: for unknown columns or unsupported operators.
+    """
+    if op not in ROW_OPERATORS:
+        raise InvalidQueryError(f"'{op}' is not supported on rows ('{name}')")
+    return [get_column(model_class, n) for n in name.split(ROW_SEPARATOR)]
+
+
+def coerce_value(column, value: Any) -> Any:
+    """
+    Convert a query-string value to the column's Python type.
+
+    Non-string values are assumed to already have the right type.
+    """
+    if not isinstance(value, str):
+        return value
+
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+
+    try:
+        if python_type is str:
+            return value
+        if python_type is bool:
+            return _parse_bool(value)
+        if python_type is datetime:
+            parsed = datetime.fromisoformat(value)
+            # naive columns compare against naive values
+            if parsed.tzinfo is not None and not getattr(column.type, "timezone", False):
+                parsed = parsed.replace(tzinfo=None)
+            return parsed
+        if python_type is date:
+            return date.fromisoformat(value)
+        if python_type is uuid.UUID:
+            return uuid.UUID(value)
+        if issubclass(python_type, enum.Enum):
+            return python_type(value)
+        return python_type(value)
+    except (TypeError, ValueError):
+        raise InvalidQueryError(f"Invalid value '{value}' for field '{column.key}'")
+
+
+def _parse_bool(value: str) -> bool:
+    lowered = value.lower()
+    if lowered not in TRUE_VALUES + FALSE_VALUES:
+        raise ValueError(value)
+    return lowered in TRUE_VALUES
+
+
+def _as_list(value: Any) -> List[Any]:
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def _escape_like(value: str) -> str:
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
+
+
+def param_name(key: str, suffix: str = "") -> str:
+    """
+    Bound parameter name for filter ``key``, clear of column names used in SET clauses.
+    """
+    return f"filter_{key.replace(ROW_SEPARATOR, OPERATOR_SEPARATOR)}{suffix}"
+
+
+def filter_shape(key: str, value: Any) -> Tuple:
+    """
+    The part of a filter that changes the SQL rather than just its parameters.
+
+    For most operators this is only the key; ``isnull`` and comparisons with
+    ``None`` render different SQL depending on the value.
+    """
+    _, op = split_filter_key(key)
+    if op == "isnull":
+        try:
+            return key, _parse_bool(value) if isinstance(value, str) else bool(value)
+        except ValueError:
+            raise InvalidQueryError(f"Invalid value '{value}' for '{key}'")
+    if op in ("eq", "ne"):
+        return key, value is None
+    return (key,)
+
+
+def filter_params(model_class: Type, key: str, value: Any) -> Dict[str, Any]:
+    """
+    Coerced bound parameter values for one ``column[__op]`` filter, matching
+    the placeholders of ``filter_template``.
+
+    :raises InvalidQueryError: for unknown columns or malformed values.
+    """
+    name, op = split_filter_key(key)
+    if ROW_SEPARATOR in name:
+        columns = get_row_columns(model_class, name, op)
+        values = _as_list(value)
+        if len(values) != len(columns):
+            raise InvalidQueryError(f"'{key}' needs exactly {len(columns)} values")
+        return {
+            param_name(key, f"_{i}"): coerce_value(column, v)
+            for i, (column, v) in enumerate(zip(columns, values))
+        }
+    column = get_column(model_class, name)
+
+    if op == "isnull":
+        return {}
+
+    if op == "contains":
+        if not isinstance(column.type, JSONB):
+            raise InvalidQueryError(f"'contains' is only supported on JSON fields, not '{name}'")
+        return {param_name(key): _as_list(value)}
+
+    if op in ("in", "not_in"):
+        return {param_name(key): [coerce_value(column, v) for v in _as_list(value)]}
+
+    if op == "range":
+        bounds = _as_list(value)
+        if len(bounds) != 2:
+            raise InvalidQueryError(f"'range' on '{name}' needs exactly two values")
+        low, high = (coerce_value(column, v) for v in bounds)
+        return {param_name(key, "_low"): low, param_name(key, "_high"): high}
+
+    if op == "prefix":
+        return {param_name(key): _escape_like(str(value)) + "%"}
+
+    value = coerce_value(column, value)
+    if value is None and op in ("eq", "ne"):
+        return {}
+    return {param_name(key): value}
+
+
+def filter_template(model_class: Type, shape: Tuple):
+    """
+    WHERE clause for a filter of the given ``filter_shape``, with named bound
+    parameters in place of values.
+
+    ``in``/``not_in`` compare against one array parameter (``= ANY``/``!= ALL``),
+    so the SQL text doesn't change with the number of values and the
+    prepared statement can be reused.
+    """
+    key = shape[0]
+    name, op = split_filter_key(key)
+    if ROW_SEPARATOR in name:
+        return _row_comparison(key, op, get_row_columns(model_class, name, op))
+    column = get_column(model_class, name)
+
+    def param(suffix: str = "", type_=column.type):
+        return bindparam(param_name(key, suffix), type_=type_)
+
+    if op == "isnull":
+        return column.is_(None) if shape[1] else column.is_not(None)
+    if op == "contains":
+        if not isinstance(column.type, JSONB):
+            raise InvalidQueryError(f"'contains' is only supported on JSON fields, not '{name}'")
+        return column.contains(param())
+    if op == "in":
+        return column == any_(param(type_=ARRAY(column.type)))
+    if op == "not_in":
+        return column != all_(param(type_=ARRAY(column.type)))
+    if op == "range":
+        return column.between(param("_low"), param("_high"))
+    if op == "prefix":
+        return column.like(param(), escape=LIKE_ESCAPE)
+    if op == "eq":
+        return column.is_(None) if shape[1] else column == param()
+    if op == "ne":
+        return column.is_not(None) if shape[1] else column != param()
+    if op == "gt":
+        return column > param()
+    if op == "gte":
+        return column >= param()
+    if op == "lt":
+        return column < param()
+    return column <= param()
+
+
+def _row_comparison(key: str, op: str, columns: list):
+    # (a, b) < (:a, :b), which Postgres resolves on an index on (a, b)
+    row = tuple_(*columns)
+    params = tuple_(*(bindparam(param_name(key, f"_{i}"), type_=c.type) for i, c in enumerate(columns)))
+    if op == "gt":
+        return row > params
+    if op == "gte":
+        return row >= params
+    if op == "lt":
+        return row < params
+    return row <= params
+
+
+def build_filter_clause(model_class: Type, key: str, value: Any):
+    """
+    Build a WHERE clause for one ``column[__op]`` filter, with its values bound.
+
+    Supported operators: ``eq`` (default), ``ne``, ``in``, ``not_in``,
+    ``gt``, ``gte``, ``lt``, ``lte``, ``range`` (inclusive ``[low, high]``),
+    ``prefix``, ``isnull`` and ``contains`` (JSONB containment). Comparisons
+    also work on rows of columns, e.g. ``applied_at,id__lt`` with two
+    values, for keyset pagination.
+
+    :raises InvalidQueryError: for unknown columns or malformed values.
+    """
+    params = filter_params(model_class, key, value)
+    clause = filter_template(model_class, filter_shape(key, value))
+    return clause.params(params) if params else clause
+
+
+def prepare_filters(model_class: Type, filters: Optional[Dict[str, Any]]) -> Tuple[Tuple, Dict[str, Any]]:
+    """
+    Shapes (in sorted key order) and bound parameter values for ``filters``.
+
+    The shapes identify the SQL of the WHERE clause independently of the
+    values, so they can key a statement cache.
+    """
+    shapes = []
+    params: Dict[str, Any] = {}
+    for key in sorted(filters or ()):
+        shapes.append(filter_shape(key, filters[key]))
+        params.update(filter_params(model_class, key, filters[key]))
+    return tuple(shapes), params
+
+
+def build_filter_clauses(model_class: Type, filters: Optional[Dict[str, Any]]) -> list:
+    """
+    WHERE clauses for all ``filters``, in a stable (sorted) key order.
+    """
+    if not filters:
+        return []
+    return [build_filter_clause(model_class, key, filters[key]) for key in sorted(filters)]
+
+
+def build_order_by(model_class: Type, order_by: Optional[Iterable[str]]) -> list:
+    """
+    ORDER BY clauses for names like ``"full_name"`` or ``"-applied_at"`` (descending).
+    """
+    clauses = []
+    for name in order_by or ():
+        descending = name.startswith("-")
+        column = get_column(model_class, name.lstrip("-+"))
+        clauses.append(column.desc() if descending else column.asc())
+    return clauses
+
+
+def resolve_fields(model_class: Type, fields: Optional[Iterable[str]]) -> list:
+    """
+    Columns to select for a sparse fieldset, in the requested order.
+    """
+    columns = []
+    for name in dict.fromkeys(fields or ()):
+        columns.append(get_column(model_class, name))
+    return columns
+
+
+def split_list_param(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma separated query parameter such as ``fields=id,full_name``.
+    """
+    if not value:
+        return None
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def filters_from_query_params(query_params, reserved: Iterable[str]) -> Dict[str, Any]:
+    """
+    Collect ``column[__op]=value`` query parameters into a filter dict,
+    skipping the endpoint's own (``reserved``) parameters.
+    """
+    reserved = set(reserved)
+    filters = {}
+    for key, value in query_params.multi_items():
+        if key in reserved:
+            continue
+        filters[key] = value
+    return filters
+
+
+def encode_cursor(values: Iterable[Any]) -> str:
+    """
+    Opaque pagination cursor holding the sort key of the last row of a page.
+    """
+    values = [v.isoformat() if isinstance(v, (datetime, date)) else str(v) for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[str]:
+    """
+    Values of a cursor made by ``encode_cursor``, to use in a row comparison.
+
+    :raises InvalidQueryError: for malformed cursors.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidQueryError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise InvalidQueryError("Invalid cursor")
+    return values
+
+
+def _sort_key(value: Any) -> Tuple:
+    if value is None:
+        return (True, 0)
+    if isinstance(value, enum.Enum):
+        # Postgres orders enum values as they were declared
+        return (False, type(value)._member_names_.index(value.name))
+    return (False, value)
+
+
+def sort_rows(rows: List[Dict[str, Any]], order_by: Optional[Iterable[str]]) -> List[Dict[str, Any]]:
+    """
+    Sort already fetched rows the way ``build_order_by`` would, for results
+    combined from more than one query. As in Postgres, NULLs sort as the
+    largest value (last ascending, first descending) and enums in
+    declaration order.
+    """
+    rows = list(rows)
+    # stable sorts applied from the least to the most significant key
+    for name in reversed(list(order_by or ())):
+        key = name.lstrip("-+")
+        rows.sort(key=lambda r: _sort_key(r.get(key)), reverse=name.startswith("-"))
+    return rows
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import jwt
+
+from app.core import revocation
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# paths that are never limited, so docs and monitoring stay reachable under load
+EXEMPT_PREFIXES = ("/docs", "/redoc", "/openapi.json", "/monitoring")
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at ``rate`` tokens per second.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def try_acquire(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """
+        Take ``cost`` tokens if available.
+
+        :return: ``(allowed, retry_after_seconds)``.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+
+        if cost > self.capacity or self.rate <= 0:
+            return False, float("inf")
+        return False, (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Per-client token buckets with per-route token costs.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        route_weights: Optional[Dict[str, float]] = None,
+        max_clients: int = 100_000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        # longest prefix wins, so sort once here instead of on every request
+        self.route_weights: List[Tuple[str, str, float]] = sorted(
+            (
+                (rule.split(" ", 1)[0].upper(), rule.split(" ", 1)[1], float(weight))
+                for rule, weight in (route_weights or {}).items()
+            ),
+            key=lambda r: len(r[1]),
+            reverse=True,
+        )
+        # idle buckets are refilled anyway, so expiring them loses nothing
+        idle_ttl = burst / rate if rate > 0 else None
+        self._buckets = TTLCache(max_entries=max_clients, ttl=idle_ttl)
+        self.allowed = 0
+        self.rejected = 0
+        self.rejected_by_route: Counter = Counter()
+
+    def rule_for(self, method: str, path: str) -> Tuple[str, float]:
+        """
+        The weight rule matching the request, as ``(label, weight)``.
+
+        Labels are the configured rules (or ``METHOD *`` when none match),
+        so counting by them stays bounded whatever ids the paths carry.
+        """
+        for rule_method, prefix, weight in self.route_weights:
+            if rule_method in (method, "*") and path.startswith(prefix):
+                return f"{rule_method} {prefix}", weight
+        return f"{method} *", 1.0
+
+    def weight_for(self, method: str, path: str) -> float:
+        return self.rule_for(method, path)[1]
+
+    def check(self, client_id: str, method: str, path: str) -> Tuple[bool, float]:
+        """
+        Charge the request to ``client_id``'s bucket.
+
+        :return: ``(allowed, retry_after_seconds)``.
+        """
+        rule, weight = self.rule_for(method, path)
+        return self.charge(client_id, weight, rule)
+
+    def charge(self, client_id: str, weight: float, label: str) -> Tuple[bool, float]:
+        """
+        Take ``weight`` tokens from ``client_id``'s bucket, counting a
+        rejection under ``label``.
+
+        :return: ``(allowed, retry_after_seconds)``.
+        """
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+        self._buckets.set(client_id, bucket)
+
+        allowed, retry_after = bucket.try_acquire(weight)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+            self.rejected_by_route[label] += 1
+        return allowed, retry_after
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tracked_clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "rejected_by_route": dict(self.rejected_by_route.most_common(20)),
+        }
+
+    def reset(self) -> None:
+        self._buckets.clear()
+        self.allowed = 0
+        self.rejected = 0
+        self.rejected_by_route.clear()
+
+
+class AdmissionController:
+    """
+    Global cap on concurrently executing requests.
+
+    The cap is tied to the DB pool size, so requests that could not get a
+    connection anyway are turned away after a short wait instead of queueing
+    until ``pool_timeout``.
+    """
+
+    def __init__(self, max_in_flight: int, timeout: float):
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def client_id_from_scope(scope) -> str:
+    """
+    Identify the caller by the JWT subject, falling back to the client address.
+
+    Only the signature and the revocation list are checked here; invalid
+    tokens are still rejected by ``get_current_user`` further down.
+    """
+    headers = dict(scope["headers"])
+    auth = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = auth.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+            if payload.get("sub") and not revocation.revocations.is_revoked(payload):
+                return f"user:{payload['sub']}"
+        except jwt.PyJWTError:
+            pass
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+limiter = RateLimiter(
+    rate=settings.RATE_LIMIT_PER_SECOND,
+    burst=settings.RATE_LIMIT_BURST,
+    route_weights=json.loads(settings.RATE_LIMIT_ROUTE_WEIGHTS),
+)
+
+admission = AdmissionController(
+    max_in_flight=settings.MAX_IN_FLIGHT_REQUESTS or (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW),
+    timeout=settings.ADMISSION_TIMEOUT,
+)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying per-user rate limits and global admission control.
+
+    Rate limited requests get 429, requests rejected for capacity get 503;
+    both carry a ``Retry-After`` header.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[RateLimiter] = None,
+        admission: Optional[AdmissionController] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.admission = admission
+        self.enabled = settings.RATE_LIMIT_ENABLED if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not self.enabled
+            or scope["type"] != "http"
+            or scope["path"].startswith(EXEMPT_PREFIXES)
+        ):
+            return await self.app(scope, receive, send)
+
+        # resolved lazily so the module-level instances can be swapped in tests
+        rate_limiter = self.limiter or limiter
+        admission_controller = self.admission or admission
+
+        allowed, retry_after = rate_limiter.check(
+            client_id_from_scope(scope), scope["method"], scope["path"]
+        )
+        if not allowed:
+            return await _reject(send, 429, "Rate limit exceeded", retry_after)
+
+        if not await admission_controller.acquire():
+            return await _reject(send, 503, "Server is at capacity, retry shortly", 1)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release()
+
+
+def retry_after_header(retry_after: float) -> str:
+    """
+    ``Retry-After`` value in whole seconds (an hour when never).
+    """
+    return str(3600 if math.isinf(retry_after) else max(1, math.ceil(retry_after)))
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", retry_after_header(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# headers describing the serialized body, set by the response itself
+BODY_HEADERS = ("content-length", "content-type")
+
+# delays between attempts to reopen a dropped invalidation channel
+RECONNECT_INITIAL_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+# session.info key collecting the tables written in the current transaction
+WRITTEN_TABLES_KEY = "written_tables"
+
+
+class TableVersions:
+    """
+    Per-table write counters. A cached result is only valid while the
+    versions of the tables it was read from are unchanged.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def bump(self, *tables: str) -> None:
+        for table in tables:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def snapshot(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions.get(table, 0) for table in tables)
+
+
+@dataclass
+class CachedResult:
+    tables: Tuple[str, ...]
+    versions: Tuple[int, ...]
+    body: bytes
+    headers: Dict[str, str]
+    expires_at: float
+
+
+@dataclass
+class CacheLookup:
+    """
+    Outcome of ``ResultCache.lookup``: a ready response on a hit, otherwise
+    what ``ResultCache.store`` needs to cache the freshly computed result.
+    """
+    key: Optional[str]
+    tables: Tuple[str, ...]
+    versions: Tuple[int, ...]
+    response: Optional[Response] = None
+
+
+class ResultCache:
+    """
+    LRU cache of serialized list responses, bounded by total body size.
+
+    Entries are keyed by route and normalized query parameters and remember
+    the versions of the tables they were read from; any write to one of
+    those tables makes them stale. Entries also expire after ``ttl``
+    seconds, as a backstop for writes made outside this process.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.max_bytes = settings.RESULT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.ttl = settings.RESULT_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.enabled = settings.RESULT_CACHE_ENABLED if enabled is None else enabled
+        self.versions = TableVersions()
+        # False while a configured cross-worker channel is down
+        self.coherent = True
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def cache_key(request: Request) -> str:
+        """
+        Route path plus query parameters in sorted order, ignoring empty values.
+        """
+        params = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+        return f"{request.url.path}?{urlencode(params)}"
+
+    def lookup(self, request: Request, tables: Iterable[str]) -> CacheLookup:
+        """
+        Look up the cached response for ``request``, which reads ``tables``.
+
+        Call this before running the query: the table versions are captured
+        here, so a write racing with the query invalidates the stored result.
+        """
+        tables = tuple(tables)
+        versions = self.versions.snapshot(tables)
+        if not (self.enabled and self.coherent):
+            return CacheLookup(None, tables, versions)
+
+        key = self.cache_key(request)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.versions == self.versions.snapshot(entry.tables) and entry.expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                response = Response(entry.body, media_type="application/json", headers=entry.headers)
+                response.headers["X-Cache"] = "hit"
+                return CacheLookup(key, tables, versions, response)
+            self._remove(key)
+        self._misses += 1
+        return CacheLookup(key, tables, versions)
+
+    def store(self, lookup: CacheLookup, content: Any, response: Optional[Response] = None) -> Response:
+        """
+        Serialize ``content`` once, cache the bytes and return them as the response.
+
+        Headers set on the endpoint's ``response`` (listing totals, ETag,
+        Cache-Control, ...) are kept, and replayed on hits.
+        """
+        headers = {}
+        if response is not None:
+            headers = {k: v for k, v in response.headers.items() if k not in BODY_HEADERS}
+        result = JSONResponse(jsonable_encoder(content), headers=headers)
+
+        body = bytes(result.body)
+        if lookup.key is not None and len(body) <= self.max_bytes:
+            self._remove(lookup.key)
+            self._entries[lookup.key] = CachedResult(
+                tables=lookup.tables,
+                versions=lookup.versions,
+                body=body,
+                headers=headers,
+                expires_at=time.monotonic() + self.ttl,
+            )
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        return result
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "coherent": self.coherent,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+            "evictions": self._evictions,
+        }
+
+
+cache = ResultCache()
+
+
+def notify_statement(table_name: str):
+    """
+    ``pg_notify`` for the cross-worker channel. Postgres delivers it when the
+    writing transaction commits, and drops it on rollback.
+    """
+    return text("SELECT pg_notify(:channel, :table)").bindparams(
+        channel=settings.RESULT_CACHE_NOTIFY_CHANNEL, table=table_name
+    )
+
+
+async def table_written(session, table_name: str) -> None:
+    """
+    Record a write to ``table_name`` made through ``session``.
+
+    Cached results of the table are invalidated right away and again once
+    the transaction commits or rolls back, so results read in between are not kept.
+    With ``RESULT_CACHE_NOTIFY`` other workers are told on commit.
+    """
+    cache.versions.bump(table_name)
+    if session is None:
+        return
+    session.info.setdefault(WRITTEN_TABLES_KEY, set()).add(table_name)
+    if settings.RESULT_CACHE_NOTIFY:
+        await session.execute(notify_statement(table_name))
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_committed_tables(session) -> None:
+    tables = session.info.pop(WRITTEN_TABLES_KEY, None)
+    if tables:
+        cache.versions.bump(*tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session) -> None:
+    # results read after the write saw rows that are now gone
+    tables = session.info.pop(WRITTEN_TABLES_KEY, None)
+    if tables:
+        cache.versions.bump(*tables)
+
+
+class InvalidationListener:
+    """
+    Cross-worker invalidation over Postgres ``LISTEN``/``NOTIFY``.
+
+    Holds one dedicated connection outside the pool. While it is down the
+    cache is bypassed, since other workers' writes would go unnoticed, and
+    the connection is reopened with exponential backoff.
+    """
+
+    def __init__(self, cache: ResultCache = cache):
+        self.cache = cache
+        self._connection = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._stopped = False
+        self.reconnects = 0
+
+    async def start(self) -> None:
+        """
+        Open the channel; if that fails, keep retrying in the background.
+        """
+        self._stopped = False
+        try:
+            await self._connect()
+        except Exception:
+            self._schedule_reconnect()
+            raise
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self.cache.coherent = False
+        connection = await asyncpg.connect(settings.SQLALCHEMY_DATABASE_URI)
+        try:
+            await connection.add_listener(settings.RESULT_CACHE_NOTIFY_CHANNEL, self._on_notify)
+        except Exception:
+            await connection.close()
+            raise
+        self._connection = connection
+        connection.add_termination_listener(self._on_termination)
+        # anything cached before we were listening may be stale
+        self.cache.clear()
+        self.cache.coherent = True
+
+    def _on_notify(self, connection, pid, channel, table_name) -> None:
+        self.cache.versions.bump(table_name)
+
+    def _on_termination(self, connection) -> None:
+        if connection is not self._connection:
+            return
+        self._connection = None
+        self.cache.coherent = False
+        if not self._stopped:
+            logger.warning("Result cache invalidation channel closed; caching suspended until it reconnects")
+            self._schedule_reconnect()
+
+    def _schedule_reconnect(self) -> None:
+        if self._stopped or (self._reconnecting is not None and not self._reconnecting.done()):
+            return
+        self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = RECONNECT_INITIAL_DELAY
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except Exception as e:
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                logger.warning("Could not reopen the result cache invalidation channel (%s), retrying in %.0fs", e, delay)
+            else:
+                self.reconnects += 1
+                logger.info("Result cache invalidation channel reopened")
+                return
+
+    async def stop(self) -> None:
+        self._stopped = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            try:
+                await self._reconnecting
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reconnecting = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.close()
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db_client import DBClient
+
+logger = logging.getLogger(__name__)
+
+# session.info key collecting revocations until the transaction commits
+PENDING_KEY = "token_revocations_pending"
+
+REVOCATION_FIELDS = ["id", "jti", "user_id", "revoked_at", "expires_at"]
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class RevocationList:
+    """
+    Revoked access tokens, held in memory so that checking a token costs
+    no query.
+
+    Tokens are revoked one by one (by ``jti``) or per user (every token
+    issued up to the revocation). Entries are dropped once the tokens they
+    cover have expired, so the list only ever holds revocations younger
+    than the token lifetime.
+
+    Revocations made by this worker apply when they commit; those of other
+    workers are read from ``token_revocations`` every
+    ``REVOCATION_REFRESH_SECONDS``, asking only for rows revoked since the
+    previous read.
+    """
+
+    def __init__(self, refresh_interval: Optional[float] = None, session_factory=None):
+        self.refresh_interval = refresh_interval or settings.REVOCATION_REFRESH_SECONDS
+        self._session_factory = session_factory
+        # jti -> expiry (epoch seconds)
+        self._tokens: Dict[str, float] = {}
+        # user id -> (tokens issued before this time are revoked, expiry)
+        self._users: Dict[str, Tuple[float, float]] = {}
+        self.loaded = False
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_db_at = 0.0
+        self._refreshes = 0
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    # ----- checks -----
+
+    def is_revoked(self, payload: Dict[str, Any]) -> bool:
+        """
+        Whether a decoded token has been revoked.
+        """
+        jti = payload.get("jti")
+        if jti is not None and jti in self._tokens:
+            return True
+        user = self._users.get(str(payload.get("sub")))
+        if user is None:
+            return False
+        # tokens from before iat was issued are covered too
+        issued_at = payload.get("iat")
+        return issued_at is None or issued_at < user[0]
+
+    # ----- updates -----
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """
+        Add one ``token_revocations`` row.
+        """
+        expires_at = _timestamp(row["expires_at"])
+        if expires_at <= time.time():
+            return
+        if row.get("jti"):
+            self._tokens[row["jti"]] = expires_at
+        if row.get("user_id"):
+            user_id = str(row["user_id"])
+            # iat and revoked_at are both sub-second app clock times, so a
+            # token issued right after the revocation (e.g. logging in again)
+            # stays valid and every one issued before it, even within the same
+            # second, is revoked
+            revoked_before = _timestamp(row["revoked_at"])
+            current = self._users.get(user_id)
+            if current is None or current[0] < revoked_before:
+                self._users[user_id] = (revoked_before, max(expires_at, current[1] if current else 0))
+
+    def prune(self) -> None:
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {user: entry for user, entry in self._users.items() if entry[1] > now}
+
+    async def refresh(self, db: DBClient) -> None:
+        """
+        Read revocations made since the last refresh (all unexpired ones
+        the first time).
+        """
+        filters: Dict[str, Any] = {"expires_at__gt": datetime.now(timezone.utc)}
+        if self._watermark is not None:
+            # re-read a window before the newest row seen: revoked_at is set
+            # before the row commits, so rows may commit out of order
+            overlap = timedelta(seconds=settings.REVOCATION_REFRESH_OVERLAP_SECONDS)
+            filters["revoked_at__gte"] = self._watermark - overlap
+        rows = await db.query_table_data("token_revocations", filters=filters, fields=REVOCATION_FIELDS)
+        for row in rows or ():
+            self.add(row)
+            if self._watermark is None or row["revoked_at"] > self._watermark:
+                self._watermark = row["revoked_at"]
+        if self._watermark is None:
+            self._watermark = datetime.now(timezone.utc)
+        self.prune()
+        self.loaded = True
+        self._refreshes += 1
+
+    async def start(self) -> None:
+        """
+        Load the current revocations and keep refreshing them in the background.
+        """
+        try:
+            async with self._sessions() as session:
+                await self.refresh(DBClient(session))
+        except Exception:
+            # get_current_user loads them on first use instead
+            logger.exception("Could not load token revocations")
+        self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with self._sessions() as session:
+                    db = DBClient(session)
+                    await self.refresh(db)
+                    if time.monotonic() - self._pruned_db_at >= settings.REVOCATION_PRUNE_INTERVAL_SECONDS:
+                        await self._delete_expired(db)
+                        await session.commit()
+            except Exception:
+                logger.exception("Could not refresh token revocations")
+
+    async def _delete_expired(self, db: DBClient) -> None:
+        deleted = await db.delete_table_entries(
+            "token_revocations", {"expires_at__lte": datetime.now(timezone.utc)}
+        )
+        self._pruned_db_at = time.monotonic()
+        if deleted:
+            logger.info("Deleted %d expired token revocations", deleted)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._users.clear()
+        self.loaded = False
+        self._watermark = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "revoked_tokens": len(self._tokens),
+            "revoked_users": len(self._users),
+            "refreshes": self._refreshes,
+        }
+
+
+revocations = RevocationList()
+
+
+def new_jti() -> str:
+    return uuid.uuid4().hex
+
+
+async def revoke(
+    db: DBClient,
+    expires_at: datetime,
+    jti: Optional[str] = None,
+    user_id: Optional[str] = None,
+    reason: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Persist a revocation of token ``jti`` or of every current token of
+    ``user_id``, in the caller's transaction. This worker applies it when
+    the transaction commits, the others on their next refresh.
+
+    :param expires_at: When the revoked tokens expire; the revocation can
+        be forgotten after that.
+    """
+    row = await db.create_table_entry("token_revocations", {
+        "jti": jti,
+        "user_id": user_id,
+        "reason": reason,
+        # on the app clock tokens' iat is taken from, not the database's
+        "revoked_at": datetime.now(timezone.utc),
+        "expires_at": expires_at,
+    })
+    db.session.info.setdefault(PENDING_KEY, []).append(row)
+    return row
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session) -> None:
+    for row in session.info.pop(PENDING_KEY, ()):
+        revocations.add(row)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session) -> None:
+    session.info.pop(PENDING_KEY, None)
@@ -1,13 +1,18 @@
 import jwt
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.core import revocation
 from app.core.config import settings
 from app.core.db_client import DBClient
 from app.core.database import get_session
+from app.core.query import InvalidQueryError
 from app.models.user import User
 
 from passlib.context import CryptContext
@@ -15,23 +20,59 @@ from passlib.context import CryptContext
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# user already authenticated for the requests dispatched in this context
+_authenticated_user: ContextVar[Optional[Any]] = ContextVar("authenticated_user", default=None)
+
 def hash_password(plain: str) -> str:
     return pwd_context.hash(plain)
 
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
-def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=120)):
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    # jti identifies the token for revocation, iat for revoking all of a
+    # user's tokens; iat keeps sub-seconds so that cutoff is exact
+    to_encode.update({"exp": expire, "iat": now.timestamp(), "jti": revocation.new_jti()})
     return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
+def token_subject(authorization: str) -> Optional[str]:
+    """
+    The ``sub`` of the valid bearer token in an ``Authorization`` header,
+    or ``None``. Only the signature and expiry are checked.
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+    subject = payload.get("sub")
+    return None if subject is None else str(subject)
+
+@contextmanager
+def authenticated_as(user: Any) -> Iterator[None]:
+    """
+    Treat requests dispatched within this context as made by ``user``
+    without decoding the token or looking the user up again.
+    """
+    token = _authenticated_user.set(user)
+    try:
+        yield
+    finally:
+        _authenticated_user.reset(token)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_session),
 ) -> User:
-    
+    user = _authenticated_user.get()
+    if user is not None:
+        return user
+
     db = DBClient(session)
 
     credentials_exception = HTTPException(
@@ -52,10 +93,28 @@ async def get_current_user(
     except jwt.PyJWTError:
         raise credentials_exception
 
-    user = await db.query_table_data(
-        "users", filters={"id": user_id}, single_row=True
-    )
+    if not revocation.revocations.loaded:
+        # only until the first load; afterwards the check costs no query
+        await revocation.revocations.refresh(db)
+    if revocation.revocations.is_revoked(payload):
+        raise credentials_exception
+
+    try:
+        user = await db.query_table_data(
+            "users", filters={"id": user_id}, single_row=True
+        )
+    except InvalidQueryError:
+        # "sub" is not a valid user id
+        raise credentials_exception
     if not user:
         raise credentials_exception
 
-    return user
\ No newline at end of file
+    return user
+
+async def require_admin(user: Any = Depends(get_current_user)) -> Any:
+    if not user.get("is_admin"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return user
@@ -0,0 +1,63 @@
+import importlib.util
+from typing import Any, Dict
+
+from app.core.config import Settings
+
+LOOPS = {"auto", "asyncio", "uvloop"}
+HTTP_IMPLEMENTATIONS = {"auto", "h11", "httptools"}
+
+
+def _resolve(option: str, value: str, allowed: set, optional_module: str, fallback: str) -> str:
+    """
+    Validate an optional-dependency choice; "auto" picks the module if installed.
+    """
+    if value not in allowed:
+        raise RuntimeError(f"{option} must be one of {sorted(allowed)}, got {value!r}")
+
+    installed = importlib.util.find_spec(optional_module) is not None
+    if value == "auto":
+        return optional_module if installed else fallback
+    if value == optional_module and not installed:
+        raise RuntimeError(f"{option}={value} but {optional_module} is not installed")
+    return value
+
+
+def uvicorn_options(settings: Settings) -> Dict[str, Any]:
+    """
+    Keyword arguments for ``uvicorn.run`` in the configured server mode.
+
+    In production mode uvicorn supervises ``WEB_WORKERS`` processes,
+    restarts workers that exit after ``WORKER_MAX_REQUESTS`` requests, and on
+    SIGTERM stops accepting connections and drains in-flight requests for up
+    to ``GRACEFUL_SHUTDOWN_TIMEOUT`` seconds before running the lifespan
+    shutdown (which disposes the pool).
+
+    :raises RuntimeError: if the mode or an explicitly requested loop/http
+        implementation is invalid or not installed.
+    """
+    # uvicorn's loggers propagate to the app's queue-based root handler,
+    # and requests are logged by RequestContextMiddleware instead
+    options: Dict[str, Any] = {
+        "host": settings.HOST,
+        "port": settings.PORT,
+        "log_config": None,
+        "access_log": False,
+    }
+
+    if settings.SERVER_MODE == "development":
+        options["reload"] = settings.DEBUG
+        return options
+
+    if settings.SERVER_MODE != "production":
+        raise RuntimeError(f"SERVER_MODE must be 'development' or 'production', got {settings.SERVER_MODE!r}")
+
+    options.update({
+        "workers": max(1, settings.WEB_WORKERS),
+        "loop": _resolve("SERVER_LOOP", settings.SERVER_LOOP, LOOPS, "uvloop", "asyncio"),
+        "http": _resolve("SERVER_HTTP", settings.SERVER_HTTP, HTTP_IMPLEMENTATIONS, "httptools", "h11"),
+        "timeout_graceful_shutdown": settings.GRACEFUL_SHUTDOWN_TIMEOUT,
+        "proxy_headers": True,
+    })
+    if settings.WORKER_MAX_REQUESTS > 0:
+        options["limit_max_requests"] = settings.WORKER_MAX_REQUESTS
+    return options
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core import deadlines
+from app.core.config import settings
+
+
+class _LeaderCancelled(Exception):
+    """
+    The shared execution was cancelled with its request (or by its
+    request's statement_timeout); waiters run their own.
+    """
+
+
+class _Flight:
+    __slots__ = ("future", "started")
+
+    def __init__(self, future: asyncio.Future, started: float):
+        self.future = future
+        self.started = started
+
+
+def freeze(value: Any) -> Any:
+    """
+    Hashable form of a statement parameter (lists become tuples).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    return value
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while one is running, callers
+    with the same key wait for its result instead of running their own.
+
+    A caller only joins an execution that started less than ``window``
+    seconds ago, which bounds how old a shared result can be; results are
+    never kept once the execution finishes. Errors are shared like results,
+    except the leader being cancelled (client gone, deadline) or its query
+    hitting the leader's own ``statement_timeout``, after which its waiters
+    run on their own, under their own deadlines.
+    """
+
+    def __init__(self, window: Optional[float] = None, enabled: Optional[bool] = None):
+        self.window = settings.SINGLE_FLIGHT_WINDOW_MS / 1000 if window is None else window
+        self.enabled = settings.SINGLE_FLIGHT_ENABLED if enabled is None else enabled
+        self._in_flight: Dict[Hashable, _Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(
+        self,
+        key: Optional[Hashable],
+        execute: Callable[[], Awaitable[Any]],
+        copy: Callable[[Any], Any] = lambda result: result,
+    ) -> Any:
+        """
+        ``await execute()``, or share the result of an identical execution
+        in flight. Callers that joined get ``copy(result)``, so nobody
+        mutates another request's rows.
+
+        :param key: ``None`` runs ``execute`` without coalescing.
+        """
+        if not self.enabled or key is None:
+            return await execute()
+        try:
+            flight = self._in_flight.get(key)
+        except TypeError:
+            # unhashable parameter value
+            return await execute()
+
+        now = time.monotonic()
+        if flight is not None and now - flight.started <= self.window:
+            try:
+                # shielded: a waiter giving up must not cancel the others' result
+                result = await asyncio.shield(flight.future)
+            except _LeaderCancelled:
+                pass
+            else:
+                self.coalesced += 1
+                return copy(result)
+
+        flight = _Flight(asyncio.get_running_loop().create_future(), now)
+        self._in_flight[key] = flight
+        self.executions += 1
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            flight.future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            # the timeout came from the leader's deadline, not the waiters'
+            flight.future.set_exception(_LeaderCancelled() if deadlines.is_statement_timeout(e) else e)
+            raise
+        else:
+            flight.future.set_result(result)
+            return result
+        finally:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            if flight.future.done() and not flight.future.cancelled():
+                # mark the exception retrieved when nobody was waiting
+                flight.future.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.executions + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "window_ms": self.window * 1000,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "saved_ratio": round(self.coalesced / calls, 4) if calls else 0.0,
+            "in_flight": len(self._in_flight),
+        }
+
+    def reset(self) -> None:
+        self.executions = 0
+        self.coalesced = 0
+
+
+# identical concurrent reads of DBClient.query_table_data
+reads = SingleFlight()
@@ -0,0 +1,529 @@
+import asyncio
+import functools
+import logging
+import re
+import time
+import unicodedata
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db_client import DBClient
+from app.models.candidate import CandidateTombstone
+
+logger = logging.getLogger(__name__)
+
+# default weights of a job's skills in a match score
+REQUIRED_WEIGHT = 1.0
+NICE_TO_HAVE_WEIGHT = 0.5
+
+# a skill held by more than 1/DENSE_RATIO of the candidates is kept as a
+# bitset; rarer skills as a set of slots, which is smaller below that
+DENSE_RATIO = 32
+MIN_CAPACITY = 1024
+
+# columns read when (re)building the index
+INDEX_FIELDS = ["id", "skills", "updated_at"]
+TOMBSTONE_FIELDS = ["candidate_id", "deleted_at"]
+
+# how long deleted candidates are tombstoned; an index not refreshed
+# for that long may have missed deletions and is rebuilt
+TOMBSTONE_RETENTION = timedelta(days=1)
+
+# session.info key collecting index changes until the transaction commits
+PENDING_KEY = "skill_index_pending"
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+# skills repeat across candidates, so normalized forms are memoized
+@functools.lru_cache(maxsize=65536)
+def normalize_skill(skill: Any) -> Optional[str]:
+    """
+    Case- and whitespace-insensitive form of a skill, e.g. ``" Node.JS "`` -> ``"node.js"``.
+    """
+    if not isinstance(skill, str):
+        return None
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", skill)).strip().casefold() or None
+
+
+def normalize_skills(skills: Optional[Iterable[Any]]) -> Set[str]:
+    try:
+        normalized = set(map(normalize_skill, skills or ()))
+    except TypeError:
+        # unhashable entries (objects in the JSON list) are not skills
+        normalized = {normalize_skill(s) for s in skills if isinstance(s, str)}
+    normalized.discard(None)
+    return normalized
+
+
+class _Posting:
+    """
+    The candidates (slots) having one skill: a packed bitset once the skill
+    is common, a set of slots while it is rare.
+    """
+
+    __slots__ = ("bits", "members", "count", "_array")
+
+    def __init__(self):
+        self.bits: Optional[np.ndarray] = None
+        self.members: Optional[Set[int]] = set()
+        self.count = 0
+        self._array: Optional[np.ndarray] = None
+
+    def add(self, slot: int) -> None:
+        if self.bits is not None:
+            byte, bit = slot >> 3, np.uint8(1 << (slot & 7))
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                self.count += 1
+        elif slot not in self.members:
+            self.members.add(slot)
+            self.count += 1
+            self._array = None
+
+    def discard(self, slot: int) -> None:
+        if self.bits is not None:
+            byte, bit = slot >> 3, np.uint8(1 << (slot & 7))
+            if self.bits[byte] & bit:
+                self.bits[byte] &= ~bit
+                self.count -= 1
+        elif slot in self.members:
+            self.members.discard(slot)
+            self.count -= 1
+            self._array = None
+
+    def add_new(self, slots: List[int]) -> None:
+        """
+        Add slots known not to be in the posting yet.
+        """
+        if self.bits is not None:
+            array = np.asarray(slots, dtype=np.int64)
+            np.bitwise_or.at(self.bits, array >> 3, (1 << (array & 7)).astype(np.uint8))
+        else:
+            self.members.update(slots)
+            self._array = None
+        self.count += len(slots)
+
+    def densify(self, capacity: int) -> None:
+        bits = np.zeros(capacity // 8, dtype=np.uint8)
+        slots = self.slots()
+        np.bitwise_or.at(bits, slots >> 3, (1 << (slots & 7)).astype(np.uint8))
+        self.bits, self.members, self._array = bits, None, None
+
+    def grow(self, capacity: int) -> None:
+        if self.bits is not None:
+            self.bits = np.concatenate([self.bits, np.zeros(capacity // 8 - len(self.bits), dtype=np.uint8)])
+
+    def slots(self) -> np.ndarray:
+        if self.bits is not None:
+            return np.flatnonzero(np.unpackbits(self.bits, bitorder="little"))
+        if self._array is None:
+            self._array = np.fromiter(self.members, dtype=np.int64, count=len(self.members))
+        return self._array
+
+    def add_to(self, totals: np.ndarray, value) -> None:
+        """
+        Add ``value`` to ``totals`` at every slot having the skill.
+        """
+        if self.bits is not None:
+            totals += np.unpackbits(self.bits, count=len(totals), bitorder="little") * totals.dtype.type(value)
+        else:
+            totals[self.slots()] += value
+
+
+class SkillIndex:
+    """
+    In-process inverted index from normalized skill to the candidates having it.
+
+    Candidates get dense slot numbers so a skill's candidates are a bitset
+    (or, for rare skills, a slot array) and a job is scored against the
+    whole pool with a few vectorized additions per skill.
+
+    The index is built from ``candidates.skills`` by a background task
+    started with the app (matching answers 503 until then), kept current
+    by this worker's writes (applied on commit) and, for other workers'
+    writes, by the same task re-reading candidates updated since the last
+    refresh every ``MATCH_INDEX_REFRESH_SECONDS``. Candidates other workers
+    deleted are dropped when the refresh reads their tombstones.
+    """
+
+    def __init__(self, session_factory=None):
+        self._clear()
+        self._lock = asyncio.Lock()
+        self.built = False
+        self._refreshed_at = 0.0
+        self._watermark: Optional[datetime] = None
+        self._deleted_watermark: Optional[datetime] = None
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def _clear(self) -> None:
+        self._slot_of: Dict[str, int] = {}
+        # per slot: candidate id and normalized skills (tuples are far
+        # smaller than sets, which matters at a million candidates)
+        self._ids: List[Optional[str]] = []
+        self._skills: List[Tuple[str, ...]] = []
+        self._postings: Dict[str, _Posting] = {}
+        self._free: List[int] = []
+        self.capacity = MIN_CAPACITY
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether writes need to reach the index (it is built or being built).
+        """
+        return self.built or self._lock.locked()
+
+    # ----- maintenance -----
+
+    def set_skills(self, candidate_id: Any, skills: Optional[Iterable[Any]]) -> None:
+        """
+        Index ``candidate_id`` with ``skills``, replacing what it had.
+        """
+        candidate_id = str(candidate_id)
+        new = normalize_skills(skills)
+        slot = self._slot_of.get(candidate_id)
+        if slot is None:
+            if not new:
+                return
+            slot = self._allocate(candidate_id)
+        old = set(self._skills[slot])
+        for skill in old - new:
+            self._postings[skill].discard(slot)
+        for skill in new - old:
+            posting = self._postings.get(skill)
+            if posting is None:
+                posting = self._postings[skill] = _Posting()
+            posting.add(slot)
+            self._maybe_densify(posting)
+        if new:
+            self._skills[slot] = tuple(new)
+        else:
+            self.remove(candidate_id)
+
+    def _maybe_densify(self, posting: _Posting) -> None:
+        if posting.bits is None and posting.count * DENSE_RATIO > self.capacity:
+            posting.densify(self.capacity)
+
+    def remove(self, candidate_id: Any) -> None:
+        slot = self._slot_of.pop(str(candidate_id), None)
+        if slot is None:
+            return
+        for skill in self._skills[slot]:
+            self._postings[skill].discard(slot)
+        self._ids[slot] = None
+        self._skills[slot] = ()
+        self._free.append(slot)
+
+    def _allocate(self, candidate_id: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self._ids[slot] = candidate_id
+        else:
+            slot = len(self._ids)
+            self._ids.append(candidate_id)
+            self._skills.append(())
+            if slot >= self.capacity:
+                self.capacity *= 2
+                for posting in self._postings.values():
+                    posting.grow(self.capacity)
+        self._slot_of[candidate_id] = slot
+        return slot
+
+    def apply(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Index a batch of candidate rows; new candidates are added per skill
+        in bulk, which is what keeps a full build fast.
+        """
+        new_slots: Dict[str, List[int]] = defaultdict(list)
+        for row in rows:
+            candidate_id = str(row["id"])
+            if candidate_id in self._slot_of:
+                self.set_skills(candidate_id, row.get("skills"))
+                continue
+            skills = normalize_skills(row.get("skills"))
+            if not skills:
+                continue
+            slot = self._allocate(candidate_id)
+            self._skills[slot] = tuple(skills)
+            for skill in skills:
+                new_slots[skill].append(slot)
+        for skill, slots in new_slots.items():
+            posting = self._postings.get(skill)
+            if posting is None:
+                posting = self._postings[skill] = _Posting()
+            posting.add_new(slots)
+            self._maybe_densify(posting)
+
+    # ----- queries -----
+
+    def match(
+        self,
+        required: Iterable[str] = (),
+        nice_to_have: Iterable[str] = (),
+        weights: Optional[Dict[str, float]] = None,
+        require_all: bool = False,
+        limit: int = 20,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Rank candidates by the weighted share of the job's skills they have.
+
+        Required skills weigh ``REQUIRED_WEIGHT`` and nice-to-have skills
+        ``NICE_TO_HAVE_WEIGHT`` unless ``weights`` says otherwise; scores are
+        normalized to 0-1. With ``require_all`` only candidates having every
+        required skill are ranked.
+
+        :return: The top ``limit`` as ``{"id", "score", "matched_skills"}``
+            (best first, ties in index order) and the number of candidates
+            that matched at all.
+        """
+        weights = {normalize_skill(k): float(v) for k, v in (weights or {}).items()}
+        required_skills = [s for s in dict.fromkeys(map(normalize_skill, required)) if s]
+        query: Dict[str, float] = {s: weights.get(s, REQUIRED_WEIGHT) for s in required_skills}
+        for skill in map(normalize_skill, nice_to_have):
+            if skill and skill not in query:
+                query[skill] = weights.get(skill, NICE_TO_HAVE_WEIGHT)
+        total_weight = sum(w for w in query.values() if w > 0)
+        if not query or total_weight <= 0:
+            return [], 0
+
+        size = len(self._ids)
+        scores = np.zeros(size, dtype=np.float32)
+        for skill, weight in query.items():
+            posting = self._postings.get(skill)
+            if posting is not None and posting.count:
+                posting.add_to(scores, weight)
+
+        candidates = scores > 0
+        if require_all and required_skills:
+            hits = np.zeros(size, dtype=np.int16)
+            for skill in required_skills:
+                posting = self._postings.get(skill)
+                if posting is None or not posting.count:
+                    return [], 0
+                posting.add_to(hits, 1)
+            candidates &= hits == len(required_skills)
+
+        slots = np.flatnonzero(candidates)
+        matched = len(slots)
+        if matched > limit:
+            slots = slots[np.argpartition(-scores[slots], limit - 1)[:limit]]
+        # best first; equal scores in slot order so results are stable
+        slots = slots[np.lexsort((slots, -scores[slots]))]
+
+        results = []
+        for slot in slots.tolist():
+            skills = self._skills[slot]
+            results.append({
+                "id": self._ids[slot],
+                "score": round(float(scores[slot]) / total_weight, 4),
+                "matched_skills": [s for s in query if s in skills],
+            })
+        return results, matched
+
+    # ----- loading -----
+
+    async def refresh(self, db: DBClient) -> None:
+        """
+        Build the index, or once it is built, re-read the candidates updated
+        and the tombstones written since the last refresh (other workers'
+        writes).
+        """
+        overlap = timedelta(seconds=settings.MATCH_INDEX_REFRESH_OVERLAP_SECONDS)
+        async with self._lock:
+            if self.built and time.monotonic() - self._refreshed_at > (TOMBSTONE_RETENTION - overlap).total_seconds():
+                logger.warning("Skill index was not refreshed for too long, rebuilding it")
+                self.reset()
+            if not self.built:
+                await self._load(db, since=None)
+                await self._drop_deleted(db, since=None)
+                self.built = True
+            else:
+                await self._load(db, since=self._watermark - overlap if self._watermark else None)
+                await self._drop_deleted(
+                    db, since=self._deleted_watermark - overlap if self._deleted_watermark else None
+                )
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.core.database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+
+    async def start(self) -> None:
+        """
+        Build the index now and refresh it every
+        ``MATCH_INDEX_REFRESH_SECONDS``, in the background.
+        """
+        self._task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                async with self._sessions() as session:
+                    db = DBClient(session)
+                    await self.refresh(db)
+                    await db.delete_table_entries(
+                        "candidate_tombstones", {"deleted_at__lt": datetime.utcnow() - TOMBSTONE_RETENTION}
+                    )
+                    await session.commit()
+            except Exception:
+                logger.exception("Skill index %s failed", "refresh" if self.built else "build")
+            await asyncio.sleep(settings.MATCH_INDEX_REFRESH_SECONDS)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    async def _load(self, db: DBClient, since: Optional[datetime]) -> None:
+        """
+        Read candidates (updated since ``since``, or all) in keyset-paginated
+        batches and index them.
+        """
+        start = time.monotonic()
+        loaded = 0
+        last_id = None
+        while True:
+            filters: Dict[str, Any] = {}
+            if last_id:
+                filters["id__gt"] = last_id
+            if since is not None:
+                filters["updated_at__gte"] = since
+            batch = await db.query_table_data(
+                "candidates",
+                filters=filters or None,
+                order_by=["id"],
+                limit=settings.MATCH_INDEX_BATCH_SIZE,
+                fields=INDEX_FIELDS,
+            )
+            if not batch:
+                break
+            self.apply(batch)
+            for row in batch:
+                if row.get("updated_at") and (self._watermark is None or row["updated_at"] > self._watermark):
+                    self._watermark = row["updated_at"]
+            loaded += len(batch)
+            last_id = batch[-1]["id"]
+            # let requests run between batches of a large build
+            await asyncio.sleep(0)
+        self._refreshed_at = time.monotonic()
+        logger.info(
+            "Skill index %s %d candidates in %.2fs",
+            "refreshed" if since is not None else "built", loaded, time.monotonic() - start,
+        )
+
+    async def _drop_deleted(self, db: DBClient, since: Optional[datetime]) -> None:
+        """
+        Remove candidates tombstoned since ``since`` (or all tombstoned).
+        """
+        last_id = None
+        while True:
+            filters: Dict[str, Any] = {}
+            if last_id:
+                filters["candidate_id__gt"] = last_id
+            if since is not None:
+                filters["deleted_at__gte"] = since
+            batch = await db.query_table_data(
+                "candidate_tombstones",
+                filters=filters or None,
+                order_by=["candidate_id"],
+                limit=settings.MATCH_INDEX_BATCH_SIZE,
+                fields=TOMBSTONE_FIELDS,
+            )
+            if not batch:
+                break
+            for row in batch:
+                self.remove(row["candidate_id"])
+                if self._deleted_watermark is None or row["deleted_at"] > self._deleted_watermark:
+                    self._deleted_watermark = row["deleted_at"]
+            last_id = batch[-1]["candidate_id"]
+            await asyncio.sleep(0)
+
+    def reset(self) -> None:
+        self._clear()
+        self.built = False
+        self._refreshed_at = 0.0
+        self._watermark = None
+        self._deleted_watermark = None
+
+    def stats(self) -> Dict[str, Any]:
+        dense = sum(1 for p in self._postings.values() if p.bits is not None)
+        return {
+            "built": self.built,
+            "candidates": len(self),
+            "skills": len(self._postings),
+            "dense_skills": dense,
+            "capacity": self.capacity,
+        }
+
+
+index = SkillIndex()
+
+
+def candidate_written(session, row: Optional[Dict[str, Any]]) -> None:
+    """
+    Queue a created or updated candidate for the index, applied when
+    ``session`` commits (right away without a session).
+    """
+    if not row or "skills" not in row or not index.active:
+        return
+    if session is None:
+        index.set_skills(row["id"], row["skills"])
+        return
+    session.info.setdefault(PENDING_KEY, []).append((row["id"], row["skills"]))
+
+
+async def record_deleted(session, candidate_ids: Iterable[Any]) -> None:
+    """
+    Tombstone deleted candidates, in the caller's transaction, so every
+    worker's index drops them on its next refresh.
+    """
+    rows = [{"candidate_id": uuid.UUID(str(i))} for i in candidate_ids]
+    if rows:
+        await session.execute(
+            insert(CandidateTombstone).on_conflict_do_nothing(index_elements=["candidate_id"]), rows
+        )
+
+
+def candidates_deleted(session, candidate_ids: Iterable[Any]) -> None:
+    """
+    Queue deleted candidates for removal from the index, applied on commit.
+    """
+    if not index.active:
+        return
+    if session is None:
+        for candidate_id in candidate_ids:
+            index.remove(candidate_id)
+        return
+    session.info.setdefault(PENDING_KEY, []).extend((candidate_id, None) for candidate_id in candidate_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session) -> None:
+    for candidate_id, skills in session.info.pop(PENDING_KEY, ()):
+        if skills is None:
+            index.remove(candidate_id)
+        else:
+            index.set_skills(candidate_id, skills)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session) -> None:
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,46 @@
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+
+def etag_for(version: Optional[int]) -> Optional[str]:
+    """
+    Render a row version as a strong ETag, e.g. ``"3"``.
+    """
+    return f'"{version}"' if version is not None else None
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """
+    Parse an ``If-Match`` header into the expected row version.
+
+    ``None`` and ``*`` mean "any version". Weak validators (``W/"3"``) are
+    accepted since the version is the only thing being compared.
+
+    :raises HTTPException: 400 if the header is not a single version tag.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    tag = if_match.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    try:
+        return int(tag)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid If-Match header: {if_match}"
+        )
+
+
+def precondition_failed(current_version: int, detail: str) -> HTTPException:
+    """
+    412 response carrying the current ETag so the client can refetch.
+    """
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=detail,
+        headers={"ETag": etag_for(current_version)},
+    )
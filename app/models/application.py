@@ -1,8 +1,8 @@
 import uuid
 import enum
 from datetime import datetime
-from sqlalchemy import Column, String, Enum, ForeignKey, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import BigInteger, Column, String, Enum, ForeignKey, DateTime, Identity, Index, Integer, func, text
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, UUID
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
@@ -14,20 +14,120 @@ class ApplicationStatus(enum.Enum):
     REJECTED        = "REJECTED"
     HIRED           = "HIRED"
 
+# statuses after which an application never changes again
+CLOSED_STATUSES = (ApplicationStatus.REJECTED, ApplicationStatus.HIRED)
+
+
 class Application(Base):
     """
     Application model for the recruitment system.
+
+    The table is range partitioned by month on ``applied_at``, which is why
+    ``applied_at`` is part of the primary key. So the database no longer
+    enforces ``id`` uniqueness on its own: ids are always generated
+    (``uuid4``, never taken from the request), and ``applications_archive``,
+    keyed on ``id`` alone, rejects an archive batch holding a duplicate.
+
+    The ``(..., applied_at, id)`` indexes serve ``GET /applications``: each
+    filter combination it accepts is answered by one index range, already
+    in keyset order.
     """
     __tablename__ = "applications"
+    __table_args__ = (
+        Index("ix_applications_applied_at_id", "applied_at", "id"),
+        Index("ix_applications_job_title_applied_at_id", "job_title", "applied_at", "id"),
+        Index("ix_applications_status_applied_at_id", "status", "applied_at", "id"),
+        Index("ix_applications_status_job_title_applied_at_id", "status", "job_title", "applied_at", "id"),
+        {"postgresql_partition_by": "RANGE (applied_at)"},
+    )
 
     id              = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    candidate_id    = Column(UUID(as_uuid=True), ForeignKey('candidates.id'), nullable=False)
+    candidate_id    = Column(UUID(as_uuid=True), ForeignKey('candidates.id'), nullable=False, index=True)
+    # job_title lookups use ix_applications_job_title_applied_at_id
     job_title       = Column(String(255), nullable=False)
     status          = Column(
         Enum(ApplicationStatus, name="application_status"),
         nullable=False,
         server_default=ApplicationStatus.APPLIED.value,
     )
-    applied_at      = Column(DateTime, default=datetime.utcnow)
+    applied_at      = Column(DateTime, primary_key=True, nullable=False, default=datetime.utcnow)
+    version         = Column(Integer, nullable=False, default=1, server_default="1")
 
     candidate       = relationship("Candidate", back_populates="applications")
+
+
+class ApplicationArchive(Base):
+    """
+    Closed applications moved out of the live table after the retention window.
+    """
+    __tablename__ = "applications_archive"
+
+    id              = Column(UUID(as_uuid=True), primary_key=True)
+    candidate_id    = Column(UUID(as_uuid=True), nullable=False, index=True)
+    job_title       = Column(String(255), nullable=False, index=True)
+    status          = Column(Enum(ApplicationStatus, name="application_status"), nullable=False)
+    applied_at      = Column(DateTime, nullable=False)
+    version         = Column(Integer, nullable=False, server_default="1")
+    archived_at     = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ApplicationStatusHistory(Base):
+    """
+    Append-only log of application status changes.
+
+    Rows are written by the same statement that changes the status. Each row
+    records leaving ``from_status`` for ``to_status``; the time spent in
+    ``from_status`` runs from the previous change (or ``applied_at``) to
+    ``changed_at``. A row without ``from_status`` records the creation of
+    the application. ``job_title`` and ``applied_at`` are copied so analytics
+    never have to join the partitioned applications table.
+    """
+    __tablename__ = "application_status_history"
+    __table_args__ = (
+        Index("ix_application_status_history_application_changed", "application_id", "changed_at"),
+    )
+
+    id              = Column(BigInteger, Identity(), primary_key=True)
+    application_id  = Column(UUID(as_uuid=True), nullable=False)
+    job_title       = Column(String(255), nullable=False, index=True)
+    from_status     = Column(Enum(ApplicationStatus, name="application_status"), nullable=True)
+    to_status       = Column(Enum(ApplicationStatus, name="application_status"), nullable=False)
+    applied_at      = Column(DateTime, nullable=False)
+    # naive UTC, like applied_at
+    changed_at      = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"), index=True)
+
+
+class ApplicationStageRollup(Base):
+    """
+    Per job title and stage totals, refreshed incrementally from the status history.
+    """
+    __tablename__ = "application_stage_rollups"
+
+    job_title        = Column(String(255), primary_key=True)
+    stage            = Column(Enum(ApplicationStatus, name="application_status"), primary_key=True)
+    # applications that entered the stage (first time only)
+    entered          = Column(BigInteger, nullable=False, server_default="0")
+    # applications that left the stage, and their total time in it
+    exits            = Column(BigInteger, nullable=False, server_default="0")
+    seconds_in_stage = Column(DOUBLE_PRECISION, nullable=False, server_default="0")
+
+
+class ApplicationHistoryTombstone(Base):
+    """
+    Deleted applications whose status history the next rollup refresh
+    removes, taking back what the rollups counted from it.
+    """
+    __tablename__ = "application_history_tombstones"
+
+    application_id  = Column(UUID(as_uuid=True), primary_key=True)
+    deleted_at      = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"))
+
+
+class RollupWatermark(Base):
+    """
+    How far each rollup has consumed its source table.
+    """
+    __tablename__ = "rollup_watermarks"
+
+    name            = Column(String(64), primary_key=True)
+    processed_until = Column(DateTime, nullable=False)
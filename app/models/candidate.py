@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, DateTime, Boolean, JSON, func
+from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, DateTime, Boolean, JSON, func, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 
@@ -19,9 +19,34 @@ class Candidate(Base):
     skills          = Column(JSONB, nullable=True)
     created_at      = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at      = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version         = Column(Integer, nullable=False, default=1, server_default="1")
 
     applications    = relationship(
         "Application",
         back_populates="candidate",
         cascade="all, delete-orphan",
-    )
\ No newline at end of file
+    )
+
+class CandidateDuplicatePair(Base):
+    """
+    Candidate pairs the last duplicate scan found, with their score.
+
+    Written by the worker that ran the scan and loaded by every worker.
+    """
+    __tablename__ = "candidate_duplicate_pairs"
+
+    candidate_id    = Column(UUID(as_uuid=True), primary_key=True)
+    duplicate_id    = Column(UUID(as_uuid=True), primary_key=True)
+    score           = Column(Float, nullable=False)
+
+
+class CandidateTombstone(Base):
+    """
+    Recently deleted candidates, so every worker's in-process skill index
+    can drop them. Kept for a day.
+    """
+    __tablename__ = "candidate_tombstones"
+
+    candidate_id    = Column(UUID(as_uuid=True), primary_key=True)
+    # naive UTC, like updated_at
+    deleted_at      = Column(DateTime, nullable=False, server_default=text("timezone('utc', now())"), index=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    """
+    Stored response for a client supplied ``Idempotency-Key``, or while
+    the request is still running (no ``status_code`` yet) its claim.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key             = Column(String(320), primary_key=True)
+    fingerprint     = Column(String(64), nullable=False)
+    status_code     = Column(Integer, nullable=True)
+    headers         = Column(JSONB, nullable=True)
+    body            = Column(LargeBinary, nullable=True)
+    created_at      = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at      = Column(DateTime(timezone=True), nullable=False, index=True)
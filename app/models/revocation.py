@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, CheckConstraint, Column, DateTime, Identity, String, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.core.database import Base
+
+
+class TokenRevocation(Base):
+    """
+    A revoked access token (``jti``), or every token of a user issued before
+    ``revoked_at`` (``user_id``). Rows are useless once ``expires_at`` has
+    passed, since the tokens they cover have expired too.
+    """
+    __tablename__ = "token_revocations"
+    __table_args__ = (
+        CheckConstraint("jti IS NOT NULL OR user_id IS NOT NULL", name="ck_token_revocations_target"),
+    )
+
+    id              = Column(BigInteger, Identity(), primary_key=True)
+    jti             = Column(String(64), nullable=True, index=True)
+    user_id         = Column(UUID(as_uuid=True), nullable=True)
+    reason          = Column(String(255), nullable=True)
+    revoked_at      = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    expires_at      = Column(DateTime(timezone=True), nullable=False, index=True)
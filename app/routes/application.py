@@ -1,28 +1,155 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
-from app.core.db_client import DBClient
+from app.core import analytics, database, purge, result_cache
+from app.core.config import settings
+from app.core.db_client import DBClient, StaleVersionError
 from app.core.database import get_session
+from app.core.query import (
+    InvalidQueryError,
+    decode_cursor,
+    encode_cursor,
+    filters_from_query_params,
+    split_filter_key,
+    split_list_param,
+)
 from app.core.security import get_current_user
+from app.core.versioning import etag_for, parse_if_match, precondition_failed
 from app.models.application import ApplicationStatus
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(tags=["Application"], dependencies=[Depends(get_current_user)])
 
+# query parameters of the bulk delete that are not column filters
+PURGE_APPLICATIONS_PARAMS = ("batch_size", "pause")
+
+# query parameters of the listing that are not column filters
+LIST_APPLICATIONS_PARAMS = ("limit", "cursor", "fields", "include_total")
+
+# filters the listing accepts; every combination has an index on (..., applied_at, id)
+LIST_APPLICATIONS_FILTERS = {
+    "status": ("eq",),
+    "job_title": ("eq",),
+    "applied_at": ("gt", "gte", "lt", "lte", "range"),
+}
+
+# newest first; the cursor continues below the (applied_at, id) of the last row
+LIST_APPLICATIONS_ORDER = ["-applied_at", "-id"]
+KEYSET_FIELDS = ["applied_at", "id"]
+KEYSET_FILTER = "applied_at,id__lt"
+
+
+@router.get("/analytics/time-in-stage", response_model=List[Dict[str, Any]])
+async def get_time_in_stage(
+    job_title: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Average time applications spend in each stage, per job title.
+
+    Computed from rollups of the status history, refreshed incrementally in
+    the background; the latest ``ANALYTICS_ROLLUP_LAG_SECONDS`` of changes
+    are not included yet.
+    """
+    return await analytics.time_in_stage(session, job_title)
+
+
+@router.get("/analytics/funnel", response_model=List[Dict[str, Any]])
+async def get_funnel(
+    job_title: Optional[str] = None,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Applications entering each funnel stage (APPLIED, INTERVIEWING, HIRED)
+    per job title, with conversion rates from the previous stage and from
+    APPLIED.
+    """
+    return await analytics.funnel(session, job_title)
+
+
+@router.get("/", response_model=List[Dict[str, Any]])
+async def list_applications(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=settings.APPLICATIONS_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    List live applications of all candidates, newest first.
+
+    Filter on ``status`` and ``job_title`` (exact) and an ``applied_at``
+    range (``applied_at__gte=2026-09-01``, ``__lt``, ``__range`` ...), e.g.
+    ``?status=INTERVIEWING&job_title=Backend Engineer&applied_at__gte=...``.
+    Other filters are refused, so that every listing is one index range scan.
+
+    Pages hold ``limit`` rows (``APPLICATIONS_PAGE_SIZE`` by default). When
+    there are more, ``X-Next-Cursor`` is set; pass it back as ``cursor`` for
+    the next page. Paging by position instead of offset keeps deep pages as
+    cheap as the first. With ``include_total`` the number of matching
+    applications is returned in ``X-Total-Count``.
+    """
+    cached = result_cache.cache.lookup(request, ("applications",))
+    if cached.response is not None:
+        return cached.response
+
+    db = DBClient(session)
+    filters = filters_from_query_params(request.query_params, LIST_APPLICATIONS_PARAMS)
+    for key in filters:
+        name, op = split_filter_key(key)
+        if op not in LIST_APPLICATIONS_FILTERS.get(name, ()):
+            raise InvalidQueryError(
+                f"Cannot filter applications on '{key}'; use status, job_title or an applied_at range"
+            )
+    limit = limit or settings.APPLICATIONS_PAGE_SIZE
+    fields = split_list_param(fields)
+
+    page_filters = dict(filters)
+    if cursor:
+        page_filters[KEYSET_FILTER] = decode_cursor(cursor, len(KEYSET_FIELDS))
+    # one row more tells whether there is a next page
+    rows = await db.query_table_data(
+        "applications",
+        filters=page_filters,
+        limit=limit + 1,
+        order_by=LIST_APPLICATIONS_ORDER,
+        # the cursor is made of the last row's sort key
+        fields=fields and list(dict.fromkeys(fields + KEYSET_FIELDS)),
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1][f] for f in KEYSET_FIELDS)
+    if fields:
+        rows = [{f: row[f] for f in fields} for row in rows]
+    if include_total:
+        total, estimated = await db.count_table_data("applications", filters=filters or None)
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Estimated"] = "true" if estimated else "false"
+    return result_cache.cache.store(cached, rows, response)
+
 
 @router.patch("/{application_id}", response_model=Dict[str, Any])
 async def update_application_status(
     application_id: UUID,
     application_status: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session)
 ):
     """
     Update an application by ID.
 
+    The change is appended to the application's status history in the same
+    statement.
+
     :param application_id: ID of the application.
     :param application_status: New status of the application.
+    :param if_match: Optional ETag; the update fails with 412 if the application changed since.
     :return: Updated application data.
     """
     db = DBClient(session)
@@ -33,15 +160,73 @@ async def update_application_status(
             detail=f"Invalid application status: {application_status}"
         )
 
-    updated = await db.update_table_entry(
-        "applications",
-        identifier={"id": str(application_id)},
-        update_data={"status": application_status}
-    )
+    try:
+        updated = await analytics.update_application_status(
+            db,
+            str(application_id),
+            application_status,
+            expected_version=parse_if_match(if_match)
+        )
+    except StaleVersionError as e:
+        raise precondition_failed(e.current_version, "Application was modified by another request")
 
     if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Application not found or update failed"
         )
-    return updated
\ No newline at end of file
+    if updated.get("version") is not None:
+        response.headers["ETag"] = etag_for(updated["version"])
+    return updated
+
+@router.delete("/{application_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_application(
+    application_id: UUID,
+    if_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session)
+):
+    """
+    Delete an application by ID.
+
+    Send the application's ``ETag`` as ``If-Match`` to only delete it if
+    nobody changed it in the meantime (412 otherwise).
+    """
+    db = DBClient(session)
+    try:
+        deleted = await purge.delete_by_id(
+            db, "applications", str(application_id), expected_version=parse_if_match(if_match)
+        )
+    except StaleVersionError as e:
+        raise precondition_failed(e.current_version, "Application was modified by another request")
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Application not found"
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.delete("/")
+async def purge_applications(
+    request: Request,
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    pause: Optional[float] = Query(None, ge=0, le=60),
+):
+    """
+    Delete every live application matching the ``column[__op]=value``
+    filters (at least one is required), in batches.
+
+    Works like ``DELETE /candidates/``: short transactions of ``batch_size``
+    rows, ``pause`` seconds apart, with one JSON line of progress per batch.
+    """
+    # batches commit on their own sessions, which would escape a shared one
+    if database.in_shared_session():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bulk deletes cannot run inside a batch"
+        )
+    filters = filters_from_query_params(request.query_params, PURGE_APPLICATIONS_PARAMS)
+    lines = await purge.progress_lines(
+        database.AsyncSessionLocal, "applications", filters, batch_size=batch_size, pause=pause
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
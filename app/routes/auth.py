@@ -1,17 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_session
 from app.core.db_client import DBClient
-from app.core import security
-from app.schemas.user import UserCreate, UserRead, Token, TokenInfo
+from app.core import revocation, security
+from app.schemas.user import UserCreate, UserRead, Token, TokenInfo, TokenRevoke, TokenRevocationRead
 
-from datetime import datetime, timezone
-import traceback
+from datetime import datetime, timedelta, timezone
 import jwt
+import logging
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["Auth"])
 
 @router.post("/login", response_model=Token)
@@ -52,8 +54,8 @@ async def create_user(
             "users",
             payload
         )
-    except Exception as e:
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Could not create user")
         raise HTTPException(status_code=400, detail="Internal error while creating user")
 
     if not new_user:
@@ -78,6 +80,8 @@ async def validate_token(token: str = Depends(security.oauth2_scheme)):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Token has expired")
     except jwt.PyJWTError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
+    if revocation.revocations.loaded and revocation.revocations.is_revoked(payload):
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Token has been revoked")
 
     exp_timestamp = payload.get("exp")
     if exp_timestamp is None:
@@ -91,4 +95,64 @@ async def validate_token(token: str = Depends(security.oauth2_scheme)):
         "exp": exp_dt,
         "sub": payload.get("sub"),
         "expires_in": remaining,
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    token: str = Depends(security.oauth2_scheme),
+    user = Depends(security.get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Revoke the token this request is made with.
+    """
+    payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    if not payload.get("jti"):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Token has no jti and cannot be revoked; it expires on its own")
+    await revocation.revoke(
+        DBClient(session),
+        expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+        jti=payload["jti"],
+        reason="logout",
+    )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/revoke", response_model=TokenRevocationRead, status_code=status.HTTP_201_CREATED)
+async def revoke_token(
+    data: TokenRevoke,
+    admin = Depends(security.require_admin),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Revoke a token (given itself or its ``jti``) or every token of a user
+    issued so far. Admins only.
+
+    Other workers reject the revoked tokens within ``REVOCATION_REFRESH_SECONDS``.
+    """
+    # the longest a token issued now stays valid
+    latest_expiry = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    jti, expires_at = data.jti, latest_expiry
+    if data.token is not None:
+        try:
+            payload = jwt.decode(
+                data.token,
+                settings.JWT_SECRET,
+                algorithms=[settings.JWT_ALGORITHM],
+                options={"verify_exp": False},
+            )
+        except jwt.PyJWTError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid token")
+        if payload.get("jti"):
+            jti = payload["jti"]
+            expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+        else:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Token has no jti; revoke its user instead")
+    return await revocation.revoke(
+        DBClient(session),
+        expires_at=expires_at,
+        jti=jti,
+        user_id=str(data.user_id) if data.user_id else None,
+        reason=data.reason or f"revoked by {admin.get('id')}",
+    )
@@ -0,0 +1,185 @@
+import json
+import logging
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.middleware.exceptions import ExceptionMiddleware
+
+from app.core import rate_limit, result_cache
+from app.core.config import settings
+from app.core.database import get_session, sharing_session
+from app.core.security import authenticated_as, get_current_user
+from app.schemas.batch import BatchOperation, BatchOperationResult, BatchRequest, BatchResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Batch"])
+
+# response headers not passed on in operation results
+SKIPPED_HEADERS = {"content-length", "content-type"}
+
+NOT_EXECUTED = BatchOperationResult(status=424, body={"detail": "Not executed: an earlier operation failed"})
+
+
+def _operation_handler(app: FastAPI):
+    """
+    The app's router wrapped in its exception handlers, built once per app.
+
+    Operations skip the app's middleware (rate limiting, idempotency,
+    request logging): the batch request went through it already, and its
+    operations are charged to the rate limiter by ``charge_operations``.
+    """
+    handler = getattr(app.state, "batch_operation_handler", None)
+    if handler is None:
+        handlers = {key: value for key, value in app.exception_handlers.items() if key not in (500, Exception)}
+        handler = ExceptionMiddleware(app.router, handlers=handlers)
+        app.state.batch_operation_handler = handler
+    return handler
+
+
+def charge_operations(scope: Dict[str, Any], operations) -> None:
+    """
+    Charge the caller's rate limit bucket the summed route weights of
+    ``operations``, as if they had been sent one by one.
+
+    :raises HTTPException: 429 if the bucket can't cover them; nothing has run yet.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    # resolved here so the module-level limiter can be swapped in tests
+    limiter = rate_limit.limiter
+    weight = sum(limiter.weight_for(op.method, op.path.partition("?")[0]) for op in operations)
+    allowed, retry_after = limiter.charge(rate_limit.client_id_from_scope(scope), weight, "POST /batch operations")
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": rate_limit.retry_after_header(retry_after)},
+        )
+
+
+async def run_operation(handler, parent_scope: Dict[str, Any], operation: BatchOperation) -> BatchOperationResult:
+    """
+    Dispatch one operation to its route in-process and collect the response.
+
+    The batch's ``Authorization`` header is passed on; unexpected errors
+    become a 500 result instead of failing the batch.
+    """
+    path, _, query = operation.path.partition("?")
+    body = b"" if operation.body is None else json.dumps(operation.body).encode()
+    headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in operation.headers.items()]
+    headers += [(name, value) for name, value in parent_scope["headers"] if name == b"authorization"]
+    if body:
+        headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": operation.method,
+        "scheme": parent_scope.get("scheme", "http"),
+        "server": parent_scope.get("server"),
+        "client": parent_scope.get("client"),
+        "root_path": parent_scope.get("root_path", ""),
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "app": parent_scope.get("app"),
+        "state": dict(parent_scope.get("state", {})),
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            return {"type": "http.disconnect"}
+        request_sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    response: Dict[str, Any] = {"status": 500, "headers": [], "body": b""}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    try:
+        await handler(scope, receive, send)
+    except Exception:
+        logger.exception("Batch operation %s %s failed", operation.method, path)
+        return BatchOperationResult(status=500, body={"detail": "Internal Server Error"})
+
+    result_headers = {}
+    content_type = ""
+    for name, value in response["headers"]:
+        name = name.decode("latin-1").lower()
+        if name == "content-type":
+            content_type = value.decode("latin-1")
+        if name not in SKIPPED_HEADERS:
+            result_headers[name] = value.decode("latin-1")
+
+    result_body: Any = None
+    if response["body"]:
+        if content_type.startswith("application/json"):
+            result_body = json.loads(response["body"])
+        else:
+            result_body = response["body"].decode("utf-8", errors="replace")
+    return BatchOperationResult(status=response["status"], headers=result_headers, body=result_body)
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    current_user=Depends(get_current_user),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Run several candidate and application requests in one round trip.
+
+    Operations run in order with the batch's authentication (checked once)
+    and one database session, and are committed together at the end. Each
+    operation's status, headers and body are returned in order.
+
+    By default an operation that fails (status >= 400) is rolled back to a
+    savepoint and the rest still run. With ``atomic`` the first failure
+    rolls back the whole batch and the remaining operations are not
+    executed (status 424).
+
+    Every operation counts against the caller's rate limit with its
+    route's weight; a batch the limit can't cover is rejected with 429
+    before anything runs.
+    """
+    charge_operations(request.scope, payload.operations)
+    handler = _operation_handler(request.app)
+    results = []
+    failed = False
+    with sharing_session(session), authenticated_as(current_user):
+        for operation in payload.operations:
+            if failed:
+                results.append(NOT_EXECUTED)
+                continue
+            if payload.atomic:
+                result = await run_operation(handler, request.scope, operation)
+                failed = result.status >= 400
+            else:
+                savepoint = await session.begin_nested()
+                result = await run_operation(handler, request.scope, operation)
+                if result.status >= 400:
+                    await savepoint.rollback()
+                    # the operation may have written before failing
+                    result_cache.cache.versions.bump(*session.info.get(result_cache.WRITTEN_TABLES_KEY, ()))
+                else:
+                    await savepoint.commit()
+            results.append(result)
+
+    if failed:
+        await session.rollback()
+    else:
+        await session.commit()
+    return BatchResponse(committed=not failed, results=results)
@@ -1,17 +1,43 @@
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db_client import DBClient
+from app.core.db_client import DBClient, StaleVersionError
+from app.core import analytics, batching, database, dedupe, purge, result_cache, skill_index
+from app.core.config import settings
 from app.core.database import get_session
+from app.core.query import filters_from_query_params, sort_rows, split_list_param
 from app.core.security import get_current_user
+from app.core.versioning import etag_for, parse_if_match, precondition_failed
 from app.models.application import ApplicationStatus
+from app.schemas.candidate import CandidateMatch, CandidateMerge
 
 
 router = APIRouter(tags=["Candidate"], dependencies=[Depends(get_current_user)])
 
+# query parameters of the list endpoints that are not column filters
+LIST_CANDIDATES_PARAMS = ("skill", "limit", "offset", "order_by", "fields", "include_total")
+PURGE_CANDIDATES_PARAMS = ("skill", "batch_size", "pause")
+LIST_APPLICATIONS_PARAMS = ("status", "limit", "offset", "order_by", "fields", "include_total", "include_archived")
+
+
+async def set_total_count_headers(
+    db: DBClient,
+    response: Response,
+    table_name: str,
+    filters: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Add ``X-Total-Count`` (and ``X-Total-Count-Estimated`` when the total is
+    a planner/statistics estimate) to a listing response.
+    """
+    total, estimated = await db.count_table_data(table_name, filters=filters)
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Estimated"] = "true" if estimated else "false"
+
 
 @router.post("/", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED)
 async def create_candidate(
@@ -28,28 +54,163 @@ async def create_candidate(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to create candidate"
         )
+    skill_index.candidate_written(session, created)
     return created
 
 
 @router.get("/", response_model=List[Dict[str, Any]])
 async def list_candidates(
+    request: Request,
+    response: Response,
     skill: Optional[str] = None,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
+    order_by: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
     session: AsyncSession = Depends(get_session),
 ):
     """
     List candidates, optionally filtered by skill.
+
+    Any other ``column[__op]=value`` query parameter is applied as a filter
+    (e.g. ``full_name__prefix=Al``, ``created_at__gte=2025-01-01``).
+    ``order_by`` takes comma separated columns (``-`` for descending) and
+    ``fields`` limits the returned columns. With ``include_total`` the
+    number of matching candidates is returned in ``X-Total-Count``.
+
+    Responses are served from the result cache until candidates change.
+    """
+    cached = result_cache.cache.lookup(request, ("candidates",))
+    if cached.response is not None:
+        return cached.response
+
+    db = DBClient(session)
+    filters = filters_from_query_params(request.query_params, LIST_CANDIDATES_PARAMS)
+    if skill:
+        filters["skills__contains"] = [skill]
+    results = await db.query_table_data(
+        "candidates",
+        filters=filters or None,
+        limit=limit,
+        offset=offset,
+        order_by=split_list_param(order_by),
+        fields=split_list_param(fields),
+    )
+    if include_total:
+        await set_total_count_headers(db, response, "candidates", filters or None)
+    return result_cache.cache.store(cached, results, response)
+
+
+@router.delete("/")
+async def purge_candidates(
+    request: Request,
+    skill: Optional[str] = None,
+    batch_size: Optional[int] = Query(None, ge=1, le=10000),
+    pause: Optional[float] = Query(None, ge=0, le=60),
+):
+    """
+    Delete every candidate matching the filters, with their applications.
+
+    Takes the candidate listing's ``column[__op]=value`` filters (at least
+    one is required). Candidates are deleted in batches of ``batch_size``
+    (``PURGE_BATCH_SIZE``), each in its own short transaction, pausing
+    ``pause`` seconds (``PURGE_PAUSE_SECONDS``) in between. The response
+    streams one JSON line of progress per batch, the last one with
+    ``"done": true``. A purge cut short (e.g. by the request deadline) can
+    simply be repeated; what was deleted stays deleted.
+    """
+    # batches commit on their own sessions, which would escape a shared one
+    if database.in_shared_session():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bulk deletes cannot run inside a batch"
+        )
+    filters = filters_from_query_params(request.query_params, PURGE_CANDIDATES_PARAMS)
+    if skill:
+        filters["skills__contains"] = [skill]
+    lines = await purge.progress_lines(
+        database.AsyncSessionLocal, "candidates", filters, batch_size=batch_size, pause=pause
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+
+@router.get("/duplicates", response_model=List[Dict[str, Any]])
+async def list_duplicate_candidates(threshold: Optional[float] = None):
     """
+    List clusters of candidates that are likely the same person.
+
+    Candidates are matched on normalized email, phone and name; ``threshold``
+    (0-1) raises the minimum match score. Clusters come from the last
+    background scan (every ``DEDUPE_SCAN_INTERVAL_SECONDS``); until the
+    first one finishes the response is 503.
+    """
+    if not dedupe.scan.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Duplicate scan has not finished yet",
+            headers={"Retry-After": "30"},
+        )
+    return dedupe.scan.clusters(threshold)
+
+
+@router.post("/match", response_model=List[Dict[str, Any]])
+async def match_candidates(
+    payload: CandidateMatch,
+    response: Response,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Rank candidates by how well their skills fit a job.
+
+    Each candidate is scored by the weighted share of the job's skills they
+    have (required skills count double by default, see ``weights``);
+    results are the best ``limit`` candidates with their ``score`` and
+    ``matched_skills``. ``X-Total-Count`` is the number of candidates that
+    matched at all. Skills are compared case-insensitively.
+
+    Answers 503 until this worker's skill index has been built.
+    """
+    if not skill_index.index.built:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Skill index is still being built",
+            headers={"Retry-After": "30"},
+        )
     db = DBClient(session)
-    filters = {"skills": skill} if skill else None
-    results = await db.query_table_data("candidates", filters=filters, limit=limit, offset=offset)
+    by_id: Dict[str, Dict[str, Any]] = {}
+    while True:
+        ranked, matched = skill_index.index.match(
+            required=payload.required,
+            nice_to_have=payload.nice_to_have,
+            weights=payload.weights,
+            require_all=payload.require_all,
+            limit=payload.limit,
+        )
+        wanted = [r["id"] for r in ranked if r["id"] not in by_id]
+        if not wanted:
+            break
+        rows = await db.query_table_data("candidates", filters={"id__in": wanted})
+        by_id.update((str(r["id"]), r) for r in rows)
+        missing = [i for i in wanted if i not in by_id]
+        if not missing:
+            break
+        # deleted since they were indexed: drop them and rank again, so
+        # the next best candidates fill their places
+        for candidate_id in missing:
+            skill_index.index.remove(candidate_id)
+    results = [
+        {**by_id[r["id"]], "score": r["score"], "matched_skills": r["matched_skills"]}
+        for r in ranked
+    ]
+    response.headers["X-Total-Count"] = str(matched)
     return results
 
 
 @router.get("/{candidate_id}", response_model=Dict[str, Any])
 async def get_candidate_by_id(
     candidate_id: UUID,
+    response: Response,
     session: AsyncSession = Depends(get_session),
 ):
     """
@@ -66,31 +227,105 @@ async def get_candidate_by_id(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Candidate not found"
         )
+    if result.get("version") is not None:
+        response.headers["ETag"] = etag_for(result["version"])
     return result
 
 @router.put("/{candidate_id}", response_model=Dict[str, Any])
 async def update_candidate(
     candidate_id: UUID,
     payload:      Dict[str, Any],
+    response:     Response,
+    if_match:     Optional[str] = Header(None),
     session: AsyncSession = Depends(get_session),
 ):
     """
     Update an existing candidate.
+
+    Send the candidate's ``ETag`` back as ``If-Match`` to only apply the
+    update if nobody changed the candidate in the meantime (412 otherwise).
     """
     db = DBClient(session)
-    updated = await db.update_table_entry(
-        "candidates",
-        identifier={"id": str(candidate_id)},
-        update_data=payload
-    )
+    try:
+        updated = await db.update_table_entry(
+            "candidates",
+            identifier={"id": str(candidate_id)},
+            update_data=payload,
+            expected_version=parse_if_match(if_match)
+        )
+    except StaleVersionError as e:
+        raise precondition_failed(e.current_version, "Candidate was modified by another request")
     if not updated:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Candidate not found or update failed"
         )
+    skill_index.candidate_written(session, updated)
+    if updated.get("version") is not None:
+        response.headers["ETag"] = etag_for(updated["version"])
     return updated
 
 
+@router.delete("/{candidate_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_candidate(
+    candidate_id: UUID,
+    if_match: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Delete a candidate together with their live and archived applications.
+
+    Send the candidate's ``ETag`` as ``If-Match`` to only delete it if
+    nobody changed it in the meantime (412 otherwise).
+    """
+    db = DBClient(session)
+    try:
+        deleted = await purge.delete_by_id(
+            db, "candidates", str(candidate_id), expected_version=parse_if_match(if_match)
+        )
+    except StaleVersionError as e:
+        raise precondition_failed(e.current_version, "Candidate was modified by another request")
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Candidate not found"
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.post("/{candidate_id}/merge", response_model=Dict[str, Any])
+async def merge_candidates(
+    candidate_id: UUID,
+    payload:      CandidateMerge,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Merge duplicate candidates into this one.
+
+    Their applications are moved to this candidate and the duplicates are
+    deleted, all in one transaction. Answers 409 if this candidate was
+    changed concurrently.
+    """
+    db = DBClient(session)
+    try:
+        merged = await dedupe.merge_candidates(
+            db, str(candidate_id), [str(d) for d in payload.duplicate_ids]
+        )
+    except StaleVersionError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Candidate was modified by another request"
+        )
+    if not merged:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Candidate or duplicate not found"
+        )
+    skill_index.candidates_deleted(session, [str(d) for d in payload.duplicate_ids if d != candidate_id])
+    skill_index.candidate_written(session, merged)
+    return merged
+
+
 # -- Nested application routes ------------------------------------------------
 @router.post("/{candidate_id}/applications", response_model=Dict[str, Any], status_code=status.HTTP_201_CREATED)
 async def create_application(
@@ -104,7 +339,16 @@ async def create_application(
     db = DBClient(session)
     # ensure the FK is set
     data = {**payload, "candidate_id": str(candidate_id)}
-    created = await db.create_table_entry("applications", data)
+    # always generated: the partitioned table's (id, applied_at) primary key
+    # can't keep client-chosen ids unique
+    data.pop("id", None)
+    # the batching writer commits on its own session, which would escape a shared one
+    if settings.APPLICATION_INSERT_BATCHING and not database.in_shared_session():
+        created = await batching.application_writer.submit(data)
+    else:
+        created = await db.create_table_entry("applications", data)
+        if created:
+            await analytics.record_created(session, [created])
     if not created:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -115,11 +359,24 @@ async def create_application(
 @router.get("/{candidate_id}/applications", response_model=List[Dict[str, Any]])
 async def list_applications_for_candidate(
     candidate_id: UUID,
+    request: Request,
+    response: Response,
     status: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    order_by: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False,
+    include_archived: bool = False,
     session: AsyncSession = Depends(get_session),
 ):
     """
     List all applications for a given candidate.
+
+    Accepts the same filter, ``order_by``, ``fields`` and ``include_total``
+    parameters as the candidate listing. Closed applications moved to the
+    archive are only included with ``include_archived``; those rows carry
+    ``"archived": true``.
     """
     db = DBClient(session)
     
@@ -129,8 +386,46 @@ async def list_applications_for_candidate(
             status_code=400,
             detail=f"Invalid application status: {status}"
         )
-    results = await db.query_table_data(
-        "applications",
-        filters={"candidate_id": str(candidate_id), "status": status} if status else {"candidate_id": str(candidate_id)}
+    tables = ("applications", "applications_archive") if include_archived else ("applications",)
+    cached = result_cache.cache.lookup(request, tables)
+    if cached.response is not None:
+        return cached.response
+    filters = filters_from_query_params(request.query_params, LIST_APPLICATIONS_PARAMS)
+    filters["candidate_id"] = str(candidate_id)
+    if status:
+        filters["status"] = status
+    order_by = split_list_param(order_by)
+    fields = split_list_param(fields)
+
+    if not include_archived:
+        results = await db.query_table_data(
+            "applications",
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            order_by=order_by,
+            fields=fields,
+        )
+        if include_total:
+            await set_total_count_headers(db, response, "applications", filters)
+        return result_cache.cache.store(cached, results, response)
+
+    # both tables are read up to offset + limit rows, then merged and paged here
+    window = None if limit is None else (offset or 0) + limit
+    live = await db.query_table_data(
+        "applications", filters=filters, limit=window, order_by=order_by, fields=fields
     )
-    return results
+    archived = await db.query_table_data(
+        "applications_archive", filters=filters, limit=window, order_by=order_by, fields=fields
+    )
+    results = sort_rows(
+        [{**r, "archived": False} for r in live] + [{**r, "archived": True} for r in archived],
+        order_by,
+    )
+    results = results[offset or 0:window]
+    if include_total:
+        live_total, live_estimated = await db.count_table_data("applications", filters=filters)
+        archived_total, archived_estimated = await db.count_table_data("applications_archive", filters=filters)
+        response.headers["X-Total-Count"] = str(live_total + archived_total)
+        response.headers["X-Total-Count-Estimated"] = "true" if live_estimated or archived_estimated else "false"
+    return result_cache.cache.store(cached, results, response)
@@ -0,0 +1,94 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core import batching, circuit_breaker, db_client, deadlines, dedupe, rate_limit, result_cache, revocation, single_flight, skill_index
+from app.core.security import get_current_user
+
+router = APIRouter(tags=["Monitoring"], dependencies=[Depends(get_current_user)])
+
+
+@router.get("/limits", response_model=Dict[str, Any])
+async def get_limiter_stats():
+    """
+    Rate limiter and admission control counters.
+    """
+    return {
+        "rate_limit": rate_limit.limiter.stats(),
+        "admission": rate_limit.admission.stats(),
+    }
+
+
+@router.get("/writes", response_model=Dict[str, Any])
+async def get_write_batching_stats():
+    """
+    Batched insert counters.
+    """
+    return {"applications": batching.application_writer.stats()}
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def get_result_cache_stats():
+    """
+    List result cache counters.
+    """
+    return result_cache.cache.stats()
+
+
+@router.get("/statements", response_model=Dict[str, Any])
+async def get_statement_cache_stats():
+    """
+    Statement template and compiled SQL cache hit rates.
+    """
+    return db_client.statement_stats.stats()
+
+
+@router.get("/circuit", response_model=Dict[str, Any])
+async def get_circuit_breaker_stats():
+    """
+    Database circuit breaker state and stale cache counters.
+    """
+    return {
+        "circuit": circuit_breaker.breaker.stats(),
+        "stale_cache": circuit_breaker.stale_cache.stats(),
+    }
+
+
+@router.get("/deadlines", response_model=Dict[str, Any])
+async def get_deadline_stats():
+    """
+    Configured request deadlines and timeouts per route.
+    """
+    return deadlines.policy.stats()
+
+
+@router.get("/duplicates", response_model=Dict[str, Any])
+async def get_duplicate_scan_stats():
+    """
+    Progress of the background duplicate candidate scan.
+    """
+    return dedupe.scan.stats()
+
+
+@router.get("/skill-index", response_model=Dict[str, Any])
+async def get_skill_index_stats():
+    """
+    Size of the in-process skill index behind candidate matching.
+    """
+    return skill_index.index.stats()
+
+
+@router.get("/single-flight", response_model=Dict[str, Any])
+async def get_single_flight_stats():
+    """
+    Reads that shared a concurrent identical query instead of running their own.
+    """
+    return single_flight.reads.stats()
+
+
+@router.get("/revocations", response_model=Dict[str, Any])
+async def get_revocation_stats():
+    """
+    Revoked tokens and users currently held in memory.
+    """
+    return revocation.revocations.stats()
@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.core.config import settings
+
+# sub-requests may only target these routes
+BATCH_PATH_PREFIXES = ("/candidates", "/applications")
+
+
+class BatchOperation(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    # path with optional query string, e.g. "/candidates/{id}/applications?status=APPLIED"
+    path: str
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+    @field_validator("path")
+    @classmethod
+    def check_path(cls, path: str) -> str:
+        route = path.split("?", 1)[0]
+        if ".." in route or not any(route == p or route.startswith(p + "/") for p in BATCH_PATH_PREFIXES):
+            raise ValueError(f"path must start with one of {', '.join(BATCH_PATH_PREFIXES)}")
+        return path
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=settings.BATCH_MAX_OPERATIONS)
+    # all operations are committed together, or none if any fails
+    atomic: bool = False
+
+
+class BatchOperationResult(BaseModel):
+    status: int
+    headers: Dict[str, str] = {}
+    body: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[BatchOperationResult]
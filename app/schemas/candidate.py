@@ -0,0 +1,29 @@
+from typing import Dict, List
+from uuid import UUID
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.config import settings
+
+
+class CandidateMerge(BaseModel):
+    duplicate_ids: List[UUID]
+
+
+class CandidateMatch(BaseModel):
+    """
+    A job's skills to rank candidates against.
+    """
+    required: List[str] = []
+    nice_to_have: List[str] = []
+    # per-skill weights overriding the required / nice-to-have defaults
+    weights: Dict[str, float] = {}
+    # only rank candidates having every required skill
+    require_all: bool = False
+    limit: int = Field(20, ge=1, le=settings.MATCH_MAX_RESULTS)
+
+    @model_validator(mode="after")
+    def has_skills(self) -> "CandidateMatch":
+        if not any(s.strip() for s in self.required + self.nice_to_have):
+            raise ValueError("At least one required or nice-to-have skill is needed")
+        return self
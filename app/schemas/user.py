@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, model_validator
+from typing import Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -21,4 +22,27 @@ class Token(BaseModel):
 class TokenInfo(BaseModel):
     exp: datetime
     sub: str
-    expires_in: int  # seconds remaining
\ No newline at end of file
+    expires_in: int  # seconds remaining
+
+class TokenRevoke(BaseModel):
+    """
+    What to revoke: one token (itself or its ``jti``) or every current token of a user.
+    """
+    token: Optional[str] = None
+    jti: Optional[str] = None
+    user_id: Optional[UUID] = None
+    reason: Optional[str] = None
+
+    @model_validator(mode="after")
+    def one_target(self) -> "TokenRevoke":
+        if sum(v is not None for v in (self.token, self.jti, self.user_id)) != 1:
+            raise ValueError("Give exactly one of token, jti or user_id")
+        return self
+
+class TokenRevocationRead(BaseModel):
+    id: int
+    jti: Optional[str] = None
+    user_id: Optional[UUID] = None
+    reason: Optional[str] = None
+    revoked_at: Optional[datetime] = None
+    expires_at: datetime
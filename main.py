@@ -1,42 +1,122 @@
+import logging
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from app.core import analytics, batching, circuit_breaker, database, deadlines, dedupe, logs, partitions, result_cache, revocation, server, skill_index
 from app.core.config import settings
-from app.routes import auth, candidate, application
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.query import InvalidQueryError
+from app.core.rate_limit import RateLimitMiddleware
+from app.routes import auth, batch, candidate, application, monitoring
+
+logger = logging.getLogger(__name__)
 
 # Declare openapi tags
 openapi_tags = [
     {"name": "Auth", "description": "Endpoints for user signup, login, and token validation"},
     {"name": "Candidate", "description": "Candidate management operations"},
     {"name": "Application", "description": "Job application management operations"},
+    {"name": "Batch", "description": "Several candidate and application operations in one request"},
+    {"name": "Monitoring", "description": "Runtime counters for operators"},
 ]
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    description=settings.PROJECT_DESCRIPTION,
-    version=settings.PROJECT_VERSION,
-    openapi_tags=openapi_tags
-)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the connection pool, create upcoming application partitions, load
+    token revocations, start building the skill index, the duplicate scan
+    and the analytics rollup refresh and subscribe to result cache
+    invalidations on startup; write out batched inserts, stop background
+    tasks and release the pool on shutdown.
+    """
+    try:
+        await database.warm_up_pool(settings.DB_POOL_WARMUP)
+    except Exception:
+        # the app can still serve once the database is reachable
+        logger.exception("Connection pool warm-up failed")
+    try:
+        async with database.AsyncSessionLocal() as session:
+            await partitions.ensure_partitions(session)
+            await session.commit()
+    except Exception:
+        # e.g. no DDL privileges; the partitions command can be run instead
+        logger.exception("Could not create application partitions")
+    await revocation.revocations.start()
+    await skill_index.index.start()
+    await dedupe.scan.start()
+    await analytics.rollups.start()
+    listener = None
+    if settings.RESULT_CACHE_ENABLED and settings.RESULT_CACHE_NOTIFY:
+        listener = result_cache.InvalidationListener()
+        try:
+            await listener.start()
+        except Exception:
+            # the cache stays bypassed until the listener's retries get through
+            logger.exception("Could not listen for result cache invalidations")
+    yield
+    if listener is not None:
+        await listener.stop()
+    await batching.application_writer.drain()
+    await circuit_breaker.breaker.stop()
+    await revocation.revocations.stop()
+    await skill_index.index.stop()
+    await dedupe.scan.stop()
+    await analytics.rollups.stop()
+    await database.dispose_engine()
 
-# Routers
-app.include_router(auth.router, prefix="/auth")
-app.include_router(candidate.router, prefix="/candidates")
-app.include_router(application.router, prefix="/applications")
 
+async def invalid_query_handler(request: Request, exc: InvalidQueryError):
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
+
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application.
+    """
+    logs.configure_logging()
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        description=settings.PROJECT_DESCRIPTION,
+        version=settings.PROJECT_VERSION,
+        openapi_tags=openapi_tags,
+        lifespan=lifespan,
     )
+
+    app.add_middleware(deadlines.DeadlineMiddleware)
+    app.add_middleware(IdempotencyMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+    # outside admission control, so requests fail fast instead of queueing
+    app.add_middleware(circuit_breaker.CircuitBreakerMiddleware)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # outermost, so every request (including rejected ones) gets an id and a log line
+    app.add_middleware(logs.RequestContextMiddleware)
+
+    app.add_exception_handler(InvalidQueryError, invalid_query_handler)
+
+    # Routers
+    app.include_router(auth.router, prefix="/auth")
+    app.include_router(candidate.router, prefix="/candidates")
+    app.include_router(application.router, prefix="/applications")
+    app.include_router(batch.router, prefix="/batch")
+    app.include_router(monitoring.router, prefix="/monitoring")
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    uvicorn.run("main:app", **server.uvicorn_options(settings))
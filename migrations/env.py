@@ -14,6 +14,8 @@ from app.core.database import Base
 import app.models.user
 import app.models.candidate
 import app.models.application
+import app.models.idempotency
+import app.models.revocation
 
 
 
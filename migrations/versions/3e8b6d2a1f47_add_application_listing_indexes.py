@@ -0,0 +1,79 @@
+"""add composite indexes for the global application listing
+
+Revision ID: 3e8b6d2a1f47
+Revises: 7d2f4e1c9a30
+Create Date: 2026-10-19 15:27:43.106382
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e8b6d2a1f47'
+down_revision: Union[str, Sequence[str], None] = '7d2f4e1c9a30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# the listing indexes and their columns
+INDEXES = {
+    'ix_applications_applied_at_id': ['applied_at', 'id'],
+    'ix_applications_job_title_applied_at_id': ['job_title', 'applied_at', 'id'],
+    'ix_applications_status_applied_at_id': ['status', 'applied_at', 'id'],
+    'ix_applications_status_job_title_applied_at_id': ['status', 'job_title', 'applied_at', 'id'],
+}
+
+
+def partition_index(name: str, partition: str) -> str:
+    # e.g. applications_y2026m10_status_applied_at_id
+    return partition + name[len('ix_applications'):]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX on the partitioned table would hold a SHARE lock on every
+    # partition, blocking application writes, for the whole build. Instead the
+    # parent index is created ON ONLY applications (invalid, no rows read),
+    # each partition's index is built CONCURRENTLY and then attached; the
+    # parent index becomes valid once every partition has one. Partitions
+    # attached later get a matching index built on attach.
+    for name, columns in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY applications ({', '.join(columns)})")
+    partitions = [
+        row[0] for row in op.get_bind().execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'applications'::regclass ORDER BY c.relname"
+        ))
+    ]
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            for partition in partitions:
+                index = partition_index(name, partition)
+                # a build that failed halfway leaves an invalid index, which
+                # IF NOT EXISTS would keep; drop it so the rerun rebuilds it
+                invalid = op.get_bind().execute(
+                    sa.text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index)"),
+                    {"index": index},
+                ).scalar()
+                if invalid:
+                    op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+                op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {partition} ({', '.join(columns)})")
+    for name in INDEXES:
+        for partition in partitions:
+            op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index(name, partition)}")
+    # job_title lookups are served by the composite index from now on; the
+    # drop takes a brief ACCESS EXCLUSIVE lock (partitioned indexes can't be
+    # dropped concurrently) but does no work under it
+    op.drop_index(op.f('ix_applications_job_title'), table_name='applications')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_applications_job_title'), 'applications', ['job_title'], unique=False)
+    op.drop_index('ix_applications_status_job_title_applied_at_id', table_name='applications')
+    op.drop_index('ix_applications_status_applied_at_id', table_name='applications')
+    op.drop_index('ix_applications_job_title_applied_at_id', table_name='applications')
+    op.drop_index('ix_applications_applied_at_id', table_name='applications')
@@ -0,0 +1,67 @@
+"""add application status history and stage rollups
+
+Revision ID: 5c1e9a7f2b84
+Revises: dbed2c2326f0
+Create Date: 2026-10-19 15:12:40.204871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9a7f2b84'
+down_revision: Union[str, Sequence[str], None] = 'dbed2c2326f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('application_status_history',
+        sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+        sa.Column('application_id', sa.UUID(), nullable=False),
+        sa.Column('job_title', sa.String(length=255), nullable=False),
+        sa.Column('from_status', postgresql.ENUM(name='application_status', create_type=False), nullable=True),
+        sa.Column('to_status', postgresql.ENUM(name='application_status', create_type=False), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_application_status_history_application_changed', 'application_status_history', ['application_id', 'changed_at'], unique=False)
+    op.create_index(op.f('ix_application_status_history_changed_at'), 'application_status_history', ['changed_at'], unique=False)
+    op.create_index(op.f('ix_application_status_history_job_title'), 'application_status_history', ['job_title'], unique=False)
+
+    op.create_table('application_stage_rollups',
+        sa.Column('job_title', sa.String(length=255), nullable=False),
+        sa.Column('stage', postgresql.ENUM(name='application_status', create_type=False), nullable=False),
+        sa.Column('entered', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('exits', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('seconds_in_stage', postgresql.DOUBLE_PRECISION(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('job_title', 'stage')
+    )
+    op.create_table('rollup_watermarks',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('processed_until', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.execute("INSERT INTO rollup_watermarks (name, processed_until) VALUES ('application_stages', '1970-01-01')")
+
+    # funnel entry counts are grouped by job title
+    op.create_index(op.f('ix_applications_job_title'), 'applications', ['job_title'], unique=False)
+    op.create_index(op.f('ix_applications_archive_job_title'), 'applications_archive', ['job_title'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_applications_archive_job_title'), table_name='applications_archive')
+    op.drop_index(op.f('ix_applications_job_title'), table_name='applications')
+    op.drop_table('rollup_watermarks')
+    op.drop_table('application_stage_rollups')
+    op.drop_index(op.f('ix_application_status_history_job_title'), table_name='application_status_history')
+    op.drop_index(op.f('ix_application_status_history_changed_at'), table_name='application_status_history')
+    op.drop_index('ix_application_status_history_application_changed', table_name='application_status_history')
+    op.drop_table('application_status_history')
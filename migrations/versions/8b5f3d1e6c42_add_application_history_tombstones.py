@@ -0,0 +1,32 @@
+"""add application history tombstones
+
+Revision ID: 8b5f3d1e6c42
+Revises: e4a7c2b9d613
+Create Date: 2026-10-19 18:20:37.615204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b5f3d1e6c42'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2b9d613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('application_history_tombstones',
+        sa.Column('application_id', sa.UUID(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('application_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('application_history_tombstones')
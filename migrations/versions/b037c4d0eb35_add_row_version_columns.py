@@ -0,0 +1,30 @@
+"""add row version columns
+
+Revision ID: b037c4d0eb35
+Revises: a9385c080225
+Create Date: 2026-10-19 10:03:17.552190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b037c4d0eb35'
+down_revision: Union[str, Sequence[str], None] = 'a9385c080225'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('candidates', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('applications', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('applications', 'version')
+    op.drop_column('candidates', 'version')
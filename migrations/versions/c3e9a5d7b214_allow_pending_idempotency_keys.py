@@ -0,0 +1,35 @@
+"""allow idempotency keys claimed by a running request
+
+Revision ID: c3e9a5d7b214
+Revises: 8b5f3d1e6c42
+Create Date: 2026-10-19 18:41:09.382615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a5d7b214'
+down_revision: Union[str, Sequence[str], None] = '8b5f3d1e6c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a claim is a row without a response yet
+    op.alter_column('idempotency_keys', 'status_code', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('idempotency_keys', 'headers', existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    op.alter_column('idempotency_keys', 'body', existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM idempotency_keys WHERE status_code IS NULL")
+    op.alter_column('idempotency_keys', 'body', existing_type=sa.LargeBinary(), nullable=False)
+    op.alter_column('idempotency_keys', 'headers', existing_type=postgresql.JSONB(astext_type=sa.Text()), nullable=False)
+    op.alter_column('idempotency_keys', 'status_code', existing_type=sa.Integer(), nullable=False)
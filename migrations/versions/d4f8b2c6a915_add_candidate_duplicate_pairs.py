@@ -0,0 +1,34 @@
+"""add candidate duplicate pairs
+
+Revision ID: d4f8b2c6a915
+Revises: c3e9a5d7b214
+Create Date: 2026-10-19 19:02:51.870346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f8b2c6a915'
+down_revision: Union[str, Sequence[str], None] = 'c3e9a5d7b214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('candidate_duplicate_pairs',
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('duplicate_id', sa.UUID(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('candidate_id', 'duplicate_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM rollup_watermarks WHERE name = 'candidate_duplicates'")
+    op.drop_table('candidate_duplicate_pairs')
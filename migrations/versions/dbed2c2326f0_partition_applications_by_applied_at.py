@@ -0,0 +1,151 @@
+"""partition applications by applied_at and add applications_archive
+
+Revision ID: dbed2c2326f0
+Revises: b037c4d0eb35
+Create Date: 2026-10-19 13:41:05.918334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dbed2c2326f0'
+down_revision: Union[str, Sequence[str], None] = 'b037c4d0eb35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# monthly partitions to create beyond the current month
+MONTHS_AHEAD = 3
+
+CREATE_PARTITION_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_applications_partition(month_start date)
+RETURNS boolean AS $$
+DECLARE
+    part_name text := 'applications_y' || to_char(month_start, 'YYYY') || 'm' || to_char(month_start, 'MM');
+    month_end date := (month_start + interval '1 month')::date;
+BEGIN
+    IF to_regclass(part_name) IS NOT NULL THEN
+        RETURN false;
+    END IF;
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE applications INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+        part_name
+    );
+    -- rows for this month that landed in the default partition move along,
+    -- otherwise ATTACH would fail on the default partition's constraint
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM applications_default WHERE applied_at >= %L AND applied_at < %L RETURNING *) '
+        'INSERT INTO %I SELECT * FROM moved',
+        month_start, month_end, part_name
+    );
+    EXECUTE format(
+        'ALTER TABLE applications ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        part_name, month_start, month_end
+    );
+    RETURN true;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_applications_partitions(months_ahead integer)
+RETURNS integer AS $$
+DECLARE
+    current_month date := date_trunc('month', now())::date;
+    month_start date;
+    last_month date := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+    created integer := 0;
+BEGIN
+    -- start from the oldest row waiting in the default partition, if any
+    SELECT least(current_month, date_trunc('month', min(applied_at))::date)
+      INTO month_start
+      FROM applications_default;
+    month_start := coalesce(month_start, current_month);
+
+    WHILE month_start <= last_month LOOP
+        IF create_applications_partition(month_start) THEN
+            created := created + 1;
+        END IF;
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.rename_table('applications', 'applications_legacy')
+    op.execute('ALTER TABLE applications_legacy RENAME CONSTRAINT applications_pkey TO applications_legacy_pkey')
+
+    op.create_table('applications',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('job_title', sa.String(length=255), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='application_status', create_type=False), server_default='APPLIED', nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id']),
+        sa.PrimaryKeyConstraint('id', 'applied_at'),
+        postgresql_partition_by='RANGE (applied_at)',
+    )
+    op.create_index('ix_applications_candidate_id', 'applications', ['candidate_id'], unique=False)
+    op.execute('CREATE TABLE applications_default PARTITION OF applications DEFAULT')
+
+    op.execute(CREATE_PARTITION_FUNCTION)
+    op.execute(ENSURE_PARTITIONS_FUNCTION)
+
+    # copy existing rows into the default partition, then split them out
+    # into monthly partitions
+    op.execute("""
+        INSERT INTO applications (id, candidate_id, job_title, status, applied_at, version)
+        SELECT id, candidate_id, job_title, status, coalesce(applied_at, now()), version
+        FROM applications_legacy
+    """)
+    op.execute(f'SELECT ensure_applications_partitions({MONTHS_AHEAD})')
+    op.drop_table('applications_legacy')
+
+    op.create_table('applications_archive',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('job_title', sa.String(length=255), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='application_status', create_type=False), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_applications_archive_candidate_id'), 'applications_archive', ['candidate_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('applications_unpartitioned',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('job_title', sa.String(length=255), nullable=False),
+        sa.Column('status', postgresql.ENUM(name='application_status', create_type=False), server_default='APPLIED', nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id']),
+        sa.PrimaryKeyConstraint('id', name='applications_unpartitioned_pkey')
+    )
+    op.execute("""
+        INSERT INTO applications_unpartitioned (id, candidate_id, job_title, status, applied_at, version)
+        SELECT id, candidate_id, job_title, status, applied_at, version FROM applications
+        UNION ALL
+        SELECT id, candidate_id, job_title, status, applied_at, version FROM applications_archive
+    """)
+    op.drop_index(op.f('ix_applications_archive_candidate_id'), table_name='applications_archive')
+    op.drop_table('applications_archive')
+    op.execute('DROP FUNCTION ensure_applications_partitions(integer)')
+    op.execute('DROP FUNCTION create_applications_partition(date)')
+    # dropping the partitioned parent drops all of its partitions
+    op.drop_table('applications')
+    op.rename_table('applications_unpartitioned', 'applications')
+    op.execute('ALTER TABLE applications RENAME CONSTRAINT applications_unpartitioned_pkey TO applications_pkey')
@@ -0,0 +1,47 @@
+"""record application creation in the status history
+
+Revision ID: e4a7c2b9d613
+Revises: 3e8b6d2a1f47
+Create Date: 2026-10-19 16:05:12.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2b9d613'
+down_revision: Union[str, Sequence[str], None] = '3e8b6d2a1f47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a creation row for every existing application, at applied_at so it
+    # sorts before the application's status changes
+    op.execute("""
+        INSERT INTO application_status_history (application_id, job_title, from_status, to_status, applied_at, changed_at)
+        SELECT id, job_title, NULL, 'APPLIED', applied_at, applied_at FROM applications
+        UNION ALL
+        SELECT id, job_title, NULL, 'APPLIED', applied_at, applied_at FROM applications_archive
+    """)
+    # rows before the watermark are never refreshed: count APPLIED from
+    # them directly, replacing what returns to APPLIED had counted
+    op.execute("""
+        INSERT INTO application_stage_rollups AS r (job_title, stage, entered)
+        SELECT h.job_title, 'APPLIED', count(DISTINCT h.application_id)
+        FROM application_status_history h
+        JOIN rollup_watermarks w ON w.name = 'application_stages'
+        WHERE h.to_status = 'APPLIED' AND h.changed_at < w.processed_until
+        GROUP BY h.job_title
+        ON CONFLICT (job_title, stage) DO UPDATE SET entered = EXCLUDED.entered
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # the funnel counted APPLIED from the application tables before
+    op.execute("DELETE FROM application_status_history WHERE from_status IS NULL")
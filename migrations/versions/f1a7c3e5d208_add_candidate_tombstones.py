@@ -0,0 +1,34 @@
+"""add candidate tombstones
+
+Revision ID: f1a7c3e5d208
+Revises: d4f8b2c6a915
+Create Date: 2026-10-19 19:34:18.026583
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a7c3e5d208'
+down_revision: Union[str, Sequence[str], None] = 'd4f8b2c6a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('candidate_tombstones',
+        sa.Column('candidate_id', sa.UUID(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False),
+        sa.PrimaryKeyConstraint('candidate_id')
+    )
+    op.create_index(op.f('ix_candidate_tombstones_deleted_at'), 'candidate_tombstones', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_candidate_tombstones_deleted_at'), table_name='candidate_tombstones')
+    op.drop_table('candidate_tombstones')
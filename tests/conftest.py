@@ -0,0 +1,21 @@
+# tests/conftest.py
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true", default=False,
+        help="also run the timing benchmarks (marked 'benchmark')",
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock timing, only run with --benchmark")
+
+# Timings flake on shared or slow machines, so they are opt-in
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="timing benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
@@ -0,0 +1,175 @@
+# tests/test_analytics.py
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.dialects import postgresql
+
+from main import app
+from app.core import analytics
+from app.core.security import get_current_user
+from app.models.application import ApplicationStatus
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+def test_status_change_and_history_are_one_statement():
+    sql = compile_sql(analytics.status_update_statement(check_version=True))
+    assert sql.startswith("WITH previous AS")
+    assert "FOR UPDATE" in sql
+    assert "UPDATE applications SET status=" in sql
+    assert "applications.version = " in sql
+    assert "INSERT INTO application_status_history" in sql
+    assert "IS DISTINCT FROM" in sql
+    assert "applications.version = " not in compile_sql(analytics.status_update_statement(check_version=False))
+
+def test_forgetting_applications_subtracts_what_the_rollups_counted():
+    sql = compile_sql(analytics.FORGET_STAGE_HISTORY)
+    assert sql.lstrip().startswith("WITH forgotten AS (\n    DELETE FROM application_history_tombstones")
+    assert "DELETE FROM application_status_history h\n    USING forgotten f" in sql
+    # the same window functions as the refresh, over the deleted rows only
+    assert "FROM removed h" in sql
+    # only what refreshes before the watermark counted
+    assert sql.count("changed_at < $1") == 2
+    assert "entered = r.entered - t.entered" in sql
+
+@pytest.mark.asyncio
+async def test_deleted_applications_are_only_tombstoned():
+    executed = []
+
+    class FakeSession:
+        async def execute(self, stmt, params=None):
+            executed.append((compile_sql(stmt), params))
+
+    await analytics.forget_applications(FakeSession(), ["aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"])
+    # no locks on rows other transactions write: the refresh does the rest
+    [(sql, params)] = executed
+    assert sql.lstrip().startswith("INSERT INTO application_history_tombstones")
+    assert "FOR UPDATE" not in sql and "rollup" not in sql
+    assert [str(i) for i in params["application_ids"]] == ["aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"]
+
+@pytest.mark.asyncio
+async def test_refresh_forgets_tombstoned_history_before_folding_in_new_rows():
+    executed = []
+
+    class Result:
+        def first(self):
+            return SimpleNamespace(processed_until=datetime(2026, 10, 1), until=datetime(2026, 10, 2))
+
+    class FakeSession:
+        async def execute(self, stmt, params=None):
+            executed.append(stmt)
+            return Result()
+
+    assert await analytics.refresh_stage_rollups(FakeSession())
+    assert executed[1:] == [
+        analytics.FORGET_STAGE_HISTORY, analytics.REFRESH_STAGE_ROLLUPS, executed[3],
+    ]
+    assert "UPDATE rollup_watermarks" in str(executed[3])
+
+def test_funnel_uses_window_functions_over_stage_order():
+    sql = compile_sql(analytics.funnel_statement("Engineer"))
+    assert "lag(stages.entered) OVER (PARTITION BY stages.job_title ORDER BY CASE" in sql
+    assert "first_value(stages.entered) OVER" in sql
+    # every stage, APPLIED included, comes from the rollups
+    assert "application_stage_rollups.job_title = " in sql
+    assert "FROM applications" not in sql and "count(" not in sql
+
+@pytest.mark.asyncio
+async def test_created_applications_enter_applied_in_the_history():
+    executed = []
+
+    class FakeSession:
+        async def execute(self, stmt, params=None):
+            executed.append((str(stmt), params))
+
+    applications = [
+        {"id": "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa", "job_title": "Engineer", "status": "APPLIED", "applied_at": None},
+        {"id": "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb", "job_title": "Designer", "status": ApplicationStatus.HIRED,
+         "applied_at": None},
+    ]
+    await analytics.record_created(FakeSession(), applications)
+    assert all(sql.startswith("INSERT INTO application_status_history") for sql, _ in executed)
+    assert [[(r["from_status"], r["to_status"]) for r in params] for _, params in executed] == [
+        [(None, ApplicationStatus.APPLIED), (None, ApplicationStatus.APPLIED)],
+        # created at a later stage: moves on to it right after
+        [(ApplicationStatus.APPLIED, ApplicationStatus.HIRED)],
+    ]
+
+@pytest.mark.asyncio
+async def test_analytics_endpoints_only_read_the_rollups(client: AsyncClient, monkeypatch):
+    calls = []
+
+    async def fake_refresh(session, lag=None):
+        calls.append("refresh")
+
+    async def fake_funnel(session, job_title=None):
+        calls.append(("funnel", job_title))
+        return [{"job_title": "Engineer", "stage": "APPLIED", "entered": 10,
+                 "conversion_from_previous": None, "conversion_from_applied": 1.0}]
+
+    async def fake_time_in_stage(session, job_title=None):
+        calls.append(("time_in_stage", job_title))
+        return []
+
+    monkeypatch.setattr(analytics, "refresh_stage_rollups", fake_refresh)
+    monkeypatch.setattr(analytics, "funnel", fake_funnel)
+    monkeypatch.setattr(analytics, "time_in_stage", fake_time_in_stage)
+
+    r = await client.get("/applications/analytics/funnel", params={"job_title": "Engineer"})
+    assert r.status_code == 200, r.text
+    assert r.json()[0]["entered"] == 10
+    r = await client.get("/applications/analytics/time-in-stage")
+    assert r.status_code == 200, r.text
+    # the background task refreshes them
+    assert calls == [("funnel", "Engineer"), ("time_in_stage", None)]
+
+@pytest.mark.asyncio
+async def test_rollups_are_refreshed_in_the_background(monkeypatch):
+    calls = []
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def commit(self):
+            calls.append("commit")
+
+    async def fake_refresh(session, lag=None):
+        calls.append("refresh")
+        return True
+
+    monkeypatch.setattr(analytics, "refresh_stage_rollups", fake_refresh)
+    rollups = analytics.RollupRefresh(interval=0.01, session_factory=FakeSession)
+    await rollups.start()
+    try:
+        for _ in range(100):
+            if len(calls) >= 4:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await rollups.stop()
+    # each refresh commits, so the watermark lock is held only for the refresh
+    assert calls[:4] == ["refresh", "commit", "refresh", "commit"]
@@ -0,0 +1,201 @@
+# tests/test_application_listing.py
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from main import app
+from app.core import deadlines
+from app.core.database import get_session
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+from app.models.application import Application, ApplicationStatus
+from app.models.candidate import Candidate  # noqa: F401 (resolves Application.candidate)
+from app.routes.application import KEYSET_FILTER, LIST_APPLICATIONS_ORDER
+
+OTHER_JOB_TITLES = [f"Job {i}" for i in range(20)]
+NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class SyncSessionAdapter:
+    """
+    Runs DBClient's awaits on a synchronous SQLite session.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, stmt, params=None):
+        return self.session.execute(stmt, params)
+
+
+def add_applications(engine, count, seed):
+    rng = random.Random(seed)
+    statuses = list(ApplicationStatus)
+    with engine.begin() as conn:
+        conn.execute(insert(Application.__table__), [
+            {
+                "id": uuid.uuid4(),
+                "candidate_id": uuid.uuid4(),
+                "job_title": "Backend Engineer" if rng.random() < 1 / 3 else rng.choice(OTHER_JOB_TITLES),
+                "status": rng.choice(statuses),
+                # whole seconds, so that rows share an applied_at and the id breaks ties
+                "applied_at": NOW - timedelta(seconds=rng.randrange(365 * 86400) // 600 * 600),
+                "version": 1,
+            }
+            for _ in range(count)
+        ])
+
+
+@pytest.fixture
+def engine():
+    # the model's indexes, including the (..., applied_at, id) ones
+    engine = create_engine("sqlite://")
+    Application.__table__.create(engine)
+    add_applications(engine, 5000, seed=1)
+    return engine
+
+# Bypass the real JWT auth and serve requests from the SQLite table
+@pytest.fixture(autouse=True)
+def override_dependencies(engine, monkeypatch):
+    # no statement_timeout on SQLite
+    monkeypatch.setattr(deadlines, "policy", deadlines.DeadlinePolicy(default=0))
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+    async def sqlite_session():
+        with Session(engine) as session:
+            yield SyncSessionAdapter(session)
+
+    app.dependency_overrides[get_session] = sqlite_session
+    yield
+    app.dependency_overrides.pop(get_session, None)
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+def query_cost(engine, filters, limit=50):
+    """
+    Run one listing page and return (SQLite VM steps, query plan).
+
+    VM steps grow with the index entries and rows visited, so they show
+    whether a page costs the same on a larger table.
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    stmt, params = DBClient(None).prepare_select(
+        Application, filters=filters, limit=limit, order_by=LIST_APPLICATIONS_ORDER
+    )
+    with engine.connect() as conn:
+        event.listen(conn, "before_cursor_execute", capture)
+        raw = conn.connection.driver_connection
+        steps = [0]
+
+        def count():
+            steps[0] += 1
+
+        raw.set_progress_handler(count, 1)
+        try:
+            conn.execute(stmt, params).all()
+        finally:
+            raw.set_progress_handler(None, 1)
+            event.remove(conn, "before_cursor_execute", capture)
+        statement, parameters = statements[-1]
+        plan = [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+    return steps[0], plan
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_cursor_pages_through_every_matching_application_once(client: AsyncClient, engine):
+    params = {"status": "INTERVIEWING", "applied_at__gte": (NOW - timedelta(days=120)).isoformat(), "limit": 25}
+    seen, pages = [], 0
+    while True:
+        r = await client.get("/applications/", params=params)
+        assert r.status_code == 200, r.text
+        seen += r.json()
+        pages += 1
+        cursor = r.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    with Session(engine) as session:
+        expected = await DBClient(SyncSessionAdapter(session)).query_table_data(
+            "applications",
+            filters={"status": "INTERVIEWING", "applied_at__gte": NOW - timedelta(days=120)},
+            order_by=LIST_APPLICATIONS_ORDER,
+        )
+    assert [row["id"] for row in seen] == [str(row["id"]) for row in expected]
+    assert pages == len(expected) // 25 + 1
+    assert all(row["status"] == "INTERVIEWING" for row in seen)
+
+    r = await client.get("/applications/", params={"job_title": "Backend Engineer", "fields": "id,job_title", "limit": 5})
+    assert r.status_code == 200
+    assert all(set(row) == {"id", "job_title"} for row in r.json())
+    assert r.headers["x-next-cursor"]
+
+@pytest.mark.asyncio
+async def test_listing_refuses_unindexed_filters_and_bad_cursors(client: AsyncClient):
+    r = await client.get("/applications/", params={"candidate_id": str(uuid.uuid4())})
+    assert r.status_code == 400
+    r = await client.get("/applications/", params={"job_title__prefix": "Back"})
+    assert r.status_code == 400
+    r = await client.get("/applications/", params={KEYSET_FILTER: "x,y"})
+    assert r.status_code == 400
+    r = await client.get("/applications/", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400
+    r = await client.get("/applications/", params={"limit": 100000})
+    assert r.status_code == 422
+
+def test_benchmark_page_cost_stays_flat_as_the_table_grows(engine):
+    # every filter matches more than a page of rows on the small table too
+    since = NOW - timedelta(days=90)
+    queries = {
+        "ix_applications_applied_at_id": {},
+        "ix_applications_status_applied_at_id": {"status": "HIRED"},
+        "ix_applications_job_title_applied_at_id": {"job_title": "Backend Engineer", "applied_at__gte": since},
+        "ix_applications_status_job_title_applied_at_id": {
+            "status": "INTERVIEWING", "job_title": "Backend Engineer", "applied_at__gte": since,
+        },
+    }
+    # a page further down, continuing from a cursor position
+    deep = {KEYSET_FILTER: [(NOW - timedelta(days=45)).isoformat(), str(uuid.UUID(int=0))]}
+
+    def costs():
+        result = {}
+        for index, filters in queries.items():
+            for name, page in (("first", {}), ("deep", deep)):
+                steps, plan = query_cost(engine, {**filters, **page})
+                # read in index order and stopped at the limit: no table scan, no sort
+                assert any(f"INDEX {index}" in detail for detail in plan), plan
+                assert not any("TEMP B-TREE" in detail or detail == "SCAN applications" for detail in plan), plan
+                result[index, name] = steps
+        return result
+
+    small = costs()
+    add_applications(engine, 95000, seed=2)
+    large = costs()
+
+    for key in small:
+        # 20x the rows, about the same work per page
+        assert large[key] < small[key] * 2, (key, small[key], large[key])
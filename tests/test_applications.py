@@ -5,7 +5,8 @@ from httpx import AsyncClient, ASGITransport
 from uuid import UUID
 
 from main import app
-from app.core.db_client import DBClient
+from app.core import analytics
+from app.core.db_client import DBClient, StaleVersionError
 from app.core.security import get_current_user
 from app.models.application import ApplicationStatus
 
@@ -24,6 +25,7 @@ def stub_db(monkeypatch):
         "job_title": "Engineer",
         "status": ApplicationStatus.APPLIED.value,
         "applied_at": None,
+        "version": 1,
     }
     app2 = {
         "id": "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb",
@@ -32,32 +34,52 @@ def stub_db(monkeypatch):
         "status": ApplicationStatus.INTERVIEWING.value,
         "applied_at": None,
     }
+    # closed application already moved to the archive
+    archived1 = {
+        "id": "cccccccc-cccc-cccc-cccc-cccccccccccc",
+        "candidate_id": "11111111-1111-1111-1111-111111111111",
+        "job_title": "Intern",
+        "status": ApplicationStatus.REJECTED.value,
+        "applied_at": "2020-01-01T00:00:00",
+        "version": 2,
+    }
 
     # create: echo back with a new id, unless job_title is "Bad" (simulate failure)
     async def fake_create(self, table_name: str, data: dict):
         assert table_name == "applications"
+        # ids are always generated
+        assert "id" not in data
         if data.get("job_title") == "Bad":
             return None
         return {**data, "id": app1["id"], "status": app1["status"]}
 
     # query list: return only those for matching candidate_id
     async def fake_query(self, table_name: str, filters=None, single_row=False, **kwargs):
-        assert table_name == "applications"
-        all_apps = [app1, app2]
+        assert table_name in ("applications", "applications_archive")
+        all_apps = [app1, app2] if table_name == "applications" else [archived1]
         if filters and "candidate_id" in filters:
             return [a for a in all_apps if a["candidate_id"] == filters["candidate_id"]]
         return all_apps
 
-    # update: only app1 exists; merging update_data into it
-    async def fake_update(self, table_name: str, identifier: dict, update_data: dict):
-        assert table_name == "applications"
-        if identifier.get("id") == app1["id"]:
-            return {**app1, **update_data}
+    # status update: only app1 exists
+    async def fake_update_status(db, application_id, new_status, expected_version=None):
+        if application_id == app1["id"]:
+            if expected_version is not None and expected_version != app1["version"]:
+                raise StaleVersionError(app1["version"])
+            return {**app1, "status": new_status, "version": app1["version"] + 1}
         return None
 
+    # creation history rows
+    recorded = []
+
+    async def fake_record_created(session, applications):
+        recorded.extend(applications)
+
     monkeypatch.setattr(DBClient, "create_table_entry", fake_create)
     monkeypatch.setattr(DBClient, "query_table_data", fake_query)
-    monkeypatch.setattr(DBClient, "update_table_entry", fake_update)
+    monkeypatch.setattr(analytics, "update_application_status", fake_update_status)
+    monkeypatch.setattr(analytics, "record_created", fake_record_created)
+    return recorded
 
 @pytest_asyncio.fixture
 async def client():
@@ -69,7 +91,7 @@ async def client():
 # ----- Tests -----
 
 @pytest.mark.asyncio
-async def test_create_application_success(client: AsyncClient):
+async def test_create_application_success(client: AsyncClient, stub_db):
     cid = "11111111-1111-1111-1111-111111111111"
     payload = {"job_title": "Engineer"}
     r = await client.post(f"/candidates/{cid}/applications", json=payload)
@@ -79,14 +101,25 @@ async def test_create_application_success(client: AsyncClient):
     assert body["candidate_id"] == cid
     assert body["job_title"] == "Engineer"
     assert body["status"] == ApplicationStatus.APPLIED.value
+    # entering APPLIED is recorded with the insert
+    assert [a["id"] for a in stub_db] == [body["id"]]
 
 @pytest.mark.asyncio
-async def test_create_application_failure(client: AsyncClient):
+async def test_create_application_ignores_a_client_id(client: AsyncClient, stub_db):
+    cid = "11111111-1111-1111-1111-111111111111"
+    payload = {"job_title": "Engineer", "id": "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb"}
+    r = await client.post(f"/candidates/{cid}/applications", json=payload)
+    assert r.status_code == 201, r.text
+    assert r.json()["id"] == "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+
+@pytest.mark.asyncio
+async def test_create_application_failure(client: AsyncClient, stub_db):
     cid = "11111111-1111-1111-1111-111111111111"
     payload = {"job_title": "Bad"}
     r = await client.post(f"/candidates/{cid}/applications", json=payload)
     assert r.status_code == 400
     assert r.json()["detail"] == "Failed to create application"
+    assert stub_db == []
 
 @pytest.mark.asyncio
 async def test_list_applications_for_candidate(client: AsyncClient):
@@ -105,6 +138,43 @@ async def test_list_applications_empty(client: AsyncClient):
     assert r.status_code == 200
     assert r.json() == []
 
+@pytest.mark.asyncio
+async def test_list_applications_include_archived(client: AsyncClient):
+    cid = "11111111-1111-1111-1111-111111111111"
+    r = await client.get(f"/candidates/{cid}/applications", params={"include_archived": "true"})
+    assert r.status_code == 200, r.text
+    apps = r.json()
+    assert [(a["id"][0], a["archived"]) for a in apps] == [("a", False), ("c", True)]
+
+    r = await client.get(
+        f"/candidates/{cid}/applications",
+        params={"include_archived": "true", "order_by": "applied_at", "limit": 1},
+    )
+    assert [a["id"][0] for a in r.json()] == ["c"]
+
+@pytest.mark.asyncio
+async def test_list_applications_include_archived_ordered_by_status(client: AsyncClient, monkeypatch):
+    cid = "11111111-1111-1111-1111-111111111111"
+
+    # rows as read from Postgres, with enum statuses
+    async def fake_query(self, table_name: str, filters=None, single_row=False, **kwargs):
+        if table_name == "applications":
+            return [{"id": "a", "status": ApplicationStatus.INTERVIEWING}, {"id": "b", "status": ApplicationStatus.APPLIED}]
+        return [{"id": "c", "status": ApplicationStatus.HIRED}, {"id": "d", "status": ApplicationStatus.REJECTED}]
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    r = await client.get(
+        f"/candidates/{cid}/applications", params={"include_archived": "true", "order_by": "status"}
+    )
+    assert r.status_code == 200, r.text
+    # declaration order of the enum, as Postgres sorts it
+    assert [a["id"] for a in r.json()] == ["b", "a", "d", "c"]
+
+    r = await client.get(
+        f"/candidates/{cid}/applications", params={"include_archived": "true", "order_by": "-status", "limit": 2}
+    )
+    assert [a["id"] for a in r.json()] == ["c", "d"]
+
 @pytest.mark.asyncio
 async def test_update_application_success(client: AsyncClient):
     aid = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
@@ -120,3 +190,22 @@ async def test_update_application_invalid_status(client: AsyncClient):
     aid = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
     r = await client.patch(f"/applications/{aid}?application_status=NOT_A_STATUS")
     assert r.status_code == 400
+
+@pytest.mark.asyncio
+async def test_update_application_stale_version(client: AsyncClient):
+    aid = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+    r = await client.patch(
+        f"/applications/{aid}?application_status=HIRED",
+        headers={"If-Match": '"7"'},
+    )
+    assert r.status_code == 412
+    assert r.headers["etag"] == '"1"'
+
+@pytest.mark.asyncio
+async def test_update_application_malformed_if_match(client: AsyncClient):
+    aid = "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+    r = await client.patch(
+        f"/applications/{aid}?application_status=HIRED",
+        headers={"If-Match": "not-a-version"},
+    )
+    assert r.status_code == 400
@@ -0,0 +1,161 @@
+# tests/test_batch.py
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import analytics, rate_limit, security
+from app.core.config import settings
+from app.core.database import get_session
+from app.core.db_client import DBClient
+from app.core.rate_limit import RateLimiter
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+CANDIDATE = {"id": "11111111-1111-1111-1111-111111111111", "full_name": "Alice", "version": 3}
+APPLICATION = {"id": "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa", "status": "INTERVIEWING", "version": 2}
+
+
+class FakeSavepoint:
+    def __init__(self, session):
+        self.session = session
+
+    async def commit(self):
+        self.session.events.append("release")
+
+    async def rollback(self):
+        self.session.events.append("rollback to savepoint")
+
+
+class FakeSession:
+    def __init__(self):
+        self.events = []
+        self.info = {}
+
+    async def begin_nested(self):
+        self.events.append("savepoint")
+        return FakeSavepoint(self)
+
+    async def commit(self):
+        self.events.append("commit")
+
+    async def rollback(self):
+        self.events.append("rollback")
+
+
+@pytest.fixture
+def session():
+    session = FakeSession()
+    app.dependency_overrides[get_session] = lambda: session
+    yield session
+    app.dependency_overrides.pop(get_session, None)
+
+# Use the real get_current_user with a signed token and count user lookups
+@pytest.fixture(autouse=True)
+def calls(monkeypatch):
+    app.dependency_overrides.pop(security.get_current_user, None)
+    calls = []
+
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        calls.append((table_name, self.session))
+        if table_name == "users":
+            return {"id": USER_ID}
+        if filters and filters.get("id") == CANDIDATE["id"]:
+            return CANDIDATE
+        return None if single_row else []
+
+    async def fake_status(db, application_id, new_status, expected_version=None):
+        calls.append(("applications", db.session))
+        return {**APPLICATION, "status": new_status, "version": APPLICATION["version"] + 1}
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(analytics, "update_application_status", fake_status)
+    return calls
+
+@pytest_asyncio.fixture
+async def client():
+    token = security.create_access_token({"sub": USER_ID})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url="http://testserver", headers={"Authorization": f"Bearer {token}"}
+    ) as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_operations_share_auth_and_session(client: AsyncClient, session, calls):
+    r = await client.post("/batch", json={"operations": [
+        {"method": "GET", "path": f"/candidates/{CANDIDATE['id']}"},
+        {"method": "GET", "path": f"/candidates/{CANDIDATE['id']}/applications?status=APPLIED"},
+        {"method": "PATCH", "path": f"/applications/{APPLICATION['id']}?application_status=HIRED"},
+    ]})
+    assert r.status_code == 200
+    data = r.json()
+    assert data["committed"] is True
+    assert [result["status"] for result in data["results"]] == [200, 200, 200]
+    assert data["results"][0]["body"] == CANDIDATE
+    assert data["results"][0]["headers"]["etag"] == '"3"'
+    assert data["results"][2]["body"]["status"] == "HIRED"
+
+    # one user lookup for the whole batch, and every query on the batch's session
+    assert [table for table, _ in calls].count("users") == 1
+    assert all(s is session for _, s in calls)
+    assert session.events == ["savepoint", "release"] * 3 + ["commit"]
+
+@pytest.mark.asyncio
+async def test_failed_operation_is_rolled_back_and_rest_continue(client: AsyncClient, session):
+    r = await client.post("/batch", json={"operations": [
+        {"method": "GET", "path": "/candidates/99999999-9999-9999-9999-999999999999"},
+        {"method": "PATCH", "path": f"/applications/{APPLICATION['id']}?application_status=NOPE"},
+        {"method": "GET", "path": f"/candidates/{CANDIDATE['id']}"},
+    ]})
+    data = r.json()
+    assert data["committed"] is True
+    assert [result["status"] for result in data["results"]] == [404, 400, 200]
+    assert data["results"][0]["body"] == {"detail": "Candidate not found"}
+    assert session.events.count("rollback to savepoint") == 2
+    assert session.events[-1] == "commit"
+
+@pytest.mark.asyncio
+async def test_atomic_batch_stops_at_first_failure(client: AsyncClient, session):
+    r = await client.post("/batch", json={"atomic": True, "operations": [
+        {"method": "PATCH", "path": f"/applications/{APPLICATION['id']}?application_status=HIRED"},
+        {"method": "PUT", "path": f"/candidates/{CANDIDATE['id']}", "headers": {"If-Match": "not-a-version"}, "body": {}},
+        {"method": "GET", "path": f"/candidates/{CANDIDATE['id']}"},
+    ]})
+    data = r.json()
+    assert data["committed"] is False
+    assert [result["status"] for result in data["results"]] == [200, 400, 424]
+    assert session.events == ["rollback"]
+
+@pytest.mark.asyncio
+async def test_operations_are_charged_their_route_weights(client: AsyncClient, session, monkeypatch):
+    limiter = RateLimiter(rate=0, burst=5, route_weights={"PATCH /applications": 3})
+    monkeypatch.setattr(rate_limit, "limiter", limiter)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    patch = {"method": "PATCH", "path": f"/applications/{APPLICATION['id']}?application_status=HIRED"}
+
+    # the batch request itself takes 1 token, its operations would need 6 more
+    r = await client.post("/batch", json={"operations": [patch, patch]})
+    assert r.status_code == 429
+    assert r.headers["retry-after"]
+    assert session.events == []
+    assert limiter.stats()["rejected_by_route"] == {"POST /batch operations": 1}
+
+    r = await client.post("/batch", json={"operations": [patch]})
+    assert r.status_code == 200
+    assert r.json()["results"][0]["status"] == 200
+
+@pytest.mark.asyncio
+async def test_operations_outside_candidate_and_application_routes_are_rejected(client: AsyncClient, session):
+    r = await client.post("/batch", json={"operations": [{"method": "GET", "path": "/monitoring/limits"}]})
+    assert r.status_code == 422
+    assert session.events == []
+
+@pytest.mark.asyncio
+async def test_batch_requires_authentication(session):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        r = await ac.post("/batch", json={"operations": [{"method": "GET", "path": "/candidates/"}]})
+    assert r.status_code == 401
@@ -0,0 +1,93 @@
+# tests/test_batching.py
+import asyncio
+import uuid
+
+import pytest
+
+from app.core.batching import InsertBatcher
+from app.core.query import InvalidQueryError
+from app.models.application import Application
+
+CANDIDATE_ID = "11111111-1111-1111-1111-111111111111"
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    def begin_nested(self):
+        return self
+
+
+def make_batcher(monkeypatch, **kwargs):
+    writes = []
+
+    async def fake_write(self, session, rows):
+        writes.append(len(rows))
+        if any(row["job_title"] == "Bad" for row in rows):
+            raise RuntimeError("insert failed")
+        return [{**row, "status": "APPLIED"} for row in rows]
+
+    monkeypatch.setattr(InsertBatcher, "write", fake_write)
+    return InsertBatcher(Application, session_factory=FakeSession, **kwargs), writes
+
+
+# ----- Tests -----
+
+def test_prepare_coerces_values_and_fills_python_defaults():
+    row = InsertBatcher(Application).prepare({"candidate_id": CANDIDATE_ID, "job_title": "Engineer"})
+    assert row["candidate_id"] == uuid.UUID(CANDIDATE_ID)
+    assert isinstance(row["id"], uuid.UUID)
+    assert row["version"] == 1
+    # server-side default only, left to Postgres
+    assert "status" not in row
+
+    with pytest.raises(InvalidQueryError):
+        InsertBatcher(Application).prepare({"candidate_id": CANDIDATE_ID, "salary": 1})
+
+@pytest.mark.asyncio
+async def test_concurrent_inserts_share_one_statement(monkeypatch):
+    batcher, writes = make_batcher(monkeypatch, max_batch_size=50, max_delay=0.01)
+    titles = [f"Engineer {i}" for i in range(10)]
+    created = await asyncio.gather(*[
+        batcher.submit({"candidate_id": CANDIDATE_ID, "job_title": t}) for t in titles
+    ])
+    assert writes == [10]
+    assert [row["job_title"] for row in created] == titles
+    assert len({row["id"] for row in created}) == 10
+    assert batcher.stats()["average_batch_size"] == 10
+
+@pytest.mark.asyncio
+async def test_full_batch_is_written_without_waiting(monkeypatch):
+    batcher, writes = make_batcher(monkeypatch, max_batch_size=2, max_delay=60)
+    await asyncio.wait_for(asyncio.gather(*[
+        batcher.submit({"candidate_id": CANDIDATE_ID, "job_title": "Engineer"}) for _ in range(4)
+    ]), timeout=1)
+    assert writes == [2, 2]
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_fails_offending_caller(monkeypatch):
+    batcher, writes = make_batcher(monkeypatch, max_delay=0.01)
+    results = await asyncio.gather(
+        batcher.submit({"candidate_id": CANDIDATE_ID, "job_title": "Engineer"}),
+        batcher.submit({"candidate_id": CANDIDATE_ID, "job_title": "Bad"}),
+        batcher.submit({"candidate_id": CANDIDATE_ID, "job_title": "Designer"}),
+        return_exceptions=True,
+    )
+    assert writes == [3, 1, 1, 1]
+    assert results[0]["job_title"] == "Engineer"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2]["job_title"] == "Designer"
+    assert batcher.stats()["fallbacks"] == 1
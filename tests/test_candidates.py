@@ -4,7 +4,7 @@ import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
 
 from main import app
-from app.core.db_client import DBClient
+from app.core.db_client import DBClient, StaleVersionError
 from app.core.security import get_current_user
 
 # Bypass the real JWT auth
@@ -24,6 +24,7 @@ def stub_db(monkeypatch):
         "skills": ["python"],
         "created_at": None,
         "updated_at": None,
+        "version": 3,
     }
     record2 = {
         "id": "22222222-2222-2222-2222-222222222222",
@@ -45,13 +46,21 @@ def stub_db(monkeypatch):
                          filters=None,
                          single_row=False,
                          limit=None,
-                         offset=None):
+                         offset=None,
+                         order_by=None,
+                         fields=None):
         assert table_name == "candidates"
         # list endpoints
         if not single_row:
             results = [record1, record2]
-            if filters and filters.get("skills"):
-                return [r for r in results if filters["skills"] in r["skills"]]
+            if filters and filters.get("skills__contains"):
+                results = [r for r in results if set(filters["skills__contains"]) <= set(r["skills"])]
+            if filters and filters.get("full_name__prefix"):
+                results = [r for r in results if r["full_name"].startswith(filters["full_name__prefix"])]
+            if order_by == ["-full_name"]:
+                results = sorted(results, key=lambda r: r["full_name"], reverse=True)
+            if fields:
+                results = [{f: r[f] for f in fields} for r in results]
             return results
 
         # single_row endpoints
@@ -59,13 +68,20 @@ def stub_db(monkeypatch):
             return record1
         return None
 
-    async def fake_update(self, table_name: str, identifier: dict, update_data: dict):
+    async def fake_update(self, table_name: str, identifier: dict, update_data: dict, expected_version=None):
         assert table_name == "candidates"
         if identifier.get("id") == record1["id"]:
-            updated = {**record1, **update_data}
+            if expected_version is not None and expected_version != record1["version"]:
+                raise StaleVersionError(record1["version"])
+            updated = {**record1, **update_data, "version": record1["version"] + 1}
             return updated
         return None
 
+    async def fake_count(self, table_name: str, filters=None):
+        assert table_name == "candidates"
+        return 2, False
+
+    monkeypatch.setattr(DBClient, "count_table_data", fake_count)
     monkeypatch.setattr(DBClient, "create_table_entry", fake_create)
     monkeypatch.setattr(DBClient, "query_table_data", fake_query)
     monkeypatch.setattr(DBClient, "update_table_entry", fake_update)
@@ -127,3 +143,41 @@ async def test_update_candidate_success(client: AsyncClient):
 async def test_update_candidate_not_found(client: AsyncClient):
     r = await client.put("/candidates/99999999-9999-9999-9999-999999999999", json={"full_name": "No One"})
     assert r.status_code == 404
+
+@pytest.mark.asyncio
+async def test_get_candidate_returns_etag(client: AsyncClient):
+    r = await client.get("/candidates/11111111-1111-1111-1111-111111111111")
+    assert r.headers["etag"] == '"3"'
+
+@pytest.mark.asyncio
+async def test_update_candidate_with_matching_if_match(client: AsyncClient):
+    r = await client.put(
+        "/candidates/11111111-1111-1111-1111-111111111111",
+        json={"full_name": "Alice Updated"},
+        headers={"If-Match": '"3"'},
+    )
+    assert r.status_code == 200, r.text
+    assert r.headers["etag"] == '"4"'
+
+@pytest.mark.asyncio
+async def test_update_candidate_with_stale_if_match(client: AsyncClient):
+    r = await client.put(
+        "/candidates/11111111-1111-1111-1111-111111111111",
+        json={"full_name": "Alice Updated"},
+        headers={"If-Match": 'W/"2"'},
+    )
+    assert r.status_code == 412
+    assert r.headers["etag"] == '"3"'
+
+@pytest.mark.asyncio
+async def test_list_candidates_with_operator_filter_order_and_fields(client: AsyncClient):
+    r = await client.get("/candidates/?full_name__prefix=B&order_by=-full_name&fields=id,full_name")
+    assert r.status_code == 200, r.text
+    assert r.json() == [{"id": "22222222-2222-2222-2222-222222222222", "full_name": "Bob"}]
+
+@pytest.mark.asyncio
+async def test_list_candidates_with_total_count(client: AsyncClient):
+    r = await client.get("/candidates/?limit=1&include_total=true")
+    assert r.status_code == 200, r.text
+    assert r.headers["x-total-count"] == "2"
+    assert r.headers["x-total-count-estimated"] == "false"
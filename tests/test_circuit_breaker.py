@@ -0,0 +1,127 @@
+# tests/test_circuit_breaker.py
+import asyncio
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import exc
+
+from main import app
+from app.core import circuit_breaker, security
+from app.core.circuit_breaker import CircuitBreaker, StaleCache
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+
+CANDIDATES = [{"id": "11111111-1111-1111-1111-111111111111", "full_name": "Alice"}]
+
+
+def make_breaker(probe=None, **overrides) -> CircuitBreaker:
+    async def healthy():
+        return None
+
+    options = dict(
+        window_size=10, min_calls=4, error_rate=0.5, slow_call_seconds=0.5, slow_call_rate=0.75,
+        probe_interval=0.01, recovery_probes=2, probe=probe or healthy, enabled=True,
+    )
+    options.update(overrides)
+    return CircuitBreaker(**options)
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = make_breaker(probe=asyncio.Event().wait)  # probes hang: stays open
+    monkeypatch.setattr(circuit_breaker, "breaker", breaker)
+    monkeypatch.setattr(circuit_breaker, "stale_cache", StaleCache(max_bytes=10_000, max_age=60))
+    yield breaker
+
+@pytest.fixture(autouse=True)
+def queries(monkeypatch):
+    calls = []
+
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        calls.append(table_name)
+        return CANDIDATES
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    return calls
+
+@pytest_asyncio.fixture
+async def client():
+    token = security.create_access_token({"sub": "00000000-0000-0000-0000-000000000001"})
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url="http://testserver", headers={"Authorization": f"Bearer {token}"}
+    ) as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_trips_on_error_rate_and_recovers_after_probes():
+    breaker = make_breaker()
+    for failed in (False, True, False):
+        breaker.record(failed=failed)
+    assert breaker.state == "closed"  # below min_calls
+    breaker.record(failed=True)
+    assert breaker.is_open
+
+    # statements during the outage (e.g. the probes) don't count
+    breaker.record(failed=True)
+    assert breaker.stats()["window_calls"] == 4
+
+    await asyncio.sleep(0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["window_calls"] == 0
+
+@pytest.mark.asyncio
+async def test_trips_on_slow_statements_and_failed_probes_keep_it_open():
+    async def failing():
+        raise OSError("connection refused")
+
+    breaker = make_breaker(probe=failing)
+    for _ in range(4):
+        breaker.record(duration=0.6)
+    assert breaker.is_open
+    await asyncio.sleep(0.05)
+    assert breaker.is_open
+    await breaker.stop()
+
+@pytest.mark.asyncio
+async def test_open_circuit_serves_stale_gets_and_rejects_the_rest(client: AsyncClient, breaker, queries):
+    fresh = await client.get("/candidates/", params={"limit": 5})
+    assert fresh.status_code == 200
+
+    breaker.trip("test")
+    stale = await client.get("/candidates/", params={"limit": 5})
+    assert stale.status_code == 200
+    assert stale.headers["x-cache"] == "stale"
+    assert "age" in stale.headers
+    assert stale.json() == fresh.json()
+    assert len(queries) == 1
+
+    uncached = await client.get("/candidates/", params={"limit": 6})
+    assert uncached.status_code == 503
+    assert "retry-after" in uncached.headers
+
+    write = await client.post("/candidates/", json={"full_name": "Bob"})
+    assert write.status_code == 503
+
+    # stale data still needs a validly signed token
+    anonymous = await client.get("/candidates/", params={"limit": 5}, headers={"Authorization": ""})
+    assert anonymous.status_code == 503
+    await breaker.stop()
+
+@pytest.mark.asyncio
+async def test_pool_timeout_is_a_failure_and_returns_503(client: AsyncClient, breaker, monkeypatch):
+    async def exhausted(self, *args, **kwargs):
+        raise exc.TimeoutError("QueuePool limit reached")
+
+    monkeypatch.setattr(DBClient, "query_table_data", exhausted)
+    r = await client.get("/candidates/11111111-1111-1111-1111-111111111111")
+    assert r.status_code == 503
+    assert breaker.stats()["window_failures"] == 1
@@ -0,0 +1,49 @@
+# tests/test_counts.py
+import pytest
+
+from app.core import db_client
+from app.core.db_client import DBClient
+
+
+@pytest.fixture(autouse=True)
+def stub_counts(monkeypatch):
+    calls = {"estimate": 0, "exact": 0}
+    estimates = {"candidates": 2_000_000, "applications": 120}
+
+    async def fake_estimate(self, model_class, filters):
+        calls["estimate"] += 1
+        if filters and filters.get("full_name__prefix"):
+            return 40
+        return estimates[model_class.__tablename__]
+
+    async def fake_exact(self, model_class, filters):
+        calls["exact"] += 1
+        return 37
+
+    monkeypatch.setattr(DBClient, "_estimate_rows", fake_estimate)
+    monkeypatch.setattr(DBClient, "_exact_count", fake_exact)
+    db_client._count_cache.clear()
+    return calls
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_large_unfiltered_count_is_estimated(stub_counts):
+    assert await DBClient(None).count_table_data("candidates") == (2_000_000, True)
+    assert stub_counts["exact"] == 0
+
+@pytest.mark.asyncio
+async def test_selective_filter_is_counted_exactly(stub_counts):
+    counted = await DBClient(None).count_table_data("candidates", {"full_name__prefix": "Al"})
+    assert counted == (37, False)
+    assert stub_counts["exact"] == 1
+
+@pytest.mark.asyncio
+async def test_counts_are_cached_per_filter_signature(stub_counts):
+    db = DBClient(None)
+    await db.count_table_data("applications", {"status": "HIRED", "job_title": "Engineer"})
+    await db.count_table_data("applications", {"job_title": "Engineer", "status": "HIRED"})
+    await db.count_table_data("applications", {"status": "REJECTED"})
+    assert stub_counts["estimate"] == 2
+    assert stub_counts["exact"] == 2
@@ -0,0 +1,92 @@
+# tests/test_deadlines.py
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import exc
+
+from main import app
+from app.core import deadlines
+from app.core.db_client import DBClient
+from app.core.deadlines import DeadlinePolicy
+from app.core.security import get_current_user
+
+CANDIDATE_ID = "11111111-1111-1111-1111-111111111111"
+
+
+class QueryCanceled(Exception):
+    sqlstate = "57014"
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest.fixture(autouse=True)
+def policy(monkeypatch):
+    policy = DeadlinePolicy(default=5, route_deadlines={"GET /candidates/": 0.05, "* /applications": 0})
+    monkeypatch.setattr(deadlines, "policy", policy)
+    return policy
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+def test_longest_matching_prefix_wins(policy):
+    assert policy.deadline_for("GET", f"/candidates/{CANDIDATE_ID}") == 0.05
+    assert policy.deadline_for("POST", "/candidates/") == 5
+    assert policy.deadline_for("PATCH", "/applications/x") == 0
+
+@pytest.mark.asyncio
+async def test_slow_request_gets_504_and_is_counted_per_route(client: AsyncClient, policy, monkeypatch):
+    async def slow_query(self, *args, **kwargs):
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(DBClient, "query_table_data", slow_query)
+    start = time.monotonic()
+    r = await client.get(f"/candidates/{CANDIDATE_ID}")
+    assert r.status_code == 504
+    assert time.monotonic() - start < 0.5
+    assert policy.stats()["timeouts_by_route"] == {"GET /candidates/{candidate_id}": 1}
+
+@pytest.mark.asyncio
+async def test_statement_cancelled_by_postgres_maps_to_504(client: AsyncClient, policy, monkeypatch):
+    async def cancelled(self, *args, **kwargs):
+        raise exc.OperationalError("SELECT ...", {}, QueryCanceled("canceling statement due to statement timeout"))
+
+    monkeypatch.setattr(DBClient, "query_table_data", cancelled)
+    r = await client.get(f"/candidates/{CANDIDATE_ID}")
+    assert r.status_code == 504
+    assert policy.timeouts == 1
+
+@pytest.mark.asyncio
+async def test_remaining_time_becomes_statement_timeout():
+    conn = RecordingConnection()
+    deadlines._set_statement_timeout(None, None, conn)
+    assert conn.statements == []  # no deadline outside a request
+
+    token = deadlines._deadline.set(time.monotonic() + 2)
+    try:
+        deadlines._set_statement_timeout(None, None, conn)
+    finally:
+        deadlines._deadline.reset(token)
+    (statement,) = conn.statements
+    milliseconds = int(statement.rsplit(" ", 1)[1])
+    assert statement.startswith("SET LOCAL statement_timeout = ")
+    assert 1900 < milliseconds <= 2000
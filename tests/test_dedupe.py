@@ -0,0 +1,261 @@
+# tests/test_dedupe.py
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import dedupe, skill_index
+from app.core.db_client import DBClient, StaleVersionError
+from app.core.dedupe import DuplicateDetector, normalize_email, normalize_name, normalize_phone
+from app.core.security import get_current_user
+
+CANDIDATES = [
+    {"id": "11111111-1111-1111-1111-111111111111", "full_name": "Alice Smith", "email": "Alice.Smith@gmail.com", "phone": None, "skills": ["python"]},
+    {"id": "22222222-2222-2222-2222-222222222222", "full_name": "alice smith", "email": "alicesmith+jobs@gmail.com", "phone": "+44 7700 900123", "skills": ["sql"]},
+    {"id": "33333333-3333-3333-3333-333333333333", "full_name": "Smith, Alice", "email": "a.smith@work.example", "phone": "07700 900123", "skills": []},
+    {"id": "44444444-4444-4444-4444-444444444444", "full_name": "Bob Jones", "email": "bob@example.com", "phone": "07700 900123", "skills": []},
+    {"id": "55555555-5555-5555-5555-555555555555", "full_name": "Carol White", "email": "carol@example.com", "phone": None, "skills": []},
+]
+
+class FakeSession:
+    """
+    Stands in for AsyncSessionLocal(); counts the sessions opened.
+    """
+    opened = 0
+
+    def __init__(self):
+        FakeSession.opened += 1
+        self.info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def commit(self):
+        pass
+
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+# The scan result stored in candidate_duplicate_pairs, shared by all workers
+@pytest.fixture(autouse=True)
+def stored(monkeypatch):
+    stored = SimpleNamespace(pairs=[], scanned_at=None, saves=0, elected=True)
+
+    async def fake_save(self, session, pairs):
+        stored.pairs = [
+            {"candidate_id": a, "duplicate_id": b, "score": score} for a, b, score in pairs
+        ]
+        stored.scanned_at = datetime(2026, 10, 19, 12, stored.saves)
+        stored.saves += 1
+
+    @asynccontextmanager
+    async def fake_scan_lock(self):
+        yield stored.elected
+
+    async def fake_due(self):
+        return stored.scanned_at is None
+
+    monkeypatch.setattr(dedupe.DuplicateScan, "save", fake_save)
+    monkeypatch.setattr(dedupe.DuplicateScan, "_scan_lock", fake_scan_lock)
+    monkeypatch.setattr(dedupe.DuplicateScan, "_due", fake_due)
+    monkeypatch.setattr(dedupe, "scan", dedupe.DuplicateScan(session_factory=FakeSession))
+    return stored
+
+# Stub out DBClient so we never hit Postgres
+@pytest.fixture(autouse=True)
+def stub_db(monkeypatch, stored):
+    writes = []
+
+    async def fake_query(self, table_name, filters=None, single_row=False, limit=None, offset=None, order_by=None, fields=None):
+        if table_name == "rollup_watermarks":
+            return {"name": filters["name"], "processed_until": stored.scanned_at} if stored.scanned_at else None
+        if table_name == "candidate_duplicate_pairs":
+            return list(stored.pairs)
+        assert table_name == "candidates"
+        rows = sorted(CANDIDATES, key=lambda r: r["id"])
+        if filters and "id__gt" in filters:
+            rows = [r for r in rows if r["id"] > filters["id__gt"]]
+        if filters and "id__in" in filters:
+            rows = [r for r in rows if r["id"] in filters["id__in"]]
+        if limit:
+            rows = rows[:limit]
+        if fields:
+            rows = [{f: r[f] for f in fields} for r in rows]
+        return rows
+
+    async def fake_update_entries(self, table_name, filters, update_data):
+        writes.append(("update", table_name, filters, update_data))
+        return 3 if table_name == "applications" else 1
+
+    async def fake_delete_entries(self, table_name, filters):
+        writes.append(("delete", table_name, filters))
+        return len(filters["id__in"])
+
+    async def fake_lock(self, table_name, filters, fields=None):
+        writes.append(("lock", table_name, filters))
+        return [{**r, "version": 1} for r in CANDIDATES if r["id"] in filters["id__in"]]
+
+    async def fake_update(self, table_name, identifier, update_data, expected_version=None):
+        writes.append(("update_one", table_name, identifier, update_data, expected_version))
+        survivor = next(r for r in CANDIDATES if r["id"] == identifier["id"])
+        return {**survivor, **update_data}
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(DBClient, "update_table_entries", fake_update_entries)
+    monkeypatch.setattr(DBClient, "delete_table_entries", fake_delete_entries)
+    monkeypatch.setattr(DBClient, "update_table_entry", fake_update)
+    monkeypatch.setattr(DBClient, "lock_table_entries", fake_lock)
+
+    async def fake_record_deleted(session, candidate_ids):
+        writes.append(("tombstone", list(candidate_ids)))
+
+    monkeypatch.setattr(skill_index, "record_deleted", fake_record_deleted)
+    monkeypatch.setattr(dedupe.settings, "DEDUPE_BATCH_SIZE", 2)
+    return writes
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+def test_normalization():
+    assert normalize_email(" Alice.Smith+jobs@GoogleMail.com ") == "alicesmith@gmail.com"
+    assert normalize_email("a.smith@work.example") == "a.smith@work.example"
+    assert normalize_phone("+44 7700 900123") == normalize_phone("07700-900-123")
+    assert normalize_phone("123") is None
+    assert normalize_name("Smith,  Álice") == normalize_name("alice smith")
+
+def test_detector_clusters_only_within_blocks():
+    detector = DuplicateDetector(threshold=0.6, batch_size=1)
+    detector.add(CANDIDATES[:3])
+    detector.add(CANDIDATES[3:])
+    clusters = detector.clusters()
+    assert len(clusters) == 1
+    # email match links 1-2, phone + name links 2-3; Bob only shares a phone
+    assert clusters[0]["candidate_ids"] == [c["id"] for c in CANDIDATES[:3]]
+
+@pytest.mark.asyncio
+async def test_list_duplicates_serves_the_last_scan(client: AsyncClient, monkeypatch):
+    r = await client.get("/candidates/duplicates")
+    assert r.status_code == 503
+    assert r.headers["retry-after"]
+
+    # scoring is done in chunks, letting other tasks run in between
+    events = []
+    score_pairs = DuplicateDetector.score_pairs
+
+    def tracking(self, pairs):
+        events.append("s")
+        return score_pairs(self, pairs)
+
+    async def request():
+        for _ in range(20):
+            events.append("r")
+            await asyncio.sleep(0)
+
+    monkeypatch.setattr(DuplicateDetector, "score_pairs", tracking)
+    opened = FakeSession.opened
+    await asyncio.gather(dedupe.scan.run(), request())
+    assert "srs" in "".join(events)
+    # one short session per batch of candidates read (5 candidates, 2 per batch)
+    assert FakeSession.opened - opened >= 4
+
+    r = await client.get("/candidates/duplicates")
+    assert r.status_code == 200, r.text
+    clusters = r.json()
+    assert len(clusters) == 1
+    assert {c["full_name"] for c in clusters[0]["candidates"]} == {"Alice Smith", "alice smith", "Smith, Alice"}
+
+    # stricter thresholds are derived from the stored pairs, looser ones need a rescan
+    r = await client.get("/candidates/duplicates", params={"threshold": 0.95})
+    assert r.json() == []
+    r = await client.get("/candidates/duplicates", params={"threshold": 0.1})
+    assert r.status_code == 400
+
+@pytest.mark.asyncio
+async def test_merge_repoints_applications_and_deletes_duplicates(client: AsyncClient, stub_db):
+    survivor, dup = CANDIDATES[0]["id"], CANDIDATES[1]["id"]
+    r = await client.post(f"/candidates/{survivor}/merge", json={"duplicate_ids": [dup]})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    # live and archived applications
+    assert body["applications_moved"] == 4
+    assert body["phone"] == "+44 7700 900123"
+    assert body["skills"] == ["python", "sql"]
+    # read under FOR UPDATE, so no application can reference the duplicate before it goes
+    assert stub_db[0] == ("lock", "candidates", {"id__in": [survivor, dup]})
+    assert stub_db[1] == ("update", "applications", {"candidate_id__in": [dup]}, {"candidate_id": survivor})
+    assert stub_db[2] == ("update", "applications_archive", {"candidate_id__in": [dup]}, {"candidate_id": survivor})
+    assert stub_db[3] == ("delete", "candidates", {"id__in": [dup]})
+    # so other workers' skill indexes drop it
+    assert stub_db[4] == ("tombstone", [dup])
+    # the merged fields are written at the version they were read at
+    assert stub_db[5][0] == "update_one" and stub_db[5][-1] == 1
+
+@pytest.mark.asyncio
+async def test_merge_of_a_concurrently_updated_survivor_conflicts(client: AsyncClient, monkeypatch):
+    await dedupe.scan.run()
+
+    async def stale_update(self, table_name, identifier, update_data, expected_version=None):
+        raise StaleVersionError(expected_version + 1)
+
+    monkeypatch.setattr(DBClient, "update_table_entry", stale_update)
+    survivor, dup = CANDIDATES[0]["id"], CANDIDATES[1]["id"]
+    r = await client.post(f"/candidates/{survivor}/merge", json={"duplicate_ids": [dup]})
+    assert r.status_code == 409
+    # rolled back, so the duplicate is still in the clusters
+    r = await client.get("/candidates/duplicates")
+    assert any(c["id"] == dup for cluster in r.json() for c in cluster["candidates"])
+
+@pytest.mark.asyncio
+async def test_merge_drops_duplicates_from_the_scan(client: AsyncClient):
+    await dedupe.scan.run()
+    survivor, dup = CANDIDATES[0]["id"], CANDIDATES[1]["id"]
+    r = await client.post(f"/candidates/{survivor}/merge", json={"duplicate_ids": [dup]})
+    assert r.status_code == 200
+    r = await client.get("/candidates/duplicates")
+    assert r.status_code == 200
+    assert not any(c["id"] == dup for cluster in r.json() for c in cluster["candidates"])
+
+@pytest.mark.asyncio
+async def test_merge_unknown_duplicate(client: AsyncClient):
+    survivor = CANDIDATES[0]["id"]
+    r = await client.post(f"/candidates/{survivor}/merge", json={"duplicate_ids": ["99999999-9999-9999-9999-999999999999"]})
+    assert r.status_code == 404
+
+@pytest.mark.asyncio
+async def test_one_worker_scans_and_every_worker_loads_the_result(stored, monkeypatch):
+    workers = [dedupe.DuplicateScan(session_factory=FakeSession) for _ in range(3)]
+    await workers[0].run()
+    # the others don't get the scan lock, or find the stored result recent
+    stored.elected = False
+    await workers[1].run()
+    stored.elected = True
+    await workers[2].run()
+    assert stored.saves == 1
+    assert all(w.ready for w in workers)
+    assert workers[1].clusters() == workers[0].clusters()
+    assert workers[0].stats()["scans"] == 1 and workers[2].stats()["scans"] == 0
+
+    # candidates deleted since the scan are not served
+    deleted = CANDIDATES[1]["id"]
+    monkeypatch.setitem(globals(), "CANDIDATES", [c for c in CANDIDATES if c["id"] != deleted])
+    stored.scanned_at = datetime(2026, 10, 20)
+    await workers[1].run()
+    assert stored.saves == 1
+    assert deleted not in {c["id"] for cluster in workers[1].clusters() for c in cluster["candidates"]}
@@ -0,0 +1,123 @@
+# tests/test_idempotency.py
+import asyncio
+import uuid
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import analytics
+from app.core.db_client import DBClient
+from app.core.idempotency import IdempotencyMiddleware, InMemoryIdempotencyStore
+from app.core.security import create_access_token, get_current_user
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+# Stub out DBClient and count how often the write path runs
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    async def fake_create(self, table_name: str, data: dict):
+        calls.append(data)
+        await asyncio.sleep(0.05)
+        return {**data, "id": str(uuid.uuid4())}
+
+    async def fake_record_created(session, applications):
+        pass
+
+    monkeypatch.setattr(DBClient, "create_table_entry", fake_create)
+    monkeypatch.setattr(analytics, "record_created", fake_record_created)
+    return calls
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_retry_replays_cached_response(client: AsyncClient, calls):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    payload = {"full_name": "Alice", "email": "alice@example.com"}
+
+    r1 = await client.post("/candidates/", json=payload, headers=headers)
+    r2 = await client.post("/candidates/", json=payload, headers=headers)
+
+    assert r1.status_code == r2.status_code == 201
+    assert r1.json() == r2.json()
+    assert r2.headers["idempotent-replayed"] == "true"
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_original(client: AsyncClient, calls):
+    cid = "11111111-1111-1111-1111-111111111111"
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    responses = await asyncio.gather(*[
+        client.post(f"/candidates/{cid}/applications", json={"job_title": "Engineer"}, headers=headers)
+        for _ in range(5)
+    ])
+
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_key_reuse_with_different_body_rejected(client: AsyncClient, calls):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    await client.post("/candidates/", json={"full_name": "Alice"}, headers=headers)
+    r = await client.post("/candidates/", json={"full_name": "Bob"}, headers=headers)
+    assert r.status_code == 422
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_requests_without_key_are_not_cached(client: AsyncClient, calls):
+    payload = {"full_name": "Alice", "email": "alice@example.com"}
+    await client.post("/candidates/", json=payload)
+    await client.post("/candidates/", json=payload)
+    assert len(calls) == 2
+
+@pytest.mark.asyncio
+async def test_retry_with_a_refreshed_token_replays(client: AsyncClient, calls):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    payload = {"full_name": "Alice", "email": "alice@example.com"}
+    first, refreshed = (create_access_token({"sub": "00000000-0000-0000-0000-000000000001"}) for _ in range(2))
+    assert first != refreshed
+
+    r1 = await client.post("/candidates/", json=payload, headers={**headers, "Authorization": f"Bearer {first}"})
+    r2 = await client.post("/candidates/", json=payload, headers={**headers, "Authorization": f"Bearer {refreshed}"})
+    assert r2.headers["idempotent-replayed"] == "true"
+    assert r1.json() == r2.json()
+    assert len(calls) == 1
+
+@pytest.mark.asyncio
+async def test_duplicates_on_different_workers_run_once():
+    runs = []
+
+    async def endpoint(scope, receive, send):
+        runs.append(scope["path"])
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.start", "status": 201, "headers": []})
+        await send({"type": "http.response.body", "body": b'{"id": 1}'})
+
+    # two workers, each with its own in-flight requests, sharing one store
+    store = InMemoryIdempotencyStore()
+    workers = [IdempotencyMiddleware(endpoint, store=store) for _ in range(2)]
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+    async def post(worker):
+        transport = ASGITransport(app=worker)
+        async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+            return await ac.post("/candidates/", json={"full_name": "Alice"}, headers=headers)
+
+    responses = await asyncio.gather(*(post(worker) for worker in workers))
+    assert runs == ["/candidates/"]
+    assert [r.status_code for r in responses] == [201, 201]
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 1
@@ -0,0 +1,100 @@
+# tests/test_logging.py
+import io
+import json
+import logging
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, text
+
+from main import app
+from app.core import logs
+from app.core.config import settings
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest.fixture(autouse=True)
+def stub_queries(monkeypatch):
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        logging.getLogger("tests").info("querying %s", table_name)
+        return []
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_request_id_is_propagated_to_logs(client: AsyncClient, caplog):
+    caplog.set_level(logging.INFO)
+    r = await client.get("/candidates/", headers={"X-Request-ID": "abc-123"})
+    assert r.headers["x-request-id"] == "abc-123"
+
+    inner = next(record for record in caplog.records if record.name == "tests")
+    assert inner.request_id == "abc-123"
+    line = next(record for record in caplog.records if record.name == "app.request")
+    assert line.request_id == "abc-123"
+    assert line.status == 200
+    assert line.path == "/candidates/"
+    assert line.db_queries == 0
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated_when_missing_or_invalid(client: AsyncClient):
+    first = await client.get("/candidates/")
+    second = await client.get("/candidates/", headers={"X-Request-ID": "no spaces\nallowed"})
+    assert len(first.headers["x-request-id"]) == 32
+    assert second.headers["x-request-id"] not in ("no spaces\nallowed", first.headers["x-request-id"])
+
+def test_queue_handler_writes_json_lines_from_listener_thread():
+    stream = io.StringIO()
+    logs.configure_logging(level="INFO", fmt="json", stream=stream)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("tests").exception("failed for %s", "alice", extra={"table": "candidates"})
+    finally:
+        logs.stop_logging()
+        logs.configure_logging()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry["level"] == "ERROR"
+    assert entry["message"] == "failed for alice"
+    assert entry["table"] == "candidates"
+    assert "ValueError: boom" in entry["exception"]
+
+def test_db_time_is_recorded_and_sql_logs_are_sampled(monkeypatch, caplog):
+    engine = create_engine("sqlite://")
+    context = logs.RequestContext("req-1")
+    token = logs._request_context.set(context)
+    caplog.set_level(logging.INFO, logger="app.sql")
+    try:
+        monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 0.0)
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        assert not [record for record in caplog.records if record.name == "app.sql"]
+
+        monkeypatch.setattr(settings, "SQL_LOG_SAMPLE_RATE", 1.0)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 2"))
+    finally:
+        logs._request_context.reset(token)
+
+    assert context.db_queries == 4
+    assert context.db_seconds > 0
+    sampled = [record for record in caplog.records if record.name == "app.sql"]
+    assert [record.statement for record in sampled] == ["SELECT 2"]
+    assert sampled[0].request_id == "req-1"
@@ -0,0 +1,214 @@
+# tests/test_purge.py
+import json
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import exc
+
+from main import app
+from app.core import analytics, database
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+
+ALICE = "11111111-1111-1111-1111-111111111111"
+APPLICATION = "aaaaaaaa-0000-0000-0000-000000000002"
+
+
+class FakeSession:
+    """
+    Stands in for AsyncSessionLocal(): records the statements run and commits.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.info = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def execute(self, stmt, params=None):
+        self.log.append(str(stmt))
+
+    async def commit(self):
+        self.log.append("COMMIT")
+
+    async def rollback(self):
+        self.log.append("ROLLBACK")
+
+    async def close(self):
+        pass
+
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+# Stub out DBClient with in-memory candidates and applications
+@pytest.fixture
+def db(monkeypatch):
+    state = SimpleNamespace(
+        candidates={f"{i:08d}-0000-0000-0000-000000000000": {"full_name": f"Test {i}", "version": 1} for i in range(7)},
+        applications={
+            "a1": {"candidate_id": "00000001-0000-0000-0000-000000000000", "version": 1},
+            APPLICATION: {"candidate_id": "00000005-0000-0000-0000-000000000000", "version": 4},
+        },
+        locks=[],
+        queries=[],
+        deletes=[],
+        forgotten=[],
+        log=[],
+        lock_timeouts=0,
+    )
+    state.candidates[ALICE] = {"full_name": "Alice", "version": 3}
+
+    async def fake_query(self, table_name, filters=None, single_row=False, limit=None, offset=None,
+                         order_by=None, fields=None):
+        filters = filters or {}
+        if table_name == "applications_archive":
+            return []
+        if table_name == "applications":
+            if "candidate_id__in" in filters:
+                return [
+                    {"id": a} for a, row in state.applications.items()
+                    if row["candidate_id"] in filters["candidate_id__in"]
+                ]
+            row = state.applications.get(filters["id"])
+            return {"id": filters["id"], **row} if row else None
+        assert table_name == "candidates"
+        state.queries.append(dict(filters))
+        rows = [
+            {"id": k, **v} for k, v in sorted(state.candidates.items())
+            if k > filters.get("id__gt", "")
+            and v["full_name"].startswith(filters.get("full_name__prefix", ""))
+            and k == filters.get("id", k)
+        ]
+        if single_row:
+            return rows[0] if rows else None
+        return rows[:limit]
+
+    async def fake_delete(self, table_name, filters):
+        if state.lock_timeouts:
+            state.lock_timeouts -= 1
+            raise exc.OperationalError("DELETE", {}, SimpleNamespace(sqlstate="55P03"))
+        state.deletes.append((table_name, filters))
+        if table_name == "candidates":
+            ids = [i for i in filters["id__in"] if i in state.candidates]
+            for i in ids:
+                del state.candidates[i]
+            return len(ids)
+        if table_name == "applications":
+            ids = [
+                a for a, row in state.applications.items()
+                if row["candidate_id"] in filters.get("candidate_id__in", [row["candidate_id"]])
+                and a in filters.get("id__in", [a])
+                and row["version"] == filters.get("version", row["version"])
+            ]
+            for a in ids:
+                del state.applications[a]
+            return len(ids)
+        return 0
+
+    # SELECT ... FOR UPDATE of the candidates before anything is deleted
+    async def fake_lock(self, table_name, filters, fields=None):
+        assert table_name == "candidates"
+        ids = [i for i in filters.get("id__in", [filters.get("id")]) if i in state.candidates]
+        state.locks.append(ids)
+        return [{"id": i, **state.candidates[i]} for i in ids]
+
+    async def fake_forget(session, application_ids):
+        state.forgotten += application_ids
+
+    monkeypatch.setattr(analytics, "forget_applications", fake_forget)
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(DBClient, "lock_table_entries", fake_lock)
+    monkeypatch.setattr(DBClient, "delete_table_entries", fake_delete)
+    monkeypatch.setattr(database, "AsyncSessionLocal", lambda: FakeSession(state.log))
+    return state
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_delete_candidate_removes_applications_first(client: AsyncClient, db):
+    r = await client.delete(f"/candidates/{ALICE}", headers={"If-Match": '"2"'})
+    assert r.status_code == 412
+    assert r.headers["etag"] == '"3"'
+    assert db.deletes == []
+
+    r = await client.delete(f"/candidates/{ALICE}", headers={"If-Match": '"3"'})
+    assert r.status_code == 204
+    # locked, and its version checked, before anything is deleted
+    assert db.locks[0] == [ALICE]
+    assert [table for table, _ in db.deletes] == ["applications", "applications_archive", "candidates"]
+    assert ALICE not in db.candidates
+    assert db.forgotten == []
+
+    r = await client.delete(f"/candidates/{ALICE}")
+    assert r.status_code == 404
+
+@pytest.mark.asyncio
+async def test_delete_application_checks_the_version_in_the_delete(client: AsyncClient, db):
+    r = await client.delete(f"/applications/{APPLICATION}", headers={"If-Match": '"3"'})
+    assert r.status_code == 412
+    assert r.headers["etag"] == '"4"'
+    # the version condition is part of the DELETE itself
+    assert db.deletes == [("applications", {"id__in": [APPLICATION], "version": 3})]
+    assert APPLICATION in db.applications
+    assert db.forgotten == []
+
+    r = await client.delete(f"/applications/{APPLICATION}", headers={"If-Match": '"4"'})
+    assert r.status_code == 204
+    assert APPLICATION not in db.applications
+    # its status history goes with it
+    assert db.forgotten == [APPLICATION]
+    r = await client.delete(f"/applications/{APPLICATION}")
+    assert r.status_code == 404
+
+@pytest.mark.asyncio
+async def test_bulk_delete_runs_keyset_batches_and_streams_progress(client: AsyncClient, db):
+    r = await client.delete("/candidates/", params={"full_name__prefix": "Test", "batch_size": 3, "pause": 0})
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line["batches"] for line in lines] == [1, 2, 3]
+    assert lines[-1]["done"] and not lines[0]["done"]
+    assert lines[-1]["deleted"] == {"candidates": 7, "applications": 2, "applications_archive": 0}
+    assert list(db.candidates) == [ALICE]
+    # the purged candidates' applications lose their status history too
+    assert sorted(db.forgotten) == sorted(["a1", APPLICATION])
+    # each batch locks its candidates before deleting their applications
+    assert [len(ids) for ids in db.locks] == [3, 3, 1]
+
+    # every batch continues after the last id of the previous one
+    assert [q.get("id__gt") for q in db.queries] == [None, lines[0]["last_id"], lines[1]["last_id"]]
+    # one short transaction per batch, each bounded by lock_timeout
+    assert db.log.count("COMMIT") == 3
+    assert sum("lock_timeout" in s for s in db.log) == 3
+
+@pytest.mark.asyncio
+async def test_bulk_delete_retries_batches_that_hit_lock_timeout(client: AsyncClient, db):
+    db.lock_timeouts = 2
+    r = await client.delete("/candidates/", params={"full_name__prefix": "Test", "batch_size": 10, "pause": 0})
+    assert r.status_code == 200
+    assert json.loads(r.text.splitlines()[-1])["deleted"]["candidates"] == 7
+    assert len(db.queries) == 3
+
+@pytest.mark.asyncio
+async def test_bulk_delete_requires_a_valid_filter(client: AsyncClient, db):
+    r = await client.delete("/candidates/")
+    assert r.status_code == 400
+    r = await client.delete("/applications/", params={"pause": 0})
+    assert r.status_code == 400
+    assert db.deletes == []
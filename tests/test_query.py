@@ -0,0 +1,59 @@
+# tests/test_query.py
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core.db_client import DBClient
+from app.core.query import InvalidQueryError, build_filter_clause
+from app.models.application import Application, ApplicationStatus
+from app.models.candidate import Candidate
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_operator_filters_compile():
+    stmt = DBClient.build_select(Application, filters={
+        "status__in": "APPLIED,INTERVIEWING",
+        "applied_at__range": "2025-01-01,2025-02-01",
+        "job_title__prefix": "Back",
+        "candidate_id__isnull": "false",
+    })
+    sql = compile_sql(stmt)
+    assert "applications.status = ANY (" in sql
+    assert "applications.applied_at BETWEEN" in sql
+    assert "applications.job_title LIKE" in sql
+    assert "applications.candidate_id IS NOT NULL" in sql
+
+def test_query_string_values_are_coerced():
+    clause = build_filter_clause(Application, "applied_at__gte", "2025-01-01T00:00:00+00:00")
+    assert clause.right.value == datetime(2025, 1, 1)
+    clause = build_filter_clause(Application, "status", "HIRED")
+    assert clause.right.value is ApplicationStatus.HIRED
+    clause = build_filter_clause(Candidate, "id", "11111111-1111-1111-1111-111111111111")
+    assert isinstance(clause.right.value, uuid.UUID)
+
+def test_sparse_fieldset_and_ordering():
+    stmt = DBClient.build_select(Candidate, order_by=["-created_at", "full_name"], fields=["id", "full_name"])
+    sql = compile_sql(stmt)
+    assert sql.startswith("SELECT candidates.id, candidates.full_name \nFROM candidates")
+    assert "skills" not in sql
+    assert "ORDER BY candidates.created_at DESC, candidates.full_name ASC" in sql
+
+def test_skill_containment_uses_jsonb_operator():
+    sql = compile_sql(DBClient.build_select(Candidate, filters={"skills__contains": ["python"]}))
+    assert "candidates.skills @>" in sql
+
+@pytest.mark.parametrize("kwargs", [
+    {"filters": {"nope": 1}},
+    {"filters": {"applied_at__gte": "yesterday"}},
+    {"filters": {"job_title__contains": "x"}},
+    {"order_by": ["-nope"]},
+    {"fields": ["nope"]},
+])
+def test_unknown_or_malformed_input_is_rejected(kwargs):
+    with pytest.raises(InvalidQueryError):
+        DBClient.build_select(Application, **kwargs)
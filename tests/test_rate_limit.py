@@ -0,0 +1,92 @@
+# tests/test_rate_limit.py
+import asyncio
+
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.core import security
+from app.core.rate_limit import (
+    AdmissionController,
+    RateLimiter,
+    RateLimitMiddleware,
+    TokenBucket,
+)
+
+
+def build_app(limiter: RateLimiter, admission: AdmissionController) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/candidates/")
+    async def list_candidates():
+        return []
+
+    @app.post("/candidates/")
+    async def create_candidate():
+        return {}
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.2)
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, admission=admission, enabled=True)
+    return app
+
+@pytest_asyncio.fixture
+async def limited():
+    limiter = RateLimiter(rate=1, burst=3, route_weights={"POST /candidates": 3})
+    admission = AdmissionController(max_in_flight=1, timeout=0.01)
+    transport = ASGITransport(app=build_app(limiter, admission))
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac, limiter, admission
+
+
+# ----- Tests -----
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(rate=10, capacity=1)
+    assert bucket.try_acquire()[0]
+    allowed, retry_after = bucket.try_acquire()
+    assert not allowed
+    assert 0 < retry_after <= 0.1
+
+@pytest.mark.asyncio
+async def test_rate_limit_returns_429_with_retry_after(limited):
+    client, limiter, _ = limited
+    codes = [(await client.get("/candidates/")).status_code for _ in range(4)]
+    assert codes == [200, 200, 200, 429]
+
+    r = await client.get("/candidates/")
+    assert r.status_code == 429
+    assert int(r.headers["retry-after"]) >= 1
+    assert limiter.stats()["rejected"] == 2
+
+@pytest.mark.asyncio
+async def test_route_weights_and_per_user_buckets(limited):
+    client, _, _ = limited
+    alice = {"Authorization": "Bearer " + security.create_access_token({"sub": "alice"})}
+    bob = {"Authorization": "Bearer " + security.create_access_token({"sub": "bob"})}
+
+    assert (await client.post("/candidates/", headers=alice)).status_code == 200
+    # the weighted POST drained alice's whole bucket, bob is unaffected
+    assert (await client.get("/candidates/", headers=alice)).status_code == 429
+    assert (await client.get("/candidates/", headers=bob)).status_code == 200
+
+def test_rejections_are_counted_per_rule_not_per_path():
+    limiter = RateLimiter(rate=0, burst=0, route_weights={"POST /candidates": 3})
+    for i in range(50):
+        limiter.check("alice", "POST", f"/candidates/{i:08d}-0000-0000-0000-000000000000/applications")
+        limiter.check("alice", "GET", f"/applications/{i:08d}-0000-0000-0000-000000000000")
+    assert limiter.stats()["rejected_by_route"] == {"POST /candidates": 50, "GET *": 50}
+
+@pytest.mark.asyncio
+async def test_admission_control_rejects_over_capacity(limited):
+    client, _, admission = limited
+    slow, busy = await asyncio.gather(client.get("/slow"), client.get("/candidates/"))
+    assert slow.status_code == 200
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+    assert admission.stats()["rejected"] == 1
+    assert admission.stats()["in_flight"] == 0
@@ -0,0 +1,114 @@
+# tests/test_read_path.py
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+
+from app.core.db_client import DBClient
+from app.models.application import Application  # noqa: F401 (configures Candidate.applications)
+from app.models.candidate import Candidate
+
+ROWS = 10_000
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class SyncSessionAdapter:
+    """
+    Runs DBClient's awaits on a synchronous SQLite session.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, stmt, params=None):
+        return self.session.execute(stmt, params)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Candidate.__table__.create(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(Candidate.__table__), [
+            {
+                "id": uuid.uuid4(),
+                "full_name": f"Candidate {i}",
+                "email": f"candidate{i}@example.com",
+                "phone": "+4912345678",
+                "skills": ["python", "sql"],
+                "created_at": now,
+                "updated_at": now,
+                "version": 1,
+            }
+            for i in range(ROWS)
+        ])
+    return engine
+
+
+async def orm_listing(session):
+    # the previous path: entities loaded into the identity map, then copied
+    result = session.execute(select(Candidate))
+    return [DBClient.row_to_dict(row) for row in result.scalars().all()]
+
+
+async def tuple_listing(session):
+    return await DBClient(SyncSessionAdapter(session)).query_table_data("candidates")
+
+
+async def cpu_time(engine, listing):
+    with Session(engine) as session:
+        start = time.process_time()
+        rows = await listing(session)
+        return rows, time.process_time() - start
+
+
+async def peak_memory(engine, listing):
+    with Session(engine) as session:
+        tracemalloc.start()
+        rows = await listing(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return rows, peak
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_tuple_path_returns_the_same_rows(engine):
+    with Session(engine) as session:
+        expected = await orm_listing(session)
+    with Session(engine) as session:
+        rows = await tuple_listing(session)
+        assert len(session.identity_map) == 0
+    assert rows == expected
+
+@pytest.mark.asyncio
+async def test_tuple_path_peaks_lower_on_10k_rows(engine):
+    _, orm_peak = await peak_memory(engine, orm_listing)
+    rows, tuple_peak = await peak_memory(engine, tuple_listing)
+    assert len(rows) == ROWS
+    assert tuple_peak < orm_peak
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_benchmark_10k_row_listing(engine):
+    # warm up statement compilation for both paths
+    for listing in (orm_listing, tuple_listing):
+        with Session(engine) as session:
+            await listing(session)
+
+    _, orm_cpu = await cpu_time(engine, orm_listing)
+    rows, tuple_cpu = await cpu_time(engine, tuple_listing)
+    assert len(rows) == ROWS
+    assert tuple_cpu < orm_cpu
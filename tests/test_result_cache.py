@@ -0,0 +1,160 @@
+# tests/test_result_cache.py
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import result_cache
+from app.core.db_client import DBClient
+from app.core.result_cache import ResultCache
+from app.core.security import get_current_user
+
+CANDIDATES = [
+    {"id": "11111111-1111-1111-1111-111111111111", "full_name": "Alice", "skills": ["python"]},
+    {"id": "22222222-2222-2222-2222-222222222222", "full_name": "Bob", "skills": ["java"]},
+]
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = ResultCache(max_bytes=10_000, ttl=60, enabled=True)
+    monkeypatch.setattr(result_cache, "cache", cache)
+    return cache
+
+@pytest.fixture(autouse=True)
+def queries(monkeypatch):
+    calls = []
+
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        calls.append((table_name, filters))
+        return CANDIDATES
+
+    async def fake_count(self, table_name, filters=None):
+        return len(CANDIDATES), False
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(DBClient, "count_table_data", fake_count)
+    return calls
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_repeated_listing_is_served_from_cache(client: AsyncClient, queries):
+    first = await client.get("/candidates/", params={"limit": 10, "include_total": "true"})
+    second = await client.get("/candidates/", params={"include_total": "true", "limit": 10})
+    assert first.status_code == second.status_code == 200
+    assert len(queries) == 1
+    assert "x-cache" not in first.headers
+    assert second.headers["x-cache"] == "hit"
+    assert second.content == first.content
+    assert second.headers["x-total-count"] == "2"
+
+@pytest.mark.asyncio
+async def test_write_invalidates_only_tables_read(client: AsyncClient, queries):
+    await client.get("/candidates/")
+    await result_cache.table_written(None, "applications")
+    await client.get("/candidates/")
+    assert len(queries) == 1
+
+    await result_cache.table_written(None, "candidates")
+    r = await client.get("/candidates/")
+    assert "x-cache" not in r.headers
+    assert len(queries) == 2
+
+@pytest.mark.asyncio
+async def test_endpoint_headers_are_kept_and_replayed(client: AsyncClient, monkeypatch):
+    store = result_cache.ResultCache.store
+
+    def store_with_headers(self, lookup, content, response=None):
+        response.headers["ETag"] = '"v1"'
+        response.headers["Cache-Control"] = "private, max-age=5"
+        return store(self, lookup, content, response)
+
+    monkeypatch.setattr(result_cache.ResultCache, "store", store_with_headers)
+    first = await client.get("/candidates/", params={"include_total": "true"})
+    second = await client.get("/candidates/", params={"include_total": "true"})
+    for r in (first, second):
+        assert r.headers["etag"] == '"v1"'
+        assert r.headers["cache-control"] == "private, max-age=5"
+        assert r.headers["x-total-count"] == "2"
+        assert r.headers["content-length"] == str(len(r.content))
+    assert second.headers["x-cache"] == "hit"
+
+@pytest.mark.asyncio
+async def test_invalidation_listener_reconnects_with_backoff(cache, monkeypatch):
+    attempts = []
+
+    class FakeConnection:
+        def __init__(self):
+            self.on_termination = None
+
+        async def add_listener(self, channel, callback):
+            pass
+
+        def add_termination_listener(self, callback):
+            self.on_termination = callback
+
+        async def close(self):
+            pass
+
+    async def connect(dsn):
+        attempts.append(asyncio.get_running_loop().time())
+        # the database is unreachable for the first retry
+        if len(attempts) == 2:
+            raise OSError("connection refused")
+        return FakeConnection()
+
+    monkeypatch.setitem(sys.modules, "asyncpg", SimpleNamespace(connect=connect))
+    monkeypatch.setattr(result_cache, "RECONNECT_INITIAL_DELAY", 0.01)
+    listener = result_cache.InvalidationListener(cache)
+    await listener.start()
+    assert cache.coherent
+
+    connection = listener._connection
+    connection.on_termination(connection)
+    assert not cache.coherent
+    for _ in range(100):
+        if listener.reconnects:
+            break
+        await asyncio.sleep(0.01)
+    assert cache.coherent and listener.reconnects == 1
+    assert len(attempts) == 3
+    # the second retry waited twice as long as the first
+    assert attempts[2] - attempts[1] >= 0.02
+
+    await listener.stop()
+    assert listener._connection is None
+
+def test_lru_eviction_keeps_cache_under_byte_bound():
+    cache = ResultCache(max_bytes=250, ttl=60, enabled=True)
+
+    class FakeRequest:
+        def __init__(self, query):
+            from starlette.datastructures import URL, QueryParams
+            self.url = URL(f"http://testserver/candidates/?{query}")
+            self.query_params = QueryParams(query)
+
+    for i in range(5):
+        lookup = cache.lookup(FakeRequest(f"offset={i}"), ("candidates",))
+        cache.store(lookup, [{"id": i, "name": "x" * 80}])
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 250
+    assert stats["evictions"] == 3
+    assert cache.lookup(FakeRequest("offset=4"), ("candidates",)).response is not None
+    assert cache.lookup(FakeRequest("offset=0"), ("candidates",)).response is None
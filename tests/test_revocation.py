@@ -0,0 +1,173 @@
+# tests/test_revocation.py
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import revocation, security
+from app.core.config import settings
+from app.core.db_client import DBClient
+from app.core.revocation import RevocationList
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+ADMIN_ID = "00000000-0000-0000-0000-0000000000ad"
+
+
+def token_for(user_id: str, issued_ago: float = 0) -> str:
+    return security.create_access_token({"sub": user_id}) if not issued_ago else jwt.encode(
+        {
+            "sub": user_id,
+            "jti": revocation.new_jti(),
+            "iat": int(time.time() - issued_ago),
+            "exp": int(time.time() + 3600),
+        },
+        settings.JWT_SECRET,
+        algorithm=settings.JWT_ALGORITHM,
+    )
+
+
+@pytest.fixture
+def revocations(monkeypatch):
+    revocations = RevocationList()
+    monkeypatch.setattr(revocation, "revocations", revocations)
+    return revocations
+
+# Use the real get_current_user against an in-memory users and token_revocations table
+@pytest.fixture(autouse=True)
+def db(monkeypatch, revocations):
+    app.dependency_overrides.pop(security.get_current_user, None)
+    state = {"queries": [], "revocations": []}
+
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        state["queries"].append(table_name)
+        if table_name == "users":
+            user_id = filters["id"]
+            return {"id": user_id, "is_admin": user_id == ADMIN_ID} if user_id in (USER_ID, ADMIN_ID) else None
+        if table_name == "token_revocations":
+            state["filters"] = filters
+            since = filters.get("revoked_at__gte")
+            return [r for r in state["revocations"] if since is None or r["revoked_at"] >= since]
+        return []
+
+    async def fake_create(self, table_name, data):
+        assert table_name == "token_revocations"
+        state.setdefault("create_data", []).append(data)
+        row = {
+            "id": len(state["revocations"]) + 1,
+            # the database default, a different clock
+            "revoked_at": datetime.now(timezone.utc) - timedelta(seconds=30),
+            **data,
+        }
+        state["revocations"].append(row)
+        return row
+
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(DBClient, "create_table_entry", fake_create)
+    return state
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_logout_revokes_the_token_without_queries_on_later_requests(client: AsyncClient, db):
+    token = token_for(USER_ID)
+    claims = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    assert claims["jti"] and claims["iat"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = await client.get("/auth/token/validate", headers=headers)
+    assert r.status_code == 200
+    r = await client.post("/auth/logout", headers=headers)
+    assert r.status_code == 204, r.text
+    assert db["revocations"][0]["jti"] == claims["jti"]
+
+    db["queries"].clear()
+    r = await client.post("/auth/logout", headers=headers)
+    assert r.status_code == 401
+    r = await client.get("/auth/token/validate", headers=headers)
+    assert r.status_code == 401
+    # the revocation check itself never queried
+    assert "token_revocations" not in db["queries"]
+
+    other = await client.get("/auth/token/validate", headers={"Authorization": f"Bearer {token_for(USER_ID)}"})
+    assert other.status_code == 200
+
+@pytest.mark.asyncio
+async def test_admin_revokes_every_token_of_a_user(client: AsyncClient, db, revocations):
+    old = {"Authorization": f"Bearer {token_for(USER_ID, issued_ago=60)}"}
+    r = await client.post("/auth/revoke", json={"user_id": USER_ID}, headers=old)
+    assert r.status_code == 403
+
+    admin = {"Authorization": f"Bearer {token_for(ADMIN_ID)}"}
+    r = await client.post("/auth/revoke", json={"user_id": USER_ID, "jti": "x"}, headers=admin)
+    assert r.status_code == 422
+    r = await client.post("/auth/revoke", json={"user_id": USER_ID, "reason": "leaked"}, headers=admin)
+    assert r.status_code == 201, r.text
+    assert revocations.stats()["revoked_users"] == 1
+
+    r = await client.post("/auth/logout", headers=old)
+    assert r.status_code == 401
+    # tokens issued after the revocation still work
+    r = await client.post("/auth/logout", headers={"Authorization": f"Bearer {token_for(USER_ID)}"})
+    assert r.status_code == 204
+
+def test_user_revocation_cutoff_is_sub_second(revocations):
+    revoked_at = datetime.now(timezone.utc).replace(microsecond=700_000)
+    cutoff = revoked_at.timestamp()
+    revocations.add({"user_id": USER_ID, "revoked_at": revoked_at, "expires_at": revoked_at + timedelta(hours=1)})
+    # issued earlier in the same second, and tokens with whole-second iat
+    assert revocations.is_revoked({"sub": USER_ID, "iat": cutoff - 0.5})
+    assert revocations.is_revoked({"sub": USER_ID, "iat": int(cutoff)})
+    # logging in again right after the revocation
+    assert not revocations.is_revoked({"sub": USER_ID, "iat": cutoff + 0.001})
+
+@pytest.mark.asyncio
+async def test_revocation_and_tokens_use_the_same_clock(client: AsyncClient, db, revocations):
+    before = token_for(USER_ID)
+    admin = {"Authorization": f"Bearer {token_for(ADMIN_ID)}"}
+    r = await client.post("/auth/revoke", json={"user_id": USER_ID}, headers=admin)
+    assert r.status_code == 201, r.text
+    after = token_for(USER_ID)
+    # the app sets revoked_at, not the database default
+    assert "revoked_at" in db["create_data"][0]
+
+    r = await client.get("/auth/token/validate", headers={"Authorization": f"Bearer {before}"})
+    assert r.status_code == 401
+    r = await client.get("/auth/token/validate", headers={"Authorization": f"Bearer {after}"})
+    assert r.status_code == 200
+
+@pytest.mark.asyncio
+async def test_refresh_reads_only_recent_rows_and_prunes_expired(db, revocations):
+    now = datetime.now(timezone.utc)
+    db["revocations"] += [
+        {"jti": "old", "user_id": None, "revoked_at": now - timedelta(hours=1), "expires_at": now + timedelta(hours=1)},
+        {"jti": "gone", "user_id": None, "revoked_at": now - timedelta(hours=3), "expires_at": now - timedelta(hours=1)},
+    ]
+    await revocations.refresh(DBClient(None))
+    assert revocations.is_revoked({"jti": "old"})
+    assert not revocations.is_revoked({"jti": "gone"})
+
+    # another worker revokes a token; the next refresh only asks for recent rows
+    db["revocations"].append(
+        {"jti": "new", "user_id": None, "revoked_at": now, "expires_at": now + timedelta(seconds=1)}
+    )
+    await revocations.refresh(DBClient(None))
+    assert revocations.is_revoked({"jti": "new"})
+    assert db["filters"]["revoked_at__gte"] == now - timedelta(hours=1) - timedelta(
+        seconds=settings.REVOCATION_REFRESH_OVERLAP_SECONDS
+    )
+
+    time.sleep(1.1)
+    revocations.prune()
+    assert not revocations.is_revoked({"jti": "new"})
+    assert revocations.stats()["revoked_tokens"] == 1
@@ -0,0 +1,51 @@
+# tests/test_server.py
+import importlib.util
+
+import pytest
+
+from app.core.config import Settings
+from app.core.server import uvicorn_options
+
+
+def make_settings(**overrides) -> Settings:
+    return Settings(JWT_SECRET="x", JWT_ALGORITHM="HS256", **overrides)
+
+
+def test_development_mode_runs_single_process():
+    options = uvicorn_options(make_settings(SERVER_MODE="development", DEBUG=True))
+    assert options["reload"] is True
+    assert "workers" not in options
+
+def test_production_mode_options():
+    options = uvicorn_options(make_settings(
+        SERVER_MODE="production", WEB_WORKERS=16, WORKER_MAX_REQUESTS=5000,
+        GRACEFUL_SHUTDOWN_TIMEOUT=20, SERVER_HTTP="h11", SERVER_LOOP="asyncio",
+    ))
+    assert options["workers"] == 16
+    assert options["limit_max_requests"] == 5000
+    assert options["timeout_graceful_shutdown"] == 20
+    assert options["loop"] == "asyncio"
+    assert options["http"] == "h11"
+
+def test_auto_loop_falls_back_without_uvloop():
+    options = uvicorn_options(make_settings(SERVER_MODE="production", SERVER_LOOP="auto"))
+    expected = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    assert options["loop"] == expected
+
+@pytest.mark.skipif(importlib.util.find_spec("uvloop") is not None, reason="uvloop installed")
+def test_requested_uvloop_must_be_installed():
+    with pytest.raises(RuntimeError, match="uvloop is not installed"):
+        uvicorn_options(make_settings(SERVER_MODE="production", SERVER_LOOP="uvloop"))
+
+def test_connection_budget_split_between_workers():
+    settings = make_settings(SERVER_MODE="production", WEB_WORKERS=16, DB_CONNECTION_BUDGET=100)
+    assert settings.DB_POOL_SIZE == 6
+    assert settings.DB_MAX_OVERFLOW == 0
+
+def test_connection_budget_reserves_the_notify_listeners():
+    settings = make_settings(
+        SERVER_MODE="production", WEB_WORKERS=16, DB_CONNECTION_BUDGET=100,
+        RESULT_CACHE_ENABLED=True, RESULT_CACHE_NOTIFY=True,
+    )
+    # one LISTEN connection per worker outside the pool: 16 * 5 + 16 <= 100
+    assert settings.DB_POOL_SIZE == 5
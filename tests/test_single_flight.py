@@ -0,0 +1,142 @@
+# tests/test_single_flight.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import exc
+
+from app.core import result_cache, single_flight
+from app.core.db_client import DBClient
+from app.core.single_flight import SingleFlight
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def keys(self):
+        return ["id", "full_name"]
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+
+class FakeSession:
+    """
+    Every execution takes ``delay`` seconds and is recorded in ``log``.
+    """
+
+    def __init__(self, log, delay=0.05):
+        self.log = log
+        self.delay = delay
+        self.info = {}
+
+    async def execute(self, stmt, params=None):
+        self.log.append(dict(params or {}))
+        await asyncio.sleep(self.delay)
+        return FakeResult([("c1", "Alice"), ("c2", "Bob")])
+
+
+@pytest.fixture(autouse=True)
+def reads(monkeypatch):
+    reads = SingleFlight(window=0.5, enabled=True)
+    monkeypatch.setattr(single_flight, "reads", reads)
+    return reads
+
+
+def read(session, **filters):
+    return DBClient(session).query_table_data("candidates", filters=filters, fields=["id", "full_name"])
+
+
+# ----- Tests -----
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_reads_share_one_execution(reads):
+    log = []
+    results = await asyncio.gather(
+        *(read(FakeSession(log), full_name__prefix="A") for _ in range(10)),
+        read(FakeSession(log), full_name__prefix="B"),
+    )
+    # one query per distinct statement and parameters
+    assert len(log) == 2
+    assert sorted(v for p in log for v in p.values() if isinstance(v, str)) == ["A%", "B%"]
+    assert all(r == results[0] for r in results)
+
+    # every caller gets its own rows
+    results[0][0]["full_name"] = "changed"
+    assert results[1][0]["full_name"] == "Alice"
+
+    stats = reads.stats()
+    assert stats["executions"] == 2 and stats["coalesced"] == 9
+    assert stats["saved_ratio"] == round(9 / 11, 4)
+    assert stats["in_flight"] == 0
+
+    # nothing is kept once the reads are done
+    await read(FakeSession(log), full_name__prefix="A")
+    assert len(log) == 3
+
+@pytest.mark.asyncio
+async def test_reads_after_writes_and_old_executions_are_not_shared(reads):
+    log = []
+    writer = FakeSession(log)
+    writer.info[result_cache.WRITTEN_TABLES_KEY] = {"candidates"}
+    await asyncio.gather(read(FakeSession(log)), read(writer))
+    assert len(log) == 2
+
+    # an execution older than the window is not joined
+    reads.window = 0.01
+    slow = asyncio.ensure_future(read(FakeSession(log, delay=0.1)))
+    await asyncio.sleep(0.03)
+    await read(FakeSession(log))
+    await slow
+    assert len(log) == 4
+    assert reads.stats()["coalesced"] == 0
+
+@pytest.mark.asyncio
+async def test_waiters_run_their_own_read_when_the_leader_is_cancelled(reads):
+    log = []
+    leader = asyncio.ensure_future(read(FakeSession(log)))
+    await asyncio.sleep(0.01)
+    follower = asyncio.ensure_future(read(FakeSession(log)))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    rows = await follower
+    assert [r["id"] for r in rows] == ["c1", "c2"]
+    assert len(log) == 2
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_with_waiters(reads):
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("connection lost")
+
+    results = await asyncio.gather(*(reads.run("key", failing) for _ in range(3)), return_exceptions=True)
+    assert len(calls) == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@pytest.mark.asyncio
+async def test_waiters_run_their_own_read_when_the_leader_times_out(reads):
+    calls = []
+
+    async def execute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            # Postgres cancelled the leader's query at its own deadline
+            raise exc.OperationalError("SELECT", {}, SimpleNamespace(sqlstate="57014"))
+        return "rows"
+
+    leader, *followers = await asyncio.gather(*(reads.run("key", execute) for _ in range(3)), return_exceptions=True)
+    assert isinstance(leader, exc.OperationalError)
+    assert followers == ["rows", "rows"]
+    # the waiters ran their own reads instead of getting the leader's timeout
+    assert len(calls) == 3
@@ -0,0 +1,260 @@
+# tests/test_skill_match.py
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from main import app
+from app.core import skill_index
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+from app.core.skill_index import SkillIndex
+
+ALICE = "11111111-1111-1111-1111-111111111111"
+BOB = "22222222-2222-2222-2222-222222222222"
+CAROL = "33333333-3333-3333-3333-333333333333"
+
+
+# Bypass the real JWT auth
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+@pytest.fixture(autouse=True)
+def index(monkeypatch):
+    index = SkillIndex()
+    monkeypatch.setattr(skill_index, "index", index)
+    return index
+
+# Stub out DBClient with an in-memory candidates table
+@pytest.fixture
+def table(monkeypatch):
+    rows = {
+        ALICE: {"id": ALICE, "full_name": "Alice", "skills": ["Python", "SQL", "Docker"], "updated_at": None},
+        BOB: {"id": BOB, "full_name": "Bob", "skills": ["python "], "updated_at": None},
+        CAROL: {"id": CAROL, "full_name": "Carol", "skills": ["Java", "sql"], "updated_at": None},
+    }
+
+    async def fake_query(self, table_name, filters=None, single_row=False, limit=None, offset=None,
+                         order_by=None, fields=None):
+        filters = filters or {}
+        if table_name == "candidate_tombstones":
+            return [
+                {"candidate_id": k, "deleted_at": v} for k, v in sorted(tombstones.items())
+                if k > filters.get("candidate_id__gt", "") and v >= filters.get("deleted_at__gte", v)
+            ][:limit]
+        assert table_name == "candidates"
+        result = sorted(rows.values(), key=lambda r: r["id"])
+        if "id__gt" in filters:
+            result = [r for r in result if r["id"] > filters["id__gt"]]
+        if "id__in" in filters:
+            result = [r for r in result if r["id"] in filters["id__in"]]
+        result = result[:limit]
+        if fields:
+            result = [{f: r[f] for f in fields} for r in result]
+        return result
+
+    async def fake_update(self, table_name, identifier, update_data, expected_version=None):
+        rows[identifier["id"]] = {**rows[identifier["id"]], **update_data}
+        return rows[identifier["id"]]
+
+    async def fake_delete(self, table_name, filters):
+        assert table_name == "candidate_tombstones"
+        return 0
+
+    tombstones = {}
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+    monkeypatch.setattr(DBClient, "update_table_entry", fake_update)
+    monkeypatch.setattr(DBClient, "delete_table_entries", fake_delete)
+    return SimpleNamespace(rows=rows, tombstones=tombstones)
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
+        yield ac
+
+
+# ----- Tests -----
+
+def test_ranks_by_weighted_share_of_skills(index: SkillIndex):
+    index.apply([
+        {"id": ALICE, "skills": ["Python", "SQL", "Docker"]},
+        {"id": BOB, "skills": ["  python  "]},
+        {"id": CAROL, "skills": ["Java", "sql"]},
+    ])
+    ranked, matched = index.match(required=["python", "sql"], nice_to_have=["docker"])
+    assert matched == 3
+    assert [r["id"] for r in ranked] == [ALICE, BOB, CAROL]
+    assert ranked[0] == {"id": ALICE, "score": 1.0, "matched_skills": ["python", "sql", "docker"]}
+    assert ranked[1]["score"] == 0.4
+
+    ranked, matched = index.match(required=["python", "sql"], require_all=True)
+    assert [r["id"] for r in ranked] == [ALICE] and matched == 1
+
+    # weights override the required / nice-to-have defaults
+    ranked, _ = index.match(required=["python"], nice_to_have=["java"], weights={"Java": 3}, limit=1)
+    assert [r["id"] for r in ranked] == [CAROL]
+
+def test_updates_and_dense_postings_match_a_rebuild(index: SkillIndex):
+    random.seed(7)
+    skills = ["python", "sql", "go", "rust", "kotlin", "haskell"]
+    rows = {f"{i:04d}": random.sample(skills, 2) for i in range(3000)}
+    index.apply({"id": k, "skills": v} for k, v in rows.items())
+    for i in random.sample(range(3000), 500):
+        rows[f"{i:04d}"] = random.sample(skills, 3)
+        index.set_skills(f"{i:04d}", rows[f"{i:04d}"])
+    for i in range(0, 3000, 7):
+        index.remove(f"{i:04d}")
+        del rows[f"{i:04d}"]
+    assert index.stats()["dense_skills"] == len(skills)
+
+    rebuilt = SkillIndex()
+    rebuilt.apply({"id": k, "skills": v} for k, v in rows.items())
+    query = dict(required=["python", "rust"], nice_to_have=["haskell"], limit=50)
+    got, got_matched = index.match(**query)
+    expected, expected_matched = rebuilt.match(**query)
+    assert got_matched == expected_matched
+    assert sorted((r["score"], r["id"]) for r in got) == sorted((r["score"], r["id"]) for r in expected)
+
+@pytest.mark.asyncio
+async def test_match_endpoint_serves_the_index_and_follows_updates(client: AsyncClient, table, index):
+    # built in the background, not by a request
+    r = await client.post("/candidates/match", json={"required": ["SQL"]})
+    assert r.status_code == 503
+    assert r.headers["retry-after"]
+    assert len(index) == 0
+    await index.refresh(DBClient(None))
+
+    r = await client.post("/candidates/match", json={"required": ["SQL"], "nice_to_have": ["docker"]})
+    assert r.status_code == 200, r.text
+    assert [c["full_name"] for c in r.json()] == ["Alice", "Carol"]
+    assert r.json()[0]["score"] == 1.0
+    assert r.headers["x-total-count"] == "2"
+    assert index.built
+
+    # applied to the index once the update commits
+    r = await client.put(f"/candidates/{BOB}", json={"skills": ["SQL", "Docker"]})
+    assert r.status_code == 200, r.text
+    r = await client.post("/candidates/match", json={"required": ["sql"], "require_all": True, "limit": 5})
+    assert {c["full_name"] for c in r.json()} == {"Alice", "Bob", "Carol"}
+
+    # rows gone from the table are dropped from the index, and the next
+    # best candidates take their places
+    del table.rows[ALICE]
+    r = await client.post("/candidates/match", json={"required": ["sql"], "nice_to_have": ["docker"], "limit": 1})
+    assert [c["full_name"] for c in r.json()] == ["Bob"]
+    assert r.headers["x-total-count"] == "2"
+    assert len(index) == 2
+
+    # deleted by another worker: its tombstone drops it on the next refresh
+    del table.rows[CAROL]
+    table.tombstones[CAROL] = datetime(2026, 10, 19)
+    await index.refresh(DBClient(None))
+    r = await client.post("/candidates/match", json={"required": ["sql"]})
+    assert [c["full_name"] for c in r.json()] == ["Bob"]
+    assert r.headers["x-total-count"] == "1"
+
+    r = await client.post("/candidates/match", json={"required": [" "]})
+    assert r.status_code == 422
+
+@pytest.mark.asyncio
+async def test_background_task_builds_then_refreshes(table, index, monkeypatch):
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return False
+
+        async def commit(self):
+            pass
+
+    monkeypatch.setattr(skill_index.settings, "MATCH_INDEX_REFRESH_SECONDS", 0.01)
+    index._session_factory = FakeSession
+    await index.start()
+    try:
+        for _ in range(100):
+            if index.built:
+                break
+            await asyncio.sleep(0.01)
+        assert index.built and len(index) == 3
+
+        # other workers' writes are picked up by the next refresh
+        table.rows[BOB] = {**table.rows[BOB], "skills": ["Rust"]}
+        for _ in range(100):
+            if index.match(required=["rust"])[1]:
+                break
+            await asyncio.sleep(0.01)
+        assert index.match(required=["rust"])[1] == 1
+    finally:
+        await index.stop()
+
+VOCABULARY = [f"skill-{i}" for i in range(2000)]
+# long-tailed: a few skills are very common, most are rare
+CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(len(VOCABULARY))))
+TOP_K_QUERY = dict(required=["skill-0", "skill-5", "skill-40"], nice_to_have=["skill-3", "skill-900"], limit=20)
+
+def grow_to(index: SkillIndex, rng: random.Random, candidates: int) -> None:
+    for start in range(len(index), candidates, 10_000):
+        index.apply(
+            {"id": f"{i:08d}", "skills": rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=6)}
+            for i in range(start, start + 10_000)
+        )
+    assert len(index) == candidates
+
+def test_top_k_work_grows_linearly(index: SkillIndex, monkeypatch):
+    rng = random.Random(1)
+    add_to = skill_index._Posting.add_to
+    work = SimpleNamespace(calls=0, slots=0)
+
+    def counting(self, totals, value):
+        work.calls += 1
+        work.slots += len(totals) if self.bits is not None else self.count
+        return add_to(self, totals, value)
+
+    monkeypatch.setattr(skill_index._Posting, "add_to", counting)
+
+    def top_k_work():
+        work.calls = work.slots = 0
+        ranked, _ = index.match(**TOP_K_QUERY)
+        assert len(ranked) == 20
+        return work.calls, work.slots
+
+    grow_to(index, rng, 10_000)
+    small_calls, small_slots = top_k_work()
+    grow_to(index, rng, 100_000)
+    large_calls, large_slots = top_k_work()
+    # one vectorized pass per query skill, whatever the pool size
+    assert large_calls == small_calls == len(TOP_K_QUERY["required"]) + len(TOP_K_QUERY["nice_to_have"])
+    # 10x the candidates, no worse than linear
+    assert large_slots < small_slots * 10 * 2
+
+@pytest.mark.benchmark
+def test_benchmark_top_k_cost_grows_linearly(index: SkillIndex):
+    rng = random.Random(1)
+
+    def best_ms():
+        index.match(**TOP_K_QUERY)
+        timings = []
+        for _ in range(5):
+            start = time.perf_counter()
+            ranked, _ = index.match(**TOP_K_QUERY)
+            timings.append(time.perf_counter() - start)
+        assert len(ranked) == 20
+        return min(timings) * 1000
+
+    grow_to(index, rng, 10_000)
+    small = best_ms()
+    grow_to(index, rng, 100_000)
+    large = best_ms()
+    # 10x the candidates, no worse than linear
+    assert large < small * 10 * 2
+    # so 1M candidates stay within 100 ms
+    assert large * 10 < 100
@@ -0,0 +1,120 @@
+# tests/test_startup.py
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from main import create_app
+from app.core import database, partitions
+from app.core.db_client import DBClient
+from app.core.security import get_current_user
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cold_import_does_not_create_engine():
+    code = "import main; from app.core import database; print(database._engine is None)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=os.environ,
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+
+    assert out == ["True"]
+
+@pytest.mark.asyncio
+async def test_lifespan_warms_pool_then_serves_first_request(monkeypatch):
+    events = []
+
+    async def fake_warm_up(connections):
+        events.append(("warm_up", connections))
+
+    async def fake_dispose():
+        events.append(("dispose",))
+
+    async def fake_ensure_partitions(session, months_ahead=None):
+        events.append(("ensure_partitions",))
+
+    async def fake_query(self, table_name, filters=None, single_row=False, **kwargs):
+        return []
+
+    monkeypatch.setattr(database, "warm_up_pool", fake_warm_up)
+    monkeypatch.setattr(database, "dispose_engine", fake_dispose)
+    monkeypatch.setattr(partitions, "ensure_partitions", fake_ensure_partitions)
+    monkeypatch.setattr(DBClient, "query_table_data", fake_query)
+
+    app = create_app()
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "00000000-0000-0000-0000-000000000001"}
+
+    async with app.router.lifespan_context(app):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+            r = await client.get("/candidates/")
+
+    assert r.status_code == 200
+    assert events == [
+        ("warm_up", database.settings.DB_POOL_WARMUP),
+        ("ensure_partitions",),
+        ("dispose",),
+    ]
+
+@pytest.mark.asyncio
+async def test_failed_warm_up_releases_every_connection(monkeypatch):
+    opened, closed = [], []
+
+    class FakeConnection:
+        def __init__(self, number):
+            self.number = number
+
+        async def __aenter__(self):
+            opened.append(self.number)
+            return self
+
+        async def __aexit__(self, *exc_info):
+            closed.append(self.number)
+            return False
+
+        async def execute(self, stmt):
+            await asyncio.sleep(0.01 * self.number)
+            if self.number == 2:
+                raise ConnectionError("server closed the connection")
+
+        async def rollback(self):
+            pass
+
+    class FakeEngine:
+        def connect(self):
+            return FakeConnection(len(opened) + 1)
+
+    monkeypatch.setattr(database, "get_engine", lambda: FakeEngine())
+    monkeypatch.setattr(database.settings, "DB_POOL_SIZE", 4)
+    monkeypatch.setattr(DBClient, "warmup_statements", staticmethod(lambda: ["SELECT 1"]))
+
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(database.warm_up_pool(4), timeout=2)
+    # nobody is left waiting at the barrier holding a connection
+    assert sorted(closed) == sorted(opened) == [1, 2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_workers_take_turns_creating_partitions():
+    executed = []
+
+    class FakeResult:
+        def scalar_one(self):
+            return 0
+
+    class FakeSession:
+        async def execute(self, stmt, params=None):
+            executed.append((str(stmt), params))
+            return FakeResult()
+
+    assert await partitions.ensure_partitions(FakeSession(), months_ahead=2) == 0
+    # the lock is held until the caller's transaction ends
+    assert executed[0] == ("SELECT pg_advisory_xact_lock(hashtext(:key))", {"key": partitions.PARTITIONS_LOCK})
+    assert executed[1][0] == "SELECT ensure_applications_partitions(:months_ahead)"
+
+def test_warmup_statements_cover_route_query_shapes():
+    tables = {stmt.get_final_froms()[0].name for stmt in DBClient.warmup_statements()}
+    assert tables == {"users", "candidates", "applications"}
@@ -0,0 +1,96 @@
+# tests/test_statement_cache.py
+import time
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.core import db_client
+from app.core.db_client import DBClient
+from app.models.application import Application
+from app.models.candidate import Candidate
+
+FILTERS = {"candidate_id": "11111111-1111-1111-1111-111111111111", "status__in": "APPLIED,INTERVIEWING"}
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+class RecordingSession:
+    def __init__(self):
+        self.executed = []
+        self.info = {}
+
+    async def execute(self, stmt, params=None):
+        self.executed.append((stmt, params))
+        return self
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return {"id": "x", "version": 2}
+
+
+@pytest.fixture(autouse=True)
+def clear_statement_cache():
+    db_client._statement_cache.clear()
+    db_client.statement_stats.reset()
+
+
+# ----- Tests -----
+
+def test_statements_are_cached_by_shape_not_values():
+    stmt1, params1 = DBClient.prepare_select(Application, filters=FILTERS, limit=10, offset=0)
+    stmt2, params2 = DBClient.prepare_select(
+        Application,
+        filters={"status__in": "HIRED", "candidate_id": "22222222-2222-2222-2222-222222222222"},
+        limit=50,
+        offset=100,
+    )
+    assert stmt1 is stmt2
+    assert params1 != params2
+    assert db_client.statement_stats.stats()["templates"] == {
+        "hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1,
+    }
+    # one array parameter, so the SQL (and prepared statement) doesn't depend on the list length
+    assert "= ANY ($2::application_status[])" in compile_sql(stmt1)
+
+def test_value_dependent_sql_gets_its_own_statement():
+    not_null, _ = DBClient.prepare_select(Candidate, filters={"phone__isnull": "false"})
+    null, _ = DBClient.prepare_select(Candidate, filters={"phone__isnull": "true"})
+    assert not_null is not null
+    assert "IS NOT NULL" in compile_sql(not_null)
+    assert "IS NULL" in compile_sql(null)
+
+@pytest.mark.asyncio
+async def test_update_statement_is_reused():
+    session = RecordingSession()
+    db = DBClient(session)
+    await db.update_table_entry("applications", {"id": "aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"}, {"status": "HIRED"}, expected_version=1)
+    await db.update_table_entry("applications", {"id": "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb"}, {"status": "REJECTED"}, expected_version=4)
+    (stmt1, params1), (stmt2, params2) = session.executed
+    assert stmt1 is stmt2
+    assert params2["set_status"] == "REJECTED"
+    assert params2["expected_version"] == 4
+
+@pytest.mark.benchmark
+def test_benchmark_statement_cpu_per_request():
+    iterations = 2000
+    kwargs = {"filters": FILTERS, "limit": 20, "offset": 40, "order_by": ["-applied_at"]}
+
+    # SQLAlchemy derives a cache key for every statement it executes
+    start = time.process_time()
+    for _ in range(iterations):
+        db_client._statement_cache.clear()
+        stmt, _ = DBClient.prepare_select(Application, **kwargs)
+        stmt._generate_cache_key()
+    rebuilt = (time.process_time() - start) / iterations
+
+    start = time.process_time()
+    for _ in range(iterations):
+        stmt, _ = DBClient.prepare_select(Application, **kwargs)
+        stmt._generate_cache_key()
+    cached = (time.process_time() - start) / iterations
+
+    assert cached < rebuilt